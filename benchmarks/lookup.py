@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+"""
+Measure lookup speed of each stage of CountryData.get()
+
+Usage: python3 benchmarks/lookup.py [--json FILE] [--compare FILE] [--filter TEXT]
+
+Queries are generated from the packaged country data with a fixed seed, so
+results are reproducible and no network access is needed. Each stage of
+CountryData._find_country() (ISO2, ISO3, custom regex_map, exact names,
+built-in regular expressions, fuzzy official and short names, misses) is
+measured separately and without the result cache. Other cases measure loading, iterating over
+CountryData.countries and a mixed corpus with realistic skew.
+
+Results are printed as a table. Use --json to store them and --compare to
+compare them to stored results, e.g. of the previous release:
+
+    $ python3 benchmarks/lookup.py --json baseline.json
+    $ git checkout ...
+    $ python3 benchmarks/lookup.py --compare baseline.json
+
+--compare exits with status 1 if any case is slower than --threshold allows.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import re
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+
+# Use the countryguess package in this repository, not an installed one
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+import countryguess  # noqa: E402
+from countryguess import CountryData, RegexMap  # noqa: E402
+
+# Maximum number of queries per stage
+MAX_QUERIES = 500
+
+# Number of queries in the mixed corpus
+CORPUS_SIZE = 10000
+
+# Share of each stage in the mixed corpus
+CORPUS_STAGES = {
+    'iso2': 0.25,
+    'iso3': 0.20,
+    'name': 0.20,
+    'regex': 0.15,
+    'fuzzy_official': 0.05,
+    'fuzzy_short': 0.05,
+    'miss': 0.10,
+}
+
+SEED = 1
+
+
+def get_stage(countrydata, query, regex_map=None):
+    # Return name of the stage of CountryData._find_country() that finds `query`
+    return countrydata._find_country_stage(query, regex_map)[1]
+
+
+def get_regex_map(countrydata):
+    # Internal country keys like "ctry-deu" as they are common in business data
+    return {
+        country['iso2']: re.compile(rf'^ctry[-_ ]{country["iso3"].lower()}$', flags=re.IGNORECASE)
+        for country in countrydata.countries
+    }
+
+
+def get_typos(rng, name):
+    # Return `name` with one character removed, duplicated or swapped
+    typos = []
+    for i in range(1, len(name) - 1):
+        typos.append(name[:i] + name[i + 1:])
+        typos.append(name[:i] + name[i] + name[i:])
+        typos.append(name[:i - 1] + name[i] + name[i - 1] + name[i + 1:])
+    rng.shuffle(typos)
+    return typos
+
+
+def get_queries(countrydata, regex_map):
+    # Return dictionary that maps stage names to lists of queries that are found
+    # by that stage, in random but reproducible order
+    rng = random.Random(SEED)
+    countries = countrydata.countries
+    candidates = {
+        'iso2': [],
+        'iso3': [],
+        'regex_map': [],
+        'name': [],
+        'regex_early': [],
+        'regex_late': [],
+        'fuzzy_official': [],
+        'fuzzy_short': [],
+        'miss': [],
+    }
+
+    for index, country in enumerate(countries):
+        candidates['iso2'].extend((country['iso2'], country['iso2'].lower()))
+        candidates['iso3'].extend((country['iso3'], country['iso3'].lower()))
+        candidates['regex_map'].extend((f'CTRY-{country["iso3"]}', f'ctry_{country["iso3"].lower()}'))
+
+        candidates['name'].extend((country['name_short'].upper(), country['name_official'].lower()))
+
+        # Patterns are tried in order, so the position of the matching pattern
+        # might matter. Exact names are found before regular expressions are
+        # searched.
+        variants = (f'The {country["name_short"]}', f'{country["name_official"]} (country)')
+        if index < len(countries) // 4:
+            candidates['regex_early'].extend(variants)
+        elif index >= len(countries) * 3 // 4:
+            candidates['regex_late'].extend(variants)
+
+        candidates['fuzzy_official'].extend(get_typos(rng, country['name_official'])[:10])
+        candidates['fuzzy_short'].extend(get_typos(rng, country['name_short'])[:10])
+
+    candidates['miss'].extend(('', '-', 'N/A', 'n.a.', 'unknown', 'Other', 'Rest of World', 'TBD'))
+    for _ in range(MAX_QUERIES):
+        length = rng.randint(4, 20)
+        candidates['miss'].append(''.join(rng.choice(string.ascii_lowercase + ' ') for _ in range(length)))
+
+    queries = {}
+    for name, strings in candidates.items():
+        stage = 'regex' if name.startswith('regex_') and name != 'regex_map' else name
+        found = [
+            query for query in strings
+            if get_stage(countrydata, query, regex_map=regex_map if stage == 'regex_map' else None) == stage
+        ]
+        rng.shuffle(found)
+        queries[name] = found[:MAX_QUERIES]
+    # Forget misses that were remembered while finding the stages
+    countrydata.cache_clear()
+    return queries
+
+
+def get_corpus(queries):
+    # Return list of queries with realistic skew: Some stages are more common
+    # than others and few countries make up most of the queries (Zipf's law)
+    rng = random.Random(SEED)
+    stage_queries = dict(queries)
+    stage_queries['regex'] = queries['regex_early'] + queries['regex_late']
+    stages = list(CORPUS_STAGES)
+    stage_weights = [CORPUS_STAGES[stage] for stage in stages]
+
+    corpus = []
+    for stage in rng.choices(stages, weights=stage_weights, k=CORPUS_SIZE):
+        candidates = stage_queries[stage]
+        ranks = rng.choices(range(len(candidates)), weights=[1 / (rank + 1) for rank in range(len(candidates))])
+        corpus.append(candidates[ranks[0]])
+    return corpus
+
+
+def measure(func, operations, repeat):
+    # Return list of seconds per operation for each of `repeat` calls of `func`
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) / operations)
+    return timings
+
+
+def lookup_all(find, queries, clear=None, **kwargs):
+    # Return function that looks up all `queries` after calling `clear`
+    def run():
+        if clear is not None:
+            clear()
+        for query in queries:
+            find(query, **kwargs)
+
+    return run
+
+
+def get_cases(repeat):
+    # Yield (name, function, number of operations, repeat) tuples
+    countrydata = CountryData()
+    countrydata.preload()
+    regex_map = get_regex_map(countrydata)
+    queries = get_queries(countrydata, regex_map)
+    find = countrydata._find_country
+    # Misses are remembered, which we don't want to measure in most cases
+    clear = countrydata.cache_clear
+
+    for name, stage_queries in queries.items():
+        if name == 'regex_map':
+            yield ('stage_regex_map_dict', lookup_all(find, stage_queries, clear, regex_map=regex_map),
+                   len(stage_queries), repeat)
+            regex_map_object = RegexMap(regex_map)
+            yield ('stage_regex_map_object', lookup_all(find, stage_queries, clear, regex_map=regex_map_object),
+                   len(stage_queries), repeat)
+        else:
+            yield (f'stage_{name}', lookup_all(find, stage_queries, clear), len(stage_queries), repeat)
+    yield ('stage_miss_repeated', lookup_all(find, queries['miss']), len(queries['miss']), repeat)
+
+    fuzzy_queries = queries['fuzzy_official'] + queries['fuzzy_short']
+    for k in (1, 5, 20):
+        yield (f'candidates_k{k}', lookup_all(countrydata.candidates, fuzzy_queries, k=k),
+               len(fuzzy_queries), repeat)
+
+    corpus = get_corpus(queries)
+    yield ('corpus_uncached', lookup_all(find, corpus, clear), len(corpus), repeat)
+
+    # Country mentions in running text, measured per 1000 characters
+    filler = 'and some words that do not mention any country at all,'
+    text = ' '.join(f'{query} {filler}' for query in corpus)
+    countrydata.find_all('')
+    yield ('find_all_per_kb', lambda: countrydata.find_all(text), len(text) // 1000, repeat)
+
+    def corpus_cached():
+        # Fresh instance with warm indexes, but empty cache
+        countrydata.cache_size = 1024
+        countrydata.cache_clear()
+        lookup_all(countrydata.get, corpus)()
+        countrydata.cache_size = 0
+
+    yield ('corpus_cached', corpus_cached, len(corpus), repeat)
+
+    for kwargs in ({}, {'readonly': True}, {'compact': True}):
+        iter_countrydata = CountryData(**kwargs)
+        iter_countrydata.countries
+
+        def iterate(iter_countrydata=iter_countrydata):
+            for country in iter_countrydata.countries:
+                country['iso3']
+
+        suffix = ''.join(f'_{key}' for key in kwargs)
+        yield (f'countries_iteration{suffix}', iterate, 1, repeat)
+
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for name, kwargs in (
+            ('cold_load_json', {'disk_cache': False}),
+            ('cold_load_disk_cache', {'disk_cache': cache_dir}),
+            ('cold_load_compact', {'disk_cache': cache_dir, 'compact': True}),
+        ):
+            CountryData(**kwargs).preload()
+            yield (name, lambda kwargs=kwargs: CountryData(**kwargs).get('DE'), 1, repeat)
+
+        def cold_process():
+            subprocess.run(
+                [sys.executable, '-c', 'import countryguess; countryguess.guess_country("DE")'],
+                env={**os.environ, 'COUNTRYGUESS_CACHE_DIR': cache_dir},
+                cwd=REPO_ROOT,
+                check=True,
+            )
+
+        cold_process()
+        yield ('cold_process', cold_process, 1, max(3, repeat // 2))
+
+
+def get_metadata():
+    return {
+        'countryguess': countryguess.__version__,
+        'python': sys.version,
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+        'gil_enabled': getattr(sys, '_is_gil_enabled', lambda: True)(),
+        'date': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def run(args):
+    results = {}
+    for name, func, operations, repeat in get_cases(args.repeat):
+        if args.filter and args.filter not in name:
+            continue
+        timings = measure(func, operations, repeat)
+        results[name] = {
+            'operations': operations,
+            'repeat': repeat,
+            'best_us': min(timings) * 1e6,
+            'median_us': statistics.median(timings) * 1e6,
+        }
+        print(f'{name:35s} {results[name]["median_us"]:12.2f} µs  (best: {results[name]["best_us"]:.2f} µs, '
+              f'{operations} operations)', file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    # Print median time of each case relative to `baseline` and return whether
+    # any case is slower than `threshold` allows
+    regressed = False
+    print(f'\n{"case":35s} {"baseline":>12s} {"current":>12s} {"ratio":>7s}', file=sys.stderr)
+    for name, result in results.items():
+        if name in baseline:
+            ratio = result['median_us'] / baseline[name]['median_us']
+            marker = ''
+            if ratio > 1 + threshold:
+                regressed = True
+                marker = '  SLOWER'
+            print(f'{name:35s} {baseline[name]["median_us"]:12.2f} {result["median_us"]:12.2f} '
+                  f'{ratio:7.2f}{marker}', file=sys.stderr)
+    return regressed
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Measure lookup speed of each stage of CountryData.get()')
+    argparser.add_argument('--json', metavar='FILE', help='Write results as JSON to FILE ("-" for stdout)')
+    argparser.add_argument('--compare', metavar='FILE', help='Compare results to JSON FILE from a previous run')
+    argparser.add_argument('--threshold', type=float, default=0.25,
+                           help='Maximum slowdown relative to --compare results (default: %(default)s)')
+    argparser.add_argument('--filter', metavar='TEXT', help='Only run cases with TEXT in their name')
+    argparser.add_argument('--repeat', type=int, default=7, help='Number of runs per case (default: %(default)s)')
+    args = argparser.parse_args()
+
+    output = {'metadata': get_metadata(), 'results': run(args)}
+
+    if args.json == '-':
+        json.dump(output, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)['results']
+        if compare(output['results'], baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
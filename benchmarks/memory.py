@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Compare memory usage of country data as list of dicts, as compact table and as
+shared file
+
+The shared file is memory-mapped, so only the Python objects that each process
+creates on top of it are counted.
+
+Usage: python3 benchmarks/memory.py [path/to/countries.json]
+"""
+
+import gc
+import os
+import re
+import sys
+import tempfile
+import tracemalloc
+
+# Use the countryguess package in this repository, not an installed one
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from countryguess import CountryData, build_shared_file  # noqa: E402
+
+
+def traced(func):
+    # Don't let patterns that were compiled earlier affect the result
+    re.purge()
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()
+        gc.collect()
+        size, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, size
+
+
+def load(**kwargs):
+    filepath = sys.argv[1] if len(sys.argv) > 1 else None
+    if 'shared_file' in kwargs:
+        filepath = None
+    countrydata = CountryData(filepath=filepath, disk_cache=False, **kwargs)
+    countrydata._countries = countrydata._load_countries()
+    return countrydata
+
+
+def compile_patterns(countrydata):
+    for country in countrydata._countries:
+        country['regex']
+
+
+def main():
+    # Import modules that are imported on first use (e.g. json) before
+    # measuring, so they are not counted as country data
+    load()
+    load(compact=True)
+
+    _, dicts_size = traced(load)
+    compact, compact_size = traced(lambda: load(compact=True))
+    _, patterns_size = traced(lambda: compile_patterns(compact))
+    with tempfile.TemporaryDirectory() as tmpdir:
+        shared_file = os.path.join(tmpdir, 'countries.shared')
+        build_shared_file(shared_file, filepath=sys.argv[1] if len(sys.argv) > 1 else None)
+        _, shared_size = traced(lambda: load(shared_file=shared_file))
+
+    print(f'list of dicts:                 {dicts_size / 1024:8.1f} KiB')
+    print(f'compact:                       {compact_size / 1024:8.1f} KiB')
+    print(f'compact with compiled regexes: {(compact_size + patterns_size) / 1024:8.1f} KiB')
+    print(f'shared file:                   {shared_size / 1024:8.1f} KiB')
+
+
+if __name__ == '__main__':
+    main()
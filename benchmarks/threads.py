@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Measure lookup throughput of one shared CountryData with multiple threads
+
+Usage: python3 benchmarks/threads.py [MAX_THREADS]
+
+The result cache is disabled so every lookup does the actual work. On
+free-threaded builds of Python (3.13t and later), throughput should grow with
+the number of threads.
+"""
+
+import argparse
+import concurrent.futures
+import os
+import sys
+import time
+
+# Use the countryguess package in this repository, not an installed one
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)
+
+from countryguess import CountryData  # noqa: E402
+
+LOOKUPS_PER_THREAD = 2000
+
+
+def get_queries(countrydata):
+    queries = []
+    for country in countrydata.countries:
+        queries.extend((
+            country['iso2'],
+            country['iso3'],
+            country['name_short'],
+            country['name_official'][:-1],
+        ))
+    queries.append('not a country')
+    return queries
+
+
+def worker(countrydata, queries):
+    get = countrydata.get
+    for i in range(LOOKUPS_PER_THREAD):
+        get(queries[i % len(queries)])
+
+
+def measure(countrydata, queries, threads):
+    with concurrent.futures.ThreadPoolExecutor(max_workers=threads) as executor:
+        start = time.perf_counter()
+        futures = [executor.submit(worker, countrydata, queries) for _ in range(threads)]
+        for future in futures:
+            future.result()
+        return time.perf_counter() - start
+
+
+def main():
+    argparser = argparse.ArgumentParser(description='Measure lookup throughput of one CountryData with multiple threads')
+    argparser.add_argument('MAX_THREADS', type=int, nargs='?', default=os.cpu_count() or 1,
+                           help='Maximum number of threads (default: number of CPUs)')
+    args = argparser.parse_args()
+    if args.MAX_THREADS < 1:
+        argparser.error(f'MAX_THREADS must be positive: {args.MAX_THREADS}')
+    max_threads = args.MAX_THREADS
+    is_gil_enabled = getattr(sys, '_is_gil_enabled', lambda: True)()
+    print(f'Python {sys.version.split()[0]}, GIL enabled: {is_gil_enabled}')
+
+    countrydata = CountryData(cache_size=0)
+    countrydata.preload()
+    queries = get_queries(countrydata)
+
+    baseline = None
+    threads = 1
+    while threads <= max_threads:
+        duration = measure(countrydata, queries, threads)
+        throughput = threads * LOOKUPS_PER_THREAD / duration
+        baseline = baseline or throughput
+        print(f'{threads:3d} threads: {throughput:10.0f} lookups/s ({throughput / baseline:5.2f}x)')
+        threads *= 2
+
+
+if __name__ == '__main__':
+    main()
@@ -5,5 +5,9 @@ __version__ = '0.3.0'
 __author__ = 'plotski'
 __author_email__ = 'plotski@example.org'
 
-from ._countrydata import CountryData
-from ._guess_country import guess_country
+from ._countrydata import CountryData, build_shared_file, write_prebuilt
+from ._enrich import enrich
+from ._groups import Group
+from ._guess_country import guess_countries, guess_country
+from ._records import Country
+from ._regex import RegexMap
@@ -0,0 +1,91 @@
+import collections
+import threading
+
+CacheInfo = collections.namedtuple('CacheInfo', ('hits', 'misses', 'evictions', 'maxsize', 'currsize'))
+CacheInfo.__doc__ = 'Statistics of a result cache (see :meth:`.CountryData.cache_info`)'
+
+
+class LRUCache:
+    """
+    Thread-safe mapping that discards the least recently used items
+
+    :param int maxsize: Maximum number of items; `0` or `None` disables the
+        cache
+    """
+
+    def __init__(self, maxsize=None):
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+        self._maxsize = 0
+        self._hits = self._misses = self._evictions = 0
+        self.maxsize = maxsize
+
+    @property
+    def maxsize(self):
+        """
+        Maximum number of items
+
+        Setting this to a smaller value discards the least recently used
+        items. Setting it to `0` or `None` disables the cache.
+        """
+        return self._maxsize
+
+    @maxsize.setter
+    def maxsize(self, maxsize):
+        maxsize = int(maxsize or 0)
+        if maxsize < 0:
+            raise ValueError(f'Cache size must not be negative: {maxsize!r}')
+        with self._lock:
+            self._maxsize = maxsize
+            self._evict()
+
+    def get(self, key, default=None):
+        """Return value for `key` or `default` if `key` is not cached"""
+        with self._lock:
+            try:
+                value = self._items[key]
+            except KeyError:
+                self._misses += 1
+                return default
+            else:
+                self._items.move_to_end(key)
+                self._hits += 1
+                return value
+
+    def set(self, key, value):
+        """Store `value` for `key`, discarding old items if necessary"""
+        with self._lock:
+            if self._maxsize:
+                self._items[key] = value
+                self._items.move_to_end(key)
+                self._evict()
+
+    def _evict(self):
+        items = self._items
+        while len(items) > self._maxsize:
+            items.popitem(last=False)
+            self._evictions += 1
+
+    def clear(self):
+        """Remove all items and reset statistics"""
+        with self._lock:
+            self._items.clear()
+            self._hits = self._misses = self._evictions = 0
+
+    def info(self):
+        """Return :class:`CacheInfo`"""
+        with self._lock:
+            return CacheInfo(
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+                maxsize=self._maxsize,
+                currsize=len(self._items),
+            )
+
+    def __contains__(self, key):
+        # Doesn't count as a hit or miss and doesn't change the order
+        return key in self._items
+
+    def __len__(self):
+        return len(self._items)
@@ -1,9 +1,13 @@
 import argparse
-import json
+import os
 import re
 import sys
+import time
 
-from . import guess_country
+from . import CountryData, build_shared_file, guess_country
+
+# Maximum number of seconds between flushing output in batch mode
+_FLUSH_INTERVAL = 1.0
 
 
 def parse_args(argv):
@@ -11,7 +15,12 @@ def parse_args(argv):
 
     argparser.add_argument(
         'COUNTRY',
-        help='Fuzzy name, 3-letter or 3-letter country code',
+        nargs='?',
+        default=None,
+        help=(
+            'Fuzzy name, 3-letter or 3-letter country code; '
+            'if not provided, read one country per line from stdin'
+        ),
     )
     argparser.add_argument(
         'ATTRIBUTE',
@@ -22,12 +31,78 @@ def parse_args(argv):
             'print all attributes as JSON'
         ),
     )
-    return argparser.parse_args(argv)
+    argparser.add_argument(
+        '-i', '--input',
+        action='append',
+        metavar='FILE',
+        help='Read one country per line from FILE ("-" for stdin); may be given multiple times',
+    )
+    argparser.add_argument(
+        '-f', '--format',
+        choices=('jsonl', 'csv', 'tsv'),
+        help='Output format when reading countries from stdin or files (default: jsonl)',
+    )
+    argparser.add_argument(
+        '-a', '--attributes',
+        metavar='ATTRIBUTE,...',
+        help='Comma-separated attributes to print when reading countries from stdin or files (default: all)',
+    )
+    argparser.add_argument(
+        '--cache-size',
+        type=int,
+        metavar='N',
+        help='Remember results for N different countries when reading countries from stdin or files '
+        '(default: 10000)',
+    )
+    argparser.add_argument(
+        '--build-shared-file',
+        metavar='FILE',
+        help='Write built-in country data to FILE for CountryData(shared_file=FILE) and exit',
+    )
+
+    args = argparser.parse_args(argv)
+    if args.COUNTRY is not None:
+        # Options for reading countries from stdin or files are not silently
+        # ignored
+        for option, value in (
+            ('--input', args.input),
+            ('--format', args.format),
+            ('--attributes', args.attributes),
+            ('--cache-size', args.cache_size),
+        ):
+            if value is not None:
+                argparser.error(f'COUNTRY and {option} are mutually exclusive')
+    elif not args.input and not args.build_shared_file and sys.stdin.isatty():
+        # Don't wait for input that is never going to come
+        argparser.error('COUNTRY or --input is required if stdin is a terminal')
+
+    if args.format is None:
+        args.format = 'jsonl'
+    if args.cache_size is None:
+        args.cache_size = 10000
+    elif args.cache_size < 0:
+        argparser.error(f'Cache size must not be negative: {args.cache_size}')
+    return args
 
 
 def run():
     args = parse_args(sys.argv[1:])
+    if args.build_shared_file:
+        _build_shared_file(args.build_shared_file)
+    elif args.COUNTRY is None:
+        _run_batch(args)
+    else:
+        _run_single(args)
+
+
+def _build_shared_file(path):
+    try:
+        build_shared_file(path)
+    except OSError as e:
+        print(f'Failed to write {path}: {e.strerror}', file=sys.stderr)
+
 
+def _run_single(args):
     try:
         info = guess_country(args.COUNTRY, attribute=args.ATTRIBUTE)
 
@@ -36,6 +111,8 @@ def run():
 
     else:
         if isinstance(info, dict):
+            import json
+
             print(json.dumps(info, indent=4, default=_serialize_object))
         elif info is not None:
             print(_serialize_object(info))
@@ -43,6 +120,103 @@ def run():
             print(f'No such country: {args.COUNTRY}', file=sys.stderr)
 
 
+def _run_batch(args):
+    # Every input line is looked up once and repeated lines are answered from
+    # the result cache, which is limited to keep memory usage flat
+    countrydata = CountryData(cache_size=args.cache_size, readonly=True)
+    known_attributes = countrydata.countries[0]
+    if args.attributes:
+        attributes = [attribute.strip() for attribute in args.attributes.split(',')]
+    else:
+        attributes = list(known_attributes)
+    for attribute in attributes:
+        if attribute not in known_attributes:
+            print(f'No such attribute: {attribute}', file=sys.stderr)
+            sys.exit(1)
+
+    stdout = sys.stdout
+    write_row = _get_row_writer(args.format, stdout, attributes)
+    last_flush = time.monotonic()
+    try:
+        try:
+            for query in _read_queries(args.input or ['-']):
+                write_row(query, countrydata.get(query))
+
+                now = time.monotonic()
+                if now - last_flush >= _FLUSH_INTERVAL:
+                    stdout.flush()
+                    last_flush = now
+        finally:
+            # Rows of readable input are written even if other input isn't
+            stdout.flush()
+
+    except _ReadError as e:
+        print(f'Failed to read {e.filepath}: {e.strerror}', file=sys.stderr)
+        sys.exit(1)
+
+    except OSError as e:
+        # Prevent another error when Python flushes stdout on exit
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        os.dup2(devnull, stdout.fileno())
+        # Output that was closed (e.g. by `head`) is not an error worth
+        # reporting
+        if not isinstance(e, BrokenPipeError):
+            print(f'Failed to write output: {e.strerror}', file=sys.stderr)
+        sys.exit(1)
+
+
+class _ReadError(Exception):
+    # Input (as opposed to output) can't be read
+
+    def __init__(self, filepath, strerror):
+        super().__init__(filepath, strerror)
+        self.filepath = filepath
+        self.strerror = strerror
+
+
+def _read_queries(filepaths):
+    # Yield one stripped line at a time so input of any size can be processed
+    for filepath in filepaths:
+        try:
+            if filepath == '-':
+                for line in sys.stdin:
+                    yield line.strip()
+            else:
+                with open(filepath, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        yield line.strip()
+        except OSError as e:
+            raise _ReadError(filepath, e.strerror) from e
+
+
+def _get_row_writer(format, stream, attributes):
+    # Return function that takes a query and its country data (or `None`) and
+    # writes one row to `stream`
+    if format == 'jsonl':
+        import json
+
+        def write_row(query, info):
+            row = {'query': query}
+            for attribute in attributes:
+                row[attribute] = info.get(attribute) if info else None
+            stream.write(json.dumps(row, ensure_ascii=False, default=_serialize_object) + '\n')
+
+    else:
+        import csv
+
+        writer = csv.writer(stream, delimiter='\t' if format == 'tsv' else ',', lineterminator='\n')
+        writer.writerow(['query', *attributes])
+
+        def write_row(query, info):
+            row = [query]
+            for attribute in attributes:
+                value = info.get(attribute) if info else None
+                row.append('' if value is None else _serialize_object(value))
+            writer.writerow(row)
+
+    return write_row
+
+
 def _serialize_object(obj):
     if isinstance(obj, re.Pattern):
         return obj.pattern
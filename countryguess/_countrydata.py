@@ -1,12 +1,37 @@
 import collections
-import difflib
+import collections.abc
 import functools
-import importlib.resources
-import json
+import os
 import re
 import sys
+import threading
+import time
+import types
+import unicodedata
 
-from . import __project_name__
+from . import (__project_name__, _cache, _diskcache, _groups, _mentions,
+               _prebuilt, _records, _regex, _reload, _shared, _stats)
+
+# Attributes that are indexed when country data is loaded
+_CODE_ATTRIBUTES = (
+    'iso2', 'iso3', 'isonumeric', 'uncode', 'faocode', 'gbdcode',
+    'cctld', 'gwcode', 'daccode', 'eora',
+)
+
+# Cache key for lookups without `regex_map`
+_NO_REGEX_MAP = ()
+
+# Cache value for unknown keys
+_NOT_CACHED = object()
+
+Candidate = collections.namedtuple('Candidate', ('country', 'score', 'stage'))
+Candidate.__doc__ = 'Country that might be meant by a query (see :meth:`.CountryData.candidates`)'
+
+# Sequences of characters that are ignored when names are compared
+_NAME_PUNCTUATION = re.compile(r'[\W_]+')
+
+# Maximum number of strings that are remembered as not matching any country
+_MISS_CACHE_SIZE = 1024
 
 
 def _lazy_load_countries(func):
@@ -14,7 +39,10 @@ def _lazy_load_countries(func):
     def wrapper(self, *args, **kwargs):
         # Read country data from file unless we've already done that
         if not self._countries:
-            self._countries = self._load_countries()
+            with self._lock:
+                # Another thread may have loaded while we were waiting
+                if not self._countries:
+                    self._countries = self._load_countries()
 
         # Call wrapped function transparently
         return func(self, *args, **kwargs)
@@ -22,12 +50,320 @@ def _lazy_load_countries(func):
     return wrapper
 
 
+class _cached_property:
+    # Like functools.cached_property, but the value is guaranteed to be computed
+    # only once, even if multiple threads request it at the same time (Python
+    # 3.12 removed locking from functools.cached_property). The instance must
+    # have a `_lock` attribute (threading.RLock).
+
+    def __init__(self, func):
+        self._func = func
+        self._name = func.__name__
+        self.__doc__ = func.__doc__
+
+    def __set_name__(self, owner, name):
+        self._name = name
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+
+        # After the first call, the instance attribute shadows this descriptor,
+        # so this is only reached until the value exists
+        cache = instance.__dict__
+        try:
+            return cache[self._name]
+        except KeyError:
+            with instance._lock:
+                try:
+                    return cache[self._name]
+                except KeyError:
+                    value = cache[self._name] = self._func(instance)
+                    return value
+
+
 class CountryData:
-    def __init__(self, filepath=None):
+    """
+    Country information from a JSON file
+
+    :param filepath: Path to JSON file or `None` to use the packaged file
+    :param int cache_size: Maximum number of lookup results to remember; `0` or
+        `None` disables the cache (see :meth:`cache_info`)
+
+        Regardless of this, the last 1024 strings that didn't match any country
+        are remembered because they take the longest to look up.
+    :param disk_cache: Whether to store parsed country data and indexes in a
+        cache file to speed up loading in future processes
+
+        `True` uses the default cache directory (see below), a path uses that
+        directory and `False` disables the cache file.
+
+        The cache file is updated automatically if the country data file
+        changes.
+
+        The default cache directory is ``$XDG_CACHE_HOME/countryguess``,
+        ``~/.cache/countryguess`` or the platform's equivalent. The environment
+        variable ``COUNTRYGUESS_CACHE_DIR`` overrides this. Setting the
+        environment variable ``COUNTRYGUESS_NO_DISK_CACHE`` to any non-empty
+        value disables the default cache file.
+    :param bool compact: Whether to store country data in a memory efficient
+        table instead of one :class:`dict` per country
+
+        Lookups return read-only :class:`~.Country` objects instead of
+        :class:`dict` objects. Regular expressions are only compiled when they
+        are needed.
+    :param bool readonly: Whether to return read-only country data
+
+        Lookups return read-only mappings (:class:`types.MappingProxyType` or
+        :class:`~.Country`) instead of the internal :class:`dict` objects, so
+        callers can't corrupt them. :attr:`countries` returns the same objects
+        without copying them.
+    :param bool instrument: Whether to count lookups and measure their duration
+        per stage (see :meth:`stage_info`)
+    :param lookup_hook: Callable that is called after every lookup with the
+        query, the name of the stage that resolved it (see :meth:`stage_info`)
+        and the duration of the lookup in seconds; `None` disables this
+
+        Exceptions from `lookup_hook` are not handled.
+    :param dict aliases: Map alternative names (e.g. ``"Korea, Republic of"``)
+        to ISO 3166-1 alpha-2 country codes
+
+        Aliases are matched like official and short names (see :meth:`get`)
+        and take precedence over them.
+    :param shared_file: Path of a file that was created by
+        :func:`~.build_shared_file` or `None`
+
+        Country data and indexes are read from this file by mapping it into
+        memory, so all processes on a host (e.g. workers of a prefork web
+        server) share one physical copy of it. `filepath`, `disk_cache` and
+        `compact` are ignored, and lookups return read-only
+        :class:`~.Country` objects. Regular expressions and fuzzy matching
+        indexes are still built by each process when they are needed.
+    :param executor: :class:`concurrent.futures.Executor` that runs lookups
+        that might block the event loop (see :meth:`aget`) or `None` to use the
+        default executor of the event loop
+    :param float reload_interval: Minimum number of seconds between checks
+        whether the country data file (or `shared_file`) changed or `None` to
+        never load it again
+
+        Checks are done by a background thread that is started by lookups, so
+        lookups never wait for them. A changed file is loaded and all indexes
+        are built in the background, and then the new country data replaces
+        the old country data at once. Lookups that are already running finish
+        with the old country data. Cached lookup results (see
+        :meth:`cache_info`) are forgotten. Groups from :meth:`members` keep
+        the country data they were created with.
+
+        If the changed file can't be loaded, the old country data is kept
+        until the file changes again. See :meth:`reload_info` for monitoring.
+        Pickled copies don't reload country data.
+    """
+
+    def __init__(self, filepath=None, cache_size=None, disk_cache=True, compact=False, readonly=False,
+                 instrument=False, lookup_hook=None, aliases=None, shared_file=None, executor=None,
+                 *, reload_interval=None):
+        # Held while country data is loaded or anything is derived from it.
+        # Loading only happens once, so contention doesn't matter, and other
+        # instances (e.g. one that is loaded for reload_interval) never wait.
+        self._lock = threading.RLock()
         self._filepath = filepath
+        self._disk_cache = disk_cache
+        # Shared country data is stored in a table like compact country data
+        self._compact = bool(compact or shared_file is not None)
+        self._shared_file = shared_file
+        self._shared_table = None
+        # Name index and fuzzy matcher states from the prebuilt lookup data
+        self._prebuilt = None
+        # Source path of the prebuilt lookup data if compact instances read
+        # parts of it when they are needed instead of keeping it
+        self._prebuilt_source = None
+        self._readonly = readonly
         self._countries = None
+        self._indexes = {}
+        self._regex_literals = None
+        self._translations = {}
+        self._group_masks = {}
+        self._cache = _cache.LRUCache(cache_size)
+        self._miss_cache = _cache.LRUCache(_MISS_CACHE_SIZE)
+        self._stage_stats = _stats.StageStats()
+        self._instrument = bool(instrument)
+        self._lookup_hook = lookup_hook
+        self._instrumented = self._instrument or lookup_hook is not None
+        self._aliases = dict(aliases) if aliases else {}
+        self._executor = executor
+        # Lookups that are currently running in `executor`
+        self._in_flight = {}
+
+        # Only set for _ReloadingCountryData (see __new__())
+        self._reloader = None
+        if reload_interval is not None:
+            if shared_file is not None:
+                path = os.fspath(shared_file)
+            elif filepath is not None:
+                path = os.fspath(filepath)
+            else:
+                path = os.path.join(os.path.dirname(__file__), '_countrydata.json')
+            self._reloader = _reload.Reloader(self._create_reloaded, path, reload_interval)
+
+    def __new__(cls, *args, reload_interval=None, **kwargs):
+        # Instances that reload country data redirect everything to the
+        # current instance, so all other instances don't pay for that
+        if cls is CountryData and reload_interval is not None:
+            cls = _ReloadingCountryData
+        return super().__new__(cls)
+
+    def _create_reloaded(self):
+        # Return instance with the same settings that doesn't reload itself
+        countrydata = CountryData(
+            filepath=self._filepath,
+            cache_size=self._cache.maxsize,
+            disk_cache=self._disk_cache,
+            compact=self._compact,
+            readonly=self._readonly,
+            instrument=self._instrument,
+            lookup_hook=self._lookup_hook,
+            aliases=self._aliases,
+            shared_file=self._shared_file,
+            executor=self._executor,
+        )
+        # Statistics include lookups of all instances
+        countrydata._stage_stats = self._stage_stats
+        return countrydata
 
     def _load_countries(self):
+        if self._shared_file is not None:
+            self._shared_table = _shared.SharedTable(self._shared_file)
+            self._indexes.update(self._shared_table.indexes)
+            self._regex_literals = self._shared_table.regex_literals
+            return list(self._shared_table.records)
+
+        source_path = self._get_source_path()
+        prebuilt = _prebuilt.read(source_path) if source_path else None
+        if prebuilt:
+            if self._compact:
+                # Keep memory usage low; code indexes are cheap to build and
+                # everything else is only read again when it is needed
+                self._prebuilt_source = source_path
+            else:
+                self._indexes.update(prebuilt['indexes'])
+                self._regex_literals = prebuilt['regex_literals']
+                self._prebuilt = {'names': prebuilt['names'], 'fuzzy': prebuilt['fuzzy']}
+            return self._make_countries(prebuilt['countries'])
+
+        cache_dir = self._get_cache_dir()
+        use_disk_cache = bool(cache_dir and source_path)
+        cached = _diskcache.read(cache_dir, source_path) if use_disk_cache else None
+        if cached:
+            country_list, indexes, self._regex_literals = cached
+            self._indexes.update(indexes)
+        else:
+            country_list = self._read_countries()
+            if use_disk_cache:
+                # Prepare everything that is expensive to compute for the next
+                # process
+                indexes = {
+                    attribute: _build_index(country_list, attribute)
+                    for attribute in _CODE_ATTRIBUTES
+                    if country_list and attribute in country_list[0]
+                }
+                regex_literals = [
+                    _regex.required_literals(info['regex'], re.IGNORECASE)
+                    for info in country_list
+                ]
+                _diskcache.write(cache_dir, source_path, (country_list, indexes, regex_literals))
+
+        return self._make_countries(country_list)
+
+    def _get_prebuilt(self, key):
+        # Return `key` from the prebuilt lookup data or `None`
+        if self._prebuilt is not None:
+            return self._prebuilt[key]
+        elif self._prebuilt_source is not None:
+            prebuilt = _prebuilt.read(self._prebuilt_source)
+            if prebuilt:
+                return prebuilt[key]
+        return None
+
+    def _make_countries(self, country_list):
+        if self._compact:
+            return list(_records.CountryTable(country_list).records)
+        else:
+            # Regular expressions are compiled by _get_country()
+            return country_list
+
+    def _get_country_list(self):
+        # Return country data as it is read from the country data file
+        if self._compact:
+            table = self._countries[0]._table if self._countries else None
+            return table.__reduce__()[1][0] if table else []
+        else:
+            return [
+                {**country, 'regex': country['regex'].pattern}
+                if isinstance(country.get('regex'), re.Pattern) else dict(country)
+                for country in self._countries
+            ]
+
+    @_lazy_load_countries
+    def __getstate__(self):
+        # Pickle country data and indexes instead of the file path, so other
+        # processes (e.g. concurrent.futures.ProcessPoolExecutor workers) don't
+        # read and parse the country data file again. Caches and everything
+        # else that is derived from country data are rebuilt on demand.
+        # `executor` can't be pickled.
+        state = {
+            'filepath': self._filepath,
+            'disk_cache': self._disk_cache,
+            'compact': self._compact,
+            'readonly': self._readonly,
+            'cache_size': self._cache.maxsize,
+            'instrument': self._instrument,
+            'lookup_hook': self._lookup_hook,
+            'aliases': self._aliases,
+            'shared_file': self._shared_file,
+        }
+        if self._shared_file is not None:
+            # Other processes map the same file
+            return state
+
+        if self._regex_literals is None:
+            self._regex_literals = self._get_prebuilt('regex_literals')
+        if self._regex_literals is None:
+            with self._lock:
+                self._regex_literals = [
+                    _regex.required_literals(info['regex'], re.IGNORECASE)
+                    for info in self._get_country_list()
+                ]
+        state['countries'] = self._get_country_list()
+        state['indexes'] = {
+            attribute: self._get_index(attribute)
+            for attribute in _CODE_ATTRIBUTES
+            if attribute in self._countries[0]
+        }
+        state['regex_literals'] = self._regex_literals
+        return state
+
+    def __setstate__(self, state):
+        self.__init__(
+            filepath=state['filepath'],
+            cache_size=state['cache_size'],
+            disk_cache=state['disk_cache'],
+            compact=state['compact'],
+            readonly=state['readonly'],
+            instrument=state['instrument'],
+            lookup_hook=state['lookup_hook'],
+            aliases=state['aliases'],
+            shared_file=state['shared_file'],
+        )
+        if self._shared_file is None:
+            self._indexes.update(state['indexes'])
+            self._regex_literals = state['regex_literals']
+            self._countries = self._make_countries(state['countries'])
+
+    def _read_countries(self):
+        # Only import this when needed because it takes a while
+        import importlib.resources
+        import json
+
         if self._filepath is not None:
             stream = open(self._filepath, 'r')
         else:
@@ -40,12 +376,29 @@ class CountryData:
                 file_path = package_path.joinpath('_countrydata.json')
                 stream = file_path.open('r', encoding='utf8')
 
-        country_list = json.load(stream)
+        with stream:
+            return json.load(stream)
 
-        for info in country_list:
-            info['regex'] = re.compile(info['regex'], flags=re.IGNORECASE)
+    def _get_source_path(self):
+        # Return path of the country data file or `None` if it is not a regular
+        # file (e.g. because the package is zipped)
+        if self._filepath is not None:
+            source_path = os.fspath(self._filepath)
+        else:
+            source_path = os.path.join(os.path.dirname(__file__), '_countrydata.json')
 
-        return country_list
+        if os.path.isfile(source_path):
+            return source_path
+        else:
+            return None
+
+    def _get_cache_dir(self):
+        if self._disk_cache is True:
+            return _diskcache.get_cache_dir()
+        elif self._disk_cache:
+            return os.fspath(self._disk_cache)
+        else:
+            return None
 
     @property
     @_lazy_load_countries
@@ -54,68 +407,258 @@ class CountryData:
         :class:`list` of country :class:`dict` objects
 
         This is the same data that was read from the provided country data file.
+
+        If `readonly` is enabled, this is a :class:`tuple` of the same read-only
+        mappings that lookups return. They are not copied, so this is much
+        faster.
         """
-        return [country.copy() for country in self._countries]
+        if self._readonly:
+            return self._all_countries
+        elif self._compact:
+            # Copy whole columns instead of one value at a time
+            return self._countries[0]._table.get_dicts() if self._countries else []
+        else:
+            return [dict(country) for country in self._all_countries]
+
+    @_cached_property
+    @_lazy_load_countries
+    def _all_countries(self):
+        return tuple(self._get_country(index) for index in range(len(self._countries)))
+
+    def _get_country(self, index):
+        # Return country data at `index` like lookups return it. Compiling all
+        # regular expressions takes a while, so each one is only compiled when
+        # its country is returned for the first time.
+        country = self._countries[index]
+        if self._compact:
+            return country
 
-    @functools.cached_property
+        regex = country.get('regex')
+        if type(regex) is str:
+            country['regex'] = re.compile(regex, flags=re.IGNORECASE)
+
+        if self._readonly:
+            return self._readonly_views[index]
+        else:
+            return country
+
+    @_cached_property
+    @_lazy_load_countries
+    def _readonly_views(self):
+        return tuple(types.MappingProxyType(country) for country in self._countries)
+
+    @_cached_property
     @_lazy_load_countries
     def codes_iso2(self):
         """Sequence of ISO 3166-1 alpha-2 country codes"""
         return tuple(country['iso2'] for country in self._countries)
 
-    @functools.cached_property
+    @_cached_property
     @_lazy_load_countries
     def codes_iso3(self):
         """Sequence of ISO 3166-1 alpha-3 country codes"""
         return tuple(country['iso3'] for country in self._countries)
 
-    @functools.cached_property
+    @_cached_property
     @_lazy_load_countries
     def names_official(self):
         """Sequence of official country names"""
         return tuple(country['name_official'] for country in self._countries)
 
-    @functools.cached_property
+    @_cached_property
     @_lazy_load_countries
     def names_short(self):
         """Sequence of colloqial country names"""
         return tuple(country['name_short'] for country in self._countries)
 
+    @_cached_property
+    @_lazy_load_countries
+    def _regex_index(self):
+        return _regex.RegexIndex(
+            (country['regex'] for country in self._all_countries),
+            literals=self._regex_literals or self._get_prebuilt('regex_literals'),
+        )
+
+    @_cached_property
+    @_lazy_load_countries
+    def _name_index(self):
+        # Map normalized names and aliases to the index of the first country
+        # with that name
+        if self._shared_table is not None:
+            names = self._shared_table.name_index
+        else:
+            names = self._get_prebuilt('names')
+            names = _build_name_index(self._countries) if names is None else dict(names)
+        if not self._aliases:
+            return names
+
+        aliases = {}
+        iso2_index = self._get_index('iso2')
+        for alias, iso2 in self._aliases.items():
+            i = iso2_index.get(_normalize_code(iso2))
+            if i is None:
+                raise RuntimeError(f'Not a ISO 3166-1 alpha-2 country code: {iso2!r}')
+            key = _normalize_name(alias)
+            if key:
+                aliases[key] = i
+        if isinstance(names, dict):
+            names.update(aliases)
+            return names
+        else:
+            # Shared names can't be modified
+            return collections.ChainMap(aliases, names)
+
+    @_lazy_load_countries
+    def preload(self):
+        """
+        Load country data and build all lookup indexes now
+
+        Everything is loaded lazily on demand by default, which makes the first
+        lookups slow. Call this at startup (e.g. of a server) to prevent that.
+
+        It is safe to call this (or anything else) from multiple threads at the
+        same time. Country data is only loaded once.
+        """
+        for attribute in _CODE_ATTRIBUTES:
+            if attribute in self._countries[0]:
+                self._get_index(attribute)
+        self._name_index
+        self._regex_index
+        self._fuzzy_matchers
+        self._mention_scanner
+
+    def _find_country_cached(self, string, regex_map):
+        if self._instrumented:
+            return self._find_country_instrumented(string, regex_map)
+
+        cache = self._cache
+        if cache.maxsize:
+            key = _get_cache_key(string, regex_map)
+            if key is not None:
+                info = cache.get(key, _NOT_CACHED)
+                if info is _NOT_CACHED:
+                    info = self._find_country(string, regex_map=regex_map)
+                    cache.set(key, info)
+                return info
+        return self._find_country(string, regex_map=regex_map)
+
+    @_cached_property
+    @_lazy_load_countries
+    def _fuzzy_matchers(self):
+        # Only import this when needed because it takes a while
+        from . import _fuzzy
+
+        states = self._get_prebuilt('fuzzy')
+        if states is not None:
+            return tuple(_fuzzy.FuzzyMatcher.from_state(state) for state in states)
+
+        # Official names are preferred over short names
+        return (
+            _fuzzy.FuzzyMatcher(self.names_official),
+            _fuzzy.FuzzyMatcher(self.names_short),
+        )
+
+    @_cached_property
     @_lazy_load_countries
+    def _candidate_matcher(self):
+        from . import _fuzzy
+
+        # Official names first, so they win if they are also short names
+        return _fuzzy.FuzzyMatcher(self.names_official + self.names_short)
+
+    def _find_country_instrumented(self, string, regex_map):
+        start = time.perf_counter()
+        cache = self._cache
+        key = _get_cache_key(string, regex_map) if cache.maxsize else None
+        info = _NOT_CACHED if key is None else cache.get(key, _NOT_CACHED)
+        if info is _NOT_CACHED:
+            info, stage = self._find_country_stage(string, regex_map)
+            if key is not None:
+                cache.set(key, info)
+        else:
+            stage = 'cache'
+        elapsed = time.perf_counter() - start
+
+        if self._instrument:
+            self._stage_stats.add(stage, elapsed)
+        if self._lookup_hook is not None:
+            self._lookup_hook(string, stage, elapsed)
+        return info
+
     def _find_country(self, string, regex_map=None):
+        info, _ = self._find_country_stage(string, regex_map)
+        return info
+
+    @_lazy_load_countries
+    def _find_country_stage(self, string, regex_map, fuzzy=True):
+        # Return country data (or `None`) and name of the stage that found it.
+        # Without `fuzzy`, stop before fuzzy matching and return `None` as
+        # stage if nothing was found.
+
         # ISO 3166-1 alpha-2
         if len(string) == 2:
-            info = self._find_country_by_code(string, self.codes_iso2)
+            info = self._find_country_by_code(string, 'iso2')
             if info:
-                return info
+                return info, 'iso2'
 
         # ISO 3166-1 alpha-3
         if len(string) == 3:
-            info = self._find_country_by_code(string, self.codes_iso3)
+            info = self._find_country_by_code(string, 'iso3')
             if info:
-                return info
+                return info, 'iso3'
+
+        # Finding out that nothing matches is the most expensive lookup, so
+        # misses are always remembered, even if `cache_size` is 0. Making a key
+        # from the items of a regex_map dict takes about as long as searching
+        # them, so only RegexMap objects are supported.
+        if not regex_map or isinstance(regex_map, _regex.RegexMap):
+            miss_key = _get_cache_key(string, regex_map)
+        else:
+            miss_key = None
+        if miss_key is not None and self._miss_cache.get(miss_key):
+            return None, 'miss'
 
         # Custom regular expressions
-        if regex_map:
+        if isinstance(regex_map, _regex.RegexMap):
+            iso2 = regex_map.search(string)
+            if iso2 is not None:
+                return self._find_country_by_code(iso2, 'iso2'), 'regex_map'
+            # Every RegexMap is only validated once until it is modified
+            if self not in regex_map._validated_by:
+                self._validate_regex_map(regex_map)
+                regex_map._validated_by.add(self)
+        elif regex_map:
             for iso2, regex in regex_map.items():
                 if regex.search(string):
-                    return self._find_country_by_code(iso2, self.codes_iso2)
+                    return self._find_country_by_code(iso2, 'iso2'), 'regex_map'
             # Because validation is expensive, we only do it if we couldn't find
             # a match
             self._validate_regex_map(regex_map)
 
+        # Exact name or alias, ignoring case, accents, punctuation and
+        # whitespace
+        index = self._name_index.get(_normalize_name(string))
+        if index is not None:
+            return self._get_country(index), 'name'
+
         # Hardcoded regular expressions
-        for info in self._countries:
-            if info['regex'].search(string):
-                return info
+        index = self._regex_index.search(string)
+        if index is not None:
+            return self._get_country(index), 'regex'
+
+        if not fuzzy:
+            return None, None
 
         # Fuzzy country name
-        for names in (self.names_official, self.names_short):
-            matches = difflib.get_close_matches(string, names, n=1, cutoff=0.8)
+        for matcher, stage in zip(self._fuzzy_matchers, ('fuzzy_official', 'fuzzy_short')):
+            matches = matcher.matches(string, n=1, cutoff=0.8)
             if matches:
-                name = matches[0]
-                index = names.index(name)
-                return self._countries[index]
+                _, index = matches[0]
+                return self._get_country(index), stage
+
+        if miss_key is not None:
+            self._miss_cache.set(miss_key, True)
+        return None, 'miss'
 
     def _validate_regex_map(self, regex_map):
         if not isinstance(regex_map, collections.abc.Mapping):
@@ -128,37 +671,558 @@ class CountryData:
             elif not isinstance(regex, re.Pattern):
                 raise RuntimeError(f'Not a regular expression (see re.compile()): {regex!r}')
 
-    def _find_country_by_code(self, code, codes):
+    def _find_country_by_code(self, code, attribute):
+        index = self._get_index(attribute).get(_normalize_code(code, attribute))
+        if index is not None:
+            return self._get_country(index)
+
+    @_lazy_load_countries
+    def _get_index(self, attribute):
         try:
-            index = codes.index(code.upper())
-        except ValueError:
-            pass
+            return self._indexes[attribute]
+        except KeyError:
+            with self._lock:
+                index = self._indexes.get(attribute)
+                if index is None:
+                    index = self._indexes[attribute] = _build_index(self._countries, attribute)
+                return index
+
+    @_lazy_load_countries
+    def find_by(self, attribute, value, default=None):
+        """
+        Return country data with exact `attribute` `value`
+
+        This is much faster than :meth:`get` if you know the classification
+        scheme of `value`. It is useful for code attributes like ``iso2``,
+        ``iso3``, ``isonumeric``, ``uncode``, ``faocode``, ``gbdcode``,
+        ``cctld``, ``gwcode``, ``daccode`` or ``eora``.
+
+        :param str attribute: Key in the country data
+        :param value: Value of `attribute`
+
+            Strings are matched case-insensitively. Numeric codes may also be
+            given as :class:`int` or integral :class:`float`, and leading zeros are ignored (``"040"``,
+            ``"40"`` and ``40`` are the same). A leading dot of ``cctld``
+            values is ignored (``".de"`` and ``"de"`` are the same).
+
+            If multiple countries have the same `value`, the first one is
+            returned.
+
+        :param default: Default return value if no country has `value`
+
+        :raise AttributeError: if `attribute` does not exist
+        """
+        if attribute not in self._countries[0]:
+            raise AttributeError(attribute)
+
+        info = self._find_country_by_code(value, attribute)
+        if info:
+            return info
         else:
-            return self._countries[index]
+            return default
 
     def get(self, country, default=None, regex_map=None):
         """
-        Return country data as :class:`dict`
+        Return country data as :class:`dict` (or :class:`~.Country` if
+        `compact` is enabled or :class:`types.MappingProxyType` if `readonly`
+        is enabled)
 
         :param str country: Country name, 2-letter code or 3-letter code
 
             This is case-insensitive.
 
-            If a country name is provided, it is first matched against the
-            regular expressions. If that fails,
-            :func:`difflib.get_close_matches` is used for fuzzy matching.
+            If a country name is provided, it is first compared to official
+            names, short names and `aliases`, ignoring case, accents,
+            punctuation and whitespace. Then it is matched against the
+            regular expressions. If that fails, it is fuzzy matched against
+            official and short names with the same similarity measure as
+            :func:`difflib.get_close_matches`.
 
         :param default: Default return value if `country` is not found
         :param dict regex_map: Map ISO 3166-1 alpha-2 country codes
             (:class:`str`) to regular expressions (:class:`re.Pattern`, see
             :func:`re.compile`)
+
+            Use a :class:`~.RegexMap` if you pass the same map many times.
+        """
+        info = self._find_country_cached(country, regex_map)
+        if info:
+            return info
+        else:
+            return default
+
+    @_lazy_load_countries
+    def get_many(self, countries, default=None, regex_map=None, attribute=None):
+        """
+        Return :class:`list` of country data for each item in `countries`
+
+        This is equivalent to calling :meth:`get` for each item, but every
+        distinct item is only looked up once, which is much faster if
+        `countries` contains many duplicates.
+
+        :param countries: Iterable of country names, 2-letter codes or 3-letter
+            codes
+        :param default: Default value for any item that is not found
+        :param dict regex_map: See :meth:`get`
+        :param str attribute: Return only this attribute for each found country
+            instead of the whole country data
+
+        :raise AttributeError: if `attribute` does not exist
+        """
+        if attribute is not None and attribute not in self._countries[0]:
+            raise AttributeError(attribute)
+
+        results = {}
+        resolved = []
+        for country in countries:
+            try:
+                result = results[country]
+            except KeyError:
+                info = self._find_country_cached(country, regex_map)
+                if not info:
+                    result = default
+                elif attribute is not None:
+                    result = info[attribute]
+                else:
+                    result = info
+                results[country] = result
+            resolved.append(result)
+        return resolved
+
+    async def aget(self, country, default=None, regex_map=None):
         """
-        info = self._find_country(country, regex_map=regex_map)
+        Asynchronous version of :meth:`get`
+
+        Codes and cached results are returned immediately. Everything else
+        (e.g. loading country data, regular expressions and fuzzy matching) is
+        done in `executor`, so the event loop isn't blocked. Concurrent lookups
+        of the same `country` are only done once.
+        """
+        info = await self._afind_country(country, regex_map)
         if info:
             return info
         else:
             return default
 
+    async def aget_many(self, countries, default=None, regex_map=None, attribute=None):
+        """
+        Asynchronous version of :meth:`get_many`
+
+        Distinct items are looked up concurrently like :meth:`aget` does.
+        """
+        import asyncio
+
+        if not self._countries:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._executor, self.preload)
+        if attribute is not None and attribute not in self._countries[0]:
+            raise AttributeError(attribute)
+
+        countries = list(countries)
+        distinct = list(dict.fromkeys(countries))
+        infos = await asyncio.gather(*(self._afind_country(country, regex_map) for country in distinct))
+        results = {}
+        for country, info in zip(distinct, infos):
+            if not info:
+                results[country] = default
+            elif attribute is not None:
+                results[country] = info[attribute]
+            else:
+                results[country] = info
+        return [results[country] for country in countries]
+
+    async def _afind_country(self, string, regex_map):
+        if self._is_cheap(string, regex_map):
+            return self._find_country_cached(string, regex_map)
+
+        # Only import this when needed because it takes a while
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        key = _get_cache_key(string, regex_map)
+        if key is None:
+            return await loop.run_in_executor(self._executor, self._find_country_cached, string, regex_map)
+
+        # Futures belong to one event loop, but instances may be shared
+        # between threads that run different event loops
+        in_flight_key = (loop, key)
+        future = self._in_flight.get(in_flight_key)
+        if future is None:
+            future = loop.run_in_executor(self._executor, self._find_country_cached, string, regex_map)
+            self._in_flight[in_flight_key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(in_flight_key, None))
+        # Cancelling one caller must not cancel the lookup for the others
+        return await asyncio.shield(future)
+
+    def _is_cheap(self, string, regex_map):
+        # Whether looking up `string` won't block the event loop noticeably
+        if not self._countries or not isinstance(string, str):
+            return False
+        key = _get_cache_key(string, regex_map)
+        if key is not None:
+            if self._cache.maxsize and key in self._cache:
+                return True
+            if (not regex_map or isinstance(regex_map, _regex.RegexMap)) and key in self._miss_cache:
+                return True
+        if len(string) == 2:
+            return _normalize_code(string) in self._get_index('iso2')
+        if len(string) == 3:
+            return _normalize_code(string) in self._get_index('iso3')
+        return False
+
+    @_lazy_load_countries
+    def candidates(self, query, k=5, cutoff=0.6, regex_map=None):
+        """
+        Return :class:`list` of up to `k` countries that `query` might refer
+        to, best match first
+
+        Each item is a :func:`~collections.namedtuple` with the attributes
+        ``country`` (country data like :meth:`get` returns it), ``score``
+        (similarity between 0 and 1) and ``stage`` (see :meth:`stage_info`).
+
+        A country that is found by code, name or regular expression comes
+        first with a score of 1.0. Other countries are fuzzy matched against
+        official and short names at once, and their score is the similarity
+        of their most similar name.
+
+        :param str query: Country name, 2-letter code or 3-letter code
+        :param int k: Maximum number of candidates
+        :param float cutoff: Minimum similarity of fuzzy matches between 0 and
+            1 (:meth:`get` uses 0.8)
+        :param dict regex_map: See :meth:`get`
+
+        :raise ValueError: if `k` or `cutoff` is out of range
+        """
+        if not k > 0:
+            raise ValueError(f'k must be > 0: {k!r}')
+
+        candidates = []
+        seen = set()
+        info, stage = self._find_country_stage(query, regex_map, fuzzy=False)
+        if info:
+            candidates.append(Candidate(info, 1.0, stage))
+            seen.add(id(info))
+
+        # Every country has two names, so the best 2 * k names belong to at
+        # least k countries
+        official_count = len(self.names_official)
+        for score, index in self._candidate_matcher.matches(query, n=2 * k, cutoff=cutoff):
+            if len(candidates) >= k:
+                break
+            if index < official_count:
+                stage = 'fuzzy_official'
+            else:
+                stage = 'fuzzy_short'
+                index -= official_count
+            info = self._get_country(index)
+            if id(info) not in seen:
+                candidates.append(Candidate(info, score, stage))
+                seen.add(id(info))
+        return candidates
+
+    @_lazy_load_countries
+    def find_all(self, text):
+        """
+        Return :class:`list` of countries that are mentioned in `text`
+
+        Each item is a :func:`~collections.namedtuple` with the attributes
+        ``country`` (country data like :meth:`get` returns it), ``start`` and
+        ``end`` (position of the mention in `text`) and ``stage`` (``"name"``
+        or ``"regex"``, see :meth:`stage_info`). Mentions are ordered by
+        position and don't overlap.
+
+        `text` is scanned once for official names, short names and aliases,
+        which are matched like :meth:`get` matches them, and for words that
+        the built-in regular expressions are looking for (e.g. "Afghan" or
+        "Argentine"). Each regular expression is only searched in the three
+        words before and after such a word. Abbreviations that regular
+        expressions only accept as the whole string (e.g. "USA") are not
+        found, but they can be added as `aliases`.
+
+        Scanning takes linear time, so this is also suitable for very long
+        texts. Codes and fuzzy matches are not found. Words and gaps between
+        words that are longer than 100 characters (e.g. encoded data) are
+        skipped, and mentions don't span them.
+
+        :param str text: Any text
+        """
+        return list(self.find_iter((text,)))
+
+    def find_iter(self, chunks):
+        """
+        Same as :meth:`find_all`, but read text from an iterable of strings
+        and return an iterator
+
+        Chunks are scanned as if they were concatenated, so mentions can span
+        chunks, and ``start`` and ``end`` are positions in the concatenated
+        text. Only the last few words are kept in memory, so this is suitable
+        for reading files line by line or in blocks of any size.
+
+        :param chunks: Iterable of :class:`str` objects
+        """
+        scanner = self._mention_scanner
+        for mention in scanner.scan(chunks):
+            yield mention._replace(country=self._get_country(mention.country))
+
+    @_cached_property
+    @_lazy_load_countries
+    def _mention_scanner(self):
+        patterns = self._regex_index._patterns
+        return _mentions.MentionScanner(
+            names=self._name_index,
+            patterns=patterns,
+            literals=[_regex.any_literals(pattern.pattern, pattern.flags) for pattern in patterns],
+            normalize=_normalize_name,
+        )
+
+    @_lazy_load_countries
+    def convert(self, values, src=None, to='iso3', default=None, regex_map=None):
+        """
+        Translate `values` from one classification scheme to another
+
+        Return :class:`list` with one result for each item in `values`.
+
+        :param values: Iterable of codes or names, e.g. a :class:`list`,
+            :class:`tuple`, NumPy array or any object that supports the buffer
+            protocol (e.g. :class:`array.array` of numeric codes)
+        :param str src: Attribute that `values` are from (e.g. ``"iso2"`` or
+            ``"isonumeric"``) or `None` to identify each item like :meth:`get`
+
+            Values that are not found in `src` are identified like :meth:`get`
+            if they are strings.
+
+        :param str to: Attribute to return for each item
+        :param default: Default value for any item that is not found
+        :param dict regex_map: See :meth:`get`
+
+        :raise AttributeError: if `src` or `to` does not exist
+        """
+        if isinstance(values, (str, bytes, bytearray)):
+            raise TypeError(f'Expected iterable of values, not string: {values!r}')
+        for attribute in (src, to):
+            if attribute is not None and attribute not in self._countries[0]:
+                raise AttributeError(attribute)
+
+        values = _get_iterable(values)
+        if src is None:
+            return self.get_many(values, default=default, regex_map=regex_map, attribute=to)
+
+        table = self._get_translation(src, to)
+        fallbacks = {}
+        converted = []
+        for value in values:
+            try:
+                result = table[_normalize_code(value, src)]
+            except KeyError:
+                try:
+                    result = fallbacks[value]
+                except KeyError:
+                    info = self._find_country_cached(value, regex_map) if isinstance(value, str) else None
+                    result = fallbacks[value] = info[to] if info else default
+            converted.append(result)
+        return converted
+
+    def _get_translation(self, src, to):
+        # Map normalized `src` values to `to` values
+        try:
+            return self._translations[(src, to)]
+        except KeyError:
+            with self._lock:
+                table = self._translations.get((src, to))
+                if table is None:
+                    # Regular expressions are only compiled if they are requested
+                    countries = self._all_countries if to == 'regex' else self._countries
+                    table = self._translations[(src, to)] = {
+                        key: countries[index][to]
+                        for key, index in self._get_index(src).items()
+                    }
+                return table
+
+    @_lazy_load_countries
+    def members(self, group, value=None):
+        """
+        Return :class:`~.Group` of countries that belong to `group`
+
+        Groups are cached, so this is very fast after the first call for each
+        `group` and `value`. Use set operations to combine groups, e.g.
+        ``members("eu") - members("euro")``.
+
+        :param str group: Key in the country data, e.g. ``"eu"``, ``"euro"``,
+            ``"oecd"``, ``"g20"``, ``"schengen"`` or ``"un"``
+        :param value: Value of `group` or `None` for any non-empty value (e.g.
+            year of accession)
+
+            This is also useful for other attributes, e.g.
+            ``members("continent", "Europe")``.
+
+        :raise AttributeError: if `group` does not exist
+        """
+        if group not in self._countries[0]:
+            raise AttributeError(group)
+
+        key = (group, value)
+        try:
+            mask = self._group_masks[key]
+        except KeyError:
+            with self._lock:
+                mask = self._group_masks.get(key)
+                if mask is None:
+                    mask = self._group_masks[key] = _groups.get_mask(self._countries, group, value)
+        return _groups.Group(self, mask)
+
+    def is_member(self, country, group, value=None):
+        """
+        Whether `country` belongs to `group`
+
+        :param country: Country name or code (see :meth:`get`) or country data
+            returned by a lookup
+        :param group: Key in the country data (see :meth:`members`) or
+            :class:`~.Group`
+        :param value: See :meth:`members`
+
+        :raise AttributeError: if `group` does not exist
+        """
+        if not isinstance(group, _groups.Group):
+            group = self.members(group, value)
+        return country in group
+
+    def _get_position(self, country):
+        # Return index of `country` (see is_member()) or `None` if it is unknown
+        if isinstance(country, str):
+            country = self._find_country_cached(country, None)
+            if country is None:
+                return None
+        index = self._positions.get(id(country))
+        if index is None and isinstance(country, collections.abc.Mapping):
+            # Copy, e.g. from `countries`
+            index = self._get_index('iso3').get(_normalize_code(country.get('iso3')))
+        return index
+
+    @_cached_property
+    @_lazy_load_countries
+    def _positions(self):
+        # Map id() of country data like lookups return it to its index
+        if self._readonly and not self._compact:
+            countries = self._readonly_views
+        else:
+            countries = self._countries
+        return {id(country): index for index, country in enumerate(countries)}
+
+    @property
+    def cache_size(self):
+        """
+        Maximum number of lookup results to remember
+
+        Setting this to `0` or `None` disables the cache.
+        """
+        return self._cache.maxsize
+
+    @cache_size.setter
+    def cache_size(self, cache_size):
+        self._cache.maxsize = cache_size
+
+    def cache_info(self):
+        """
+        Return lookup result cache statistics
+
+        The return value is a :func:`~collections.namedtuple` with the
+        attributes ``hits``, ``misses``, ``evictions``, ``maxsize`` and
+        ``currsize``.
+        """
+        return self._cache.info()
+
+    def cache_clear(self):
+        """Forget all lookup results and reset :meth:`cache_info`"""
+        self._cache.clear()
+        self._miss_cache.clear()
+
+    @property
+    def instrument(self):
+        """Whether lookups are counted and timed per stage (see :meth:`stage_info`)"""
+        return self._instrument
+
+    @instrument.setter
+    def instrument(self, instrument):
+        self._instrument = bool(instrument)
+        self._instrumented = self._instrument or self._lookup_hook is not None
+
+    @property
+    def lookup_hook(self):
+        """
+        Callable that is called after every lookup or `None`
+
+        It gets the query, the name of the stage that resolved it and the
+        duration of the lookup in seconds.
+        """
+        return self._lookup_hook
+
+    @lookup_hook.setter
+    def lookup_hook(self, lookup_hook):
+        self._lookup_hook = lookup_hook
+        self._instrumented = self._instrument or self._lookup_hook is not None
+
+    @property
+    def executor(self):
+        """
+        :class:`concurrent.futures.Executor` that runs lookups that might block
+        the event loop (see :meth:`aget`) or `None` to use the default executor
+        of the event loop
+        """
+        return self._executor
+
+    @executor.setter
+    def executor(self, executor):
+        self._executor = executor
+
+    def stage_info(self):
+        """
+        Return lookup statistics per stage
+
+        The return value is a :class:`dict` that maps stage names to
+        :func:`~collections.namedtuple` objects with the attributes ``count``
+        (number of lookups resolved by that stage) and ``seconds`` (cumulative
+        duration of those lookups). Stages are in the order they are tried:
+
+        ``cache``
+            Result was cached (see `cache_size`)
+        ``iso2``, ``iso3``
+            ISO 3166-1 alpha-2 or alpha-3 code
+        ``regex_map``
+            Custom regular expression (see :meth:`get`)
+        ``name``
+            Official name, short name or alias (see `aliases`)
+        ``regex``
+            Built-in regular expression
+        ``fuzzy_official``, ``fuzzy_short``
+            Fuzzy matched official or short name
+        ``miss``
+            No country was found
+
+        Lookups are only counted if `instrument` is enabled.
+        """
+        return self._stage_stats.info()
+
+    def stage_clear(self):
+        """Reset :meth:`stage_info`"""
+        self._stage_stats.clear()
+
+    def reload_info(self):
+        """
+        Return statistics of reloading country data (see `reload_interval`)
+
+        The return value is a :func:`~collections.namedtuple` with the
+        attributes ``reloads`` (number of times country data was replaced),
+        ``failures`` (number of times the country data file couldn't be read
+        or loaded), ``seconds`` (duration of the last reload, including
+        building all indexes) and ``error`` (exception of the last failure or
+        `None` if country data was reloaded successfully since then).
+
+        :raise RuntimeError: if `reload_interval` is `None`
+        """
+        if self._reloader is None:
+            raise RuntimeError('Reloading is disabled')
+        return self._reloader.info()
+
     def __getitem__(self, country):
         info = self.get(country)
         if info:
@@ -180,3 +1244,232 @@ class CountryData:
             return info[attribute]
 
         return get_attribute
+
+
+class _ReloadingCountryData(CountryData):
+    # CountryData with `reload_interval` that does everything with the current
+    # instance of its reloader, which doesn't reload itself. Each call uses one
+    # instance, so all of its work is done with the same country data, and
+    # this instance never loads any country data.
+
+    def __reduce__(self):
+        # Pickled copies don't reload country data
+        return (_unpickle, (self._reloader.get_current().__getstate__(),))
+
+    def __getattr__(self, attribute):
+        return getattr(self._reloader.get_current(), attribute)
+
+
+def _unpickle(state):
+    countrydata = CountryData.__new__(CountryData)
+    countrydata.__setstate__(state)
+    return countrydata
+
+
+def _redirect_method(name):
+    func = getattr(CountryData, name)
+
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        return func(self._reloader.get_current(), *args, **kwargs)
+
+    setattr(_ReloadingCountryData, name, wrapper)
+
+
+def _redirect_coroutine_method(name):
+    # Keep inspect.iscoroutinefunction() working
+    func = getattr(CountryData, name)
+
+    @functools.wraps(func)
+    async def wrapper(self, *args, **kwargs):
+        return await func(self._reloader.get_current(), *args, **kwargs)
+
+    setattr(_ReloadingCountryData, name, wrapper)
+
+
+def _redirect_property(name):
+    def fget(self):
+        return getattr(self._reloader.get_current(), name)
+
+    setattr(_ReloadingCountryData, name, property(fget, doc=getattr(CountryData, name).__doc__))
+
+
+def _redirect_setting(name):
+    # Settings are kept by the reloading instance for new instances and applied
+    # to the current instance
+    setting = getattr(CountryData, name)
+
+    def fset(self, value):
+        setting.fset(self, value)
+        setting.fset(self._reloader.get_current(), value)
+
+    setattr(_ReloadingCountryData, name, setting.setter(fset))
+
+
+for _name in (
+    'preload', 'find_by', 'get', 'get_many', 'candidates', 'find_all', 'find_iter', 'convert', 'members',
+    'is_member', 'cache_info', 'cache_clear', '__getitem__', '_find_country_stage',
+):
+    _redirect_method(_name)
+for _name in ('aget', 'aget_many'):
+    _redirect_coroutine_method(_name)
+for _name in ('countries', 'codes_iso2', 'codes_iso3', 'names_official', 'names_short'):
+    _redirect_property(_name)
+for _name in ('cache_size', 'instrument', 'lookup_hook', 'executor'):
+    _redirect_setting(_name)
+del _name
+
+
+def build_shared_file(path, filepath=None):
+    """
+    Write country data and indexes to a file that many processes can share
+
+    Pass `path` as `shared_file` to :class:`CountryData` in every process. The
+    file must be built again if the country data file or the version of this
+    package changes.
+
+    :param path: Path of the new file; an existing file is replaced atomically
+    :param filepath: Path to JSON file or `None` to use the packaged file
+    """
+    country_list = CountryData(filepath, disk_cache=False)._read_countries()
+    indexes = {
+        attribute: _build_index(country_list, attribute)
+        for attribute in _CODE_ATTRIBUTES
+        if country_list and attribute in country_list[0]
+    }
+    regex_literals = [
+        _regex.required_literals(info['regex'], re.IGNORECASE)
+        for info in country_list
+    ]
+    _shared.write(os.fspath(path), country_list, indexes, _build_name_index(country_list), regex_literals)
+
+
+def write_prebuilt(filepath=None):
+    """
+    Validate country data and store everything that is derived from it next to
+    it (see :mod:`._prebuilt`)
+
+    :class:`CountryData` uses the prebuilt lookup data instead of parsing
+    `filepath` and building indexes as long as `filepath` doesn't change.
+
+    :param filepath: Path to JSON file or `None` to use the packaged file
+
+    :raise RuntimeError: if any regular expression is invalid
+    """
+    from . import _fuzzy
+
+    countrydata = CountryData(filepath, disk_cache=False)
+    source_path = countrydata._get_source_path()
+    if source_path is None:
+        raise RuntimeError(f'Not a regular file: {filepath}')
+
+    country_list = countrydata._read_countries()
+    for info in country_list:
+        try:
+            re.compile(info['regex'], flags=re.IGNORECASE)
+        except re.error as e:
+            raise RuntimeError(f'Invalid regular expression for {info.get("name_short")!r}: {e}') from None
+
+    _prebuilt.write(source_path, {
+        'countries': country_list,
+        'indexes': {
+            attribute: _build_index(country_list, attribute)
+            for attribute in _CODE_ATTRIBUTES
+            if country_list and attribute in country_list[0]
+        },
+        'regex_literals': [
+            _regex.required_literals(info['regex'], re.IGNORECASE)
+            for info in country_list
+        ],
+        'names': _build_name_index(country_list),
+        'fuzzy': [
+            _fuzzy.FuzzyMatcher([info['name_official'] for info in country_list]).get_state(),
+            _fuzzy.FuzzyMatcher([info['name_short'] for info in country_list]).get_state(),
+        ],
+    })
+
+
+def _get_cache_key(string, regex_map):
+    # Return hashable key for lookup result or `None` if the result can't be
+    # cached. `regex_map` is mutable, so we must use its current content. Order
+    # matters because the first matching regular expression wins.
+    if not regex_map:
+        return (string, _NO_REGEX_MAP)
+    if isinstance(regex_map, _regex.RegexMap):
+        # The token changes whenever the map is modified
+        return (string, regex_map._token)
+    try:
+        key = (string, tuple(regex_map.items()))
+        hash(key)
+    except (AttributeError, TypeError):
+        return None
+    else:
+        return key
+
+
+def _build_index(countries, attribute):
+    # Map normalized `attribute` values to the index of the first country with
+    # that value
+    index = {}
+    for i, country in enumerate(countries):
+        key = _normalize_code(country.get(attribute), attribute)
+        if key:
+            index.setdefault(key, i)
+    return index
+
+
+def _build_name_index(countries):
+    # Map normalized official and short names to the index of the first country
+    # with that name
+    index = {}
+    for i, country in enumerate(countries):
+        for attribute in ('name_official', 'name_short'):
+            name = country.get(attribute)
+            if isinstance(name, str):
+                index.setdefault(_normalize_name(name), i)
+    index.pop('', None)
+    return index
+
+
+def _get_iterable(values):
+    # NumPy arrays (and similar) provide tolist(), which converts items to
+    # native Python objects (e.g. numpy.int64 to int)
+    tolist = getattr(values, 'tolist', None)
+    if callable(tolist):
+        return tolist()
+
+    try:
+        # Buffer protocol (e.g. array.array or memoryview)
+        return memoryview(values).tolist()
+    except TypeError:
+        return values
+
+
+def _normalize_code(code, attribute=None):
+    # Return `code` as a case-insensitive and zero-padding-insensitive string or
+    # `None` if `code` can't be a code
+    if isinstance(code, str):
+        if attribute == 'cctld':
+            # Top-level domains are often written with their dot (".de")
+            code = code.lstrip('.')
+        if code.isdecimal() and code.isascii():
+            return str(int(code))
+        else:
+            return code.upper()
+    elif isinstance(code, int) and not isinstance(code, bool):
+        return str(code)
+    elif isinstance(code, float) and code.is_integer():
+        # Numeric columns with missing values (NaN) are float arrays
+        return str(int(code))
+    else:
+        return None
+
+
+def _normalize_name(name):
+    # Return `name` without case, accents, punctuation and repeated whitespace
+    if not name.isascii():
+        name = ''.join(
+            char for char in unicodedata.normalize('NFKD', name)
+            if not unicodedata.combining(char)
+        )
+    return _NAME_PUNCTUATION.sub(' ', name.casefold()).strip()
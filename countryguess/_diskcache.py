@@ -0,0 +1,103 @@
+import marshal
+import os
+import sys
+import zlib
+
+from . import __project_name__, __version__
+
+# Increase this when the cached data changes
+_FORMAT_VERSION = 2
+
+
+def get_cache_dir():
+    """
+    Return directory for cache files or `None` if caching is disabled
+
+    The environment variable ``COUNTRYGUESS_CACHE_DIR`` overrides the default
+    location. Any non-empty value of ``COUNTRYGUESS_NO_DISK_CACHE`` disables
+    caching.
+    """
+    if os.environ.get('COUNTRYGUESS_NO_DISK_CACHE'):
+        return None
+
+    cache_dir = os.environ.get('COUNTRYGUESS_CACHE_DIR')
+    if cache_dir:
+        return cache_dir
+
+    if sys.platform == 'win32':
+        base_dir = os.environ.get('LOCALAPPDATA') or os.path.expanduser(r'~\AppData\Local')
+    elif sys.platform == 'darwin':
+        base_dir = os.path.expanduser('~/Library/Caches')
+    else:
+        base_dir = os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache')
+    return os.path.join(base_dir, __project_name__)
+
+
+def read(cache_dir, source_path):
+    """
+    Return data that was cached for `source_path` or `None`
+
+    `None` is also returned if `source_path` was modified after the data was
+    cached or if the cache file is unreadable.
+    """
+    try:
+        with open(_get_cache_path(cache_dir, source_path), 'rb') as f:
+            # marshal.load() reads in tiny chunks, which is much slower
+            header, data = marshal.loads(f.read())
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if header == _get_header(source_path):
+        return data
+    else:
+        return None
+
+
+def write(cache_dir, source_path, data):
+    """
+    Cache `data` for `source_path`
+
+    `data` may only contain built-in types that are supported by
+    :mod:`marshal`. Errors are ignored because caching is optional.
+    """
+    try:
+        header = _get_header(source_path)
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Only import this when needed because it takes a while
+        import tempfile
+
+        # Write to temporary file first so other processes never read
+        # incomplete data
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, prefix='.tmp.')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                marshal.dump((header, data), f)
+            os.replace(tmp_path, _get_cache_path(cache_dir, source_path))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except (OSError, ValueError):
+        pass
+
+
+def _get_cache_path(cache_dir, source_path):
+    # Different paths with the same checksum only overwrite each other's cache
+    # file because the path is also part of the header. hashlib would be
+    # better, but it is slow to import.
+    source_path = os.path.abspath(source_path)
+    checksum = zlib.crc32(source_path.encode('utf-8', errors='surrogateescape'))
+    return os.path.join(cache_dir, f'{checksum:08x}.marshal')
+
+
+def _get_header(source_path):
+    # marshal format and country data format may change between versions
+    stat = os.stat(source_path)
+    return (
+        _FORMAT_VERSION,
+        __version__,
+        sys.version_info[:2],
+        os.path.abspath(source_path),
+        stat.st_mtime_ns,
+        stat.st_size,
+    )
@@ -0,0 +1,218 @@
+import collections
+import os
+import re
+
+from . import _cache
+
+# Formats by file name extension
+_EXTENSIONS = {
+    '.csv': 'csv',
+    '.tsv': 'tsv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+}
+
+# Maximum number of distinct values that are remembered across chunks
+_MAX_RESOLVED = 100000
+
+# Value in the result cache for values that were not looked up yet
+_NOT_RESOLVED = object()
+
+# Country data of the current worker process (see _init_worker())
+_worker_countrydata = None
+
+
+def enrich(path_in, path_out, column, attributes=('iso3',), workers=None, format=None, chunk_size=10000,
+           countrydata=None):
+    """
+    Add country attributes to each row of a CSV, TSV or JSON Lines file
+
+    The input file is read in chunks of `chunk_size` rows, so files of any size
+    can be processed with constant memory. Distinct values in each chunk are
+    looked up in `workers` processes, which load country data only once, and
+    rows are written in the same order as they were read.
+
+    :param path_in: Path of the input file
+    :param path_out: Path of the output file
+    :param str column: Name of the column (CSV, TSV) or key (JSON Lines) that
+        contains country names or codes (see :meth:`.CountryData.get`)
+    :param attributes: Sequence of country data keys that are added to each row
+        (values are empty or ``null`` if no country is found)
+    :param int workers: Number of worker processes or `None` to use one per CPU
+        (see :func:`os.cpu_count`); `0` or `1` looks up countries in the
+        current process
+    :param str format: ``"csv"``, ``"tsv"``, ``"jsonl"`` or `None` to guess it
+        from the file name extension of `path_in`
+    :param int chunk_size: Number of rows per chunk
+    :param countrydata: :class:`~.CountryData` instance or `None` to use the
+        built-in country data
+
+    :raise ValueError: if `format` is unknown or `column` is not in the CSV
+        or TSV header
+    :raise AttributeError: if any of `attributes` does not exist
+    :raise OSError: if reading or writing fails
+    """
+    if format is None:
+        extension = os.path.splitext(os.fspath(path_in))[1].lower()
+        format = _EXTENSIONS.get(extension)
+        if format is None:
+            raise ValueError(f'Unknown file format: {os.fspath(path_in)}')
+    elif format not in ('csv', 'tsv', 'jsonl'):
+        raise ValueError(f'Unknown file format: {format}')
+    if chunk_size < 1:
+        raise ValueError(f'Chunk size must be positive: {chunk_size}')
+
+    if countrydata is None:
+        from ._countrydata import CountryData
+        countrydata = CountryData(readonly=True)
+    attributes = tuple(attributes)
+    known_attributes = countrydata.countries[0]
+    for attribute in attributes:
+        if attribute not in known_attributes:
+            raise AttributeError(attribute)
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    # Only import this when needed because it takes a while
+    import concurrent.futures
+
+    with open(path_in, 'r', encoding='utf-8', newline='') as stream_in:
+        with open(path_out, 'w', encoding='utf-8', newline='') as stream_out:
+            if workers > 1:
+                # Every worker gets a pickled copy of `countrydata`, which
+                # includes parsed country data and indexes
+                with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers,
+                    initializer=_init_worker,
+                    initargs=(countrydata,),
+                ) as executor:
+                    def submit(values):
+                        return executor.submit(_resolve, values, attributes)
+
+                    _enrich_stream(format, stream_in, stream_out, column, attributes,
+                                   submit, chunk_size, max_pending=workers * 2)
+            else:
+                def submit(values):
+                    future = concurrent.futures.Future()
+                    future.set_result(_resolve(values, attributes, countrydata))
+                    return future
+
+                _enrich_stream(format, stream_in, stream_out, column, attributes,
+                               submit, chunk_size, max_pending=0)
+
+
+def _enrich_stream(format, stream_in, stream_out, column, attributes, submit, chunk_size, max_pending):
+    if format == 'jsonl':
+        import json
+
+        def get_value(row):
+            value = row.get(column)
+            return value if value is None or isinstance(value, str) else str(value)
+
+        rows = (json.loads(line) for line in stream_in if line.strip())
+        for row, result in _resolve_rows(rows, get_value, submit, chunk_size, max_pending):
+            for attribute, value in zip(attributes, result or (None,) * len(attributes)):
+                row[attribute] = value
+            stream_out.write(json.dumps(row, ensure_ascii=False) + '\n')
+
+    else:
+        import csv
+
+        delimiter = '\t' if format == 'tsv' else ','
+        reader = csv.reader(stream_in, delimiter=delimiter)
+        writer = csv.writer(stream_out, delimiter=delimiter, lineterminator='\n')
+        header = next(reader, None)
+        if header is None:
+            return
+        try:
+            position = header.index(column)
+        except ValueError:
+            raise ValueError(f'No such column: {column}') from None
+        writer.writerow([*header, *attributes])
+
+        def get_value(row):
+            return row[position] if position < len(row) else None
+
+        empty = ('',) * len(attributes)
+        for row, result in _resolve_rows(reader, get_value, submit, chunk_size, max_pending):
+            if result is None:
+                row.extend(empty)
+            else:
+                row.extend('' if value is None else value for value in result)
+            writer.writerow(row)
+
+
+def _resolve_rows(rows, get_value, submit, chunk_size, max_pending):
+    # Yield (row, result) tuples in the same order as `rows`. `result` is a
+    # tuple of attribute values or `None`. Up to `max_pending` chunks are
+    # resolved at the same time.
+    resolved = _cache.LRUCache(_MAX_RESOLVED)
+    pending = collections.deque()
+    for chunk in _get_chunks(rows, chunk_size):
+        values = [get_value(row) for row in chunk]
+        # Results of this chunk are collected here so they can't be evicted
+        # from `resolved` before the chunk is written
+        results = {}
+        unresolved = []
+        for value in set(values):
+            if value is not None:
+                result = resolved.get(value, _NOT_RESOLVED)
+                if result is _NOT_RESOLVED:
+                    unresolved.append(value)
+                else:
+                    results[value] = result
+        pending.append((chunk, values, results, unresolved, submit(unresolved)))
+
+        while len(pending) > max_pending:
+            yield from _finish_chunk(pending.popleft(), resolved)
+    while pending:
+        yield from _finish_chunk(pending.popleft(), resolved)
+
+
+def _finish_chunk(pending, resolved):
+    chunk, values, results, unresolved, future = pending
+    for value, result in zip(unresolved, future.result()):
+        results[value] = result
+        resolved.set(value, result)
+    for row, value in zip(chunk, values):
+        yield row, results.get(value)
+
+
+def _get_chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _init_worker(countrydata):
+    global _worker_countrydata
+    _worker_countrydata = countrydata
+
+
+def _resolve(values, attributes, countrydata=None):
+    # Return list of attribute value tuples (or `None`) for each item in
+    # `values`
+    if countrydata is None:
+        countrydata = _worker_countrydata
+    results = []
+    for value in values:
+        info = countrydata.get(value)
+        if info:
+            results.append(tuple(_serialize(info.get(attribute)) for attribute in attributes))
+        else:
+            results.append(None)
+    return results
+
+
+def _serialize(value):
+    # Results are sent between processes and written as text
+    if isinstance(value, re.Pattern):
+        return value.pattern
+    else:
+        return value
@@ -0,0 +1,189 @@
+import bisect
+import collections
+import difflib
+import heapq
+
+
+class FuzzyMatcher:
+    """
+    Find the names that are most similar to a string
+
+    :param names: Sequence of :class:`str`
+
+    Results are the same as those of :func:`difflib.get_close_matches`, but
+    instead of comparing the string to every name, names are pruned with an
+    index of their characters first.
+
+    The similarity of two strings (:meth:`difflib.SequenceMatcher.ratio`) can't
+    be higher than the number of characters they have in common, regardless of
+    order (:meth:`difflib.SequenceMatcher.quick_ratio`). Every name is indexed
+    by each character and how often it occurs in the name. Looking up the
+    characters of a string gives the common character count of every name at
+    once, and only names with a high enough upper bound are compared to the
+    string, best upper bound first.
+
+    Most strings that don't match anything are rejected before that because
+    names that are much shorter or longer than the string can't be similar
+    enough, and characters that no name contains can't be in common.
+    """
+
+    def __init__(self, names):
+        # Index of the first occurrence of each name
+        self._indexes = {}
+        for index, name in enumerate(names):
+            self._indexes.setdefault(name, index)
+
+        # Names are sorted by length, so names within a range of lengths are
+        # also within a range of positions
+        self._names = tuple(sorted(self._indexes, key=len))
+        self._lengths = tuple(len(name) for name in self._names)
+
+        # Map (character, n) to positions of names that contain `character` at
+        # least `n` times
+        postings = collections.defaultdict(list)
+        for position, name in enumerate(self._names):
+            for char, count in collections.Counter(name).items():
+                for n in range(1, count + 1):
+                    postings[(char, n)].append(position)
+        self._postings = dict(postings)
+
+        # Map characters to the maximum number of times any name contains them
+        self._max_counts = {}
+        for char, n in self._postings:
+            if n > self._max_counts.get(char, 0):
+                self._max_counts[char] = n
+
+    def get_state(self):
+        """Return index as built-in types that :mod:`marshal` supports"""
+        return (self._indexes, self._names, self._lengths, self._postings, self._max_counts)
+
+    @classmethod
+    def from_state(cls, state):
+        """Return instance with index from :meth:`get_state` without building it again"""
+        matcher = cls.__new__(cls)
+        matcher._indexes, matcher._names, matcher._lengths, matcher._postings, matcher._max_counts = state
+        return matcher
+
+    def matches(self, string, n=1, cutoff=0.8):
+        """
+        Return the `n` names that are most similar to `string`
+
+        :param str string: String to compare to every name
+        :param int n: Maximum number of matches
+        :param float cutoff: Minimum similarity between 0 and 1
+
+        Return :class:`list` of ``(similarity, index)`` tuples, best match first.
+        `index` refers to the first occurrence of the name in the sequence that
+        was used to create the instance. Names with the same similarity are
+        sorted in reverse alphabetical order, just like
+        :func:`difflib.get_close_matches` does it.
+        """
+        if not n > 0:
+            raise ValueError(f'n must be > 0: {n!r}')
+        if not 0.0 <= cutoff <= 1.0:
+            raise ValueError(f'cutoff must be in [0.0, 1.0]: {cutoff!r}')
+
+        candidates = self._candidates(string, cutoff)
+        if not candidates:
+            return []
+
+        names = self._names
+        matcher = difflib.SequenceMatcher()
+        matcher.set_seq2(string)
+
+        # Best matches as heap of (similarity, name, position) tuples
+        best = []
+        for bound, position in candidates:
+            # No remaining name can be more similar than the worst match
+            if len(best) >= n and bound < best[0][0]:
+                break
+
+            matcher.set_seq1(names[position])
+            similarity = matcher.ratio()
+            if similarity >= cutoff:
+                item = (similarity, names[position], position)
+                if len(best) < n:
+                    heapq.heappush(best, item)
+                elif item > best[0]:
+                    heapq.heapreplace(best, item)
+
+        indexes = self._indexes
+        return [
+            (similarity, indexes[name])
+            for similarity, name, _ in sorted(best, reverse=True)
+        ]
+
+    def _candidates(self, string, cutoff):
+        # Return list of (upper_bound, position) tuples, highest upper bound
+        # first, for every name that might be at least `cutoff` similar
+        length = len(string)
+        lengths = self._lengths
+        postings = self._postings
+        string_counts = collections.Counter(string)
+
+        if cutoff <= 0.0:
+            # Every name is at least 0 % similar
+            common = collections.Counter()
+            for char, count in string_counts.items():
+                for n in range(1, count + 1):
+                    positions = postings.get((char, n))
+                    if positions is None:
+                        break
+                    common.update(positions)
+            items = ((position, common.get(position, 0)) for position in range(len(lengths)))
+
+        elif not length:
+            # Empty names have no characters in common with anything, but they
+            # are identical to an empty string
+            items = ((position, 0) for position, name_length in enumerate(lengths) if not name_length)
+
+        else:
+            # A name with `name_length` characters has at most
+            # min(length, name_length) characters in common with `string`, so
+            # it can only reach `cutoff` within this range of lengths (rounded
+            # generously; the exact bound is checked below)
+            first = bisect.bisect_left(lengths, int(cutoff * length / (2.0 - cutoff)))
+            stop = bisect.bisect_right(lengths, int(length * (2.0 - cutoff) / cutoff) + 1)
+            if first >= stop:
+                return []
+
+            # Characters that no name contains (often enough) can't be in
+            # common with any name
+            max_counts = self._max_counts
+            max_matches = sum(
+                min(count, max_counts.get(char, 0))
+                for char, count in string_counts.items()
+            )
+            if _ratio(max_matches, lengths[first] + length) < cutoff:
+                return []
+
+            common = collections.Counter()
+            for char, count in string_counts.items():
+                for n in range(1, count + 1):
+                    positions = postings.get((char, n))
+                    if positions is None:
+                        break
+                    start = bisect.bisect_left(positions, first)
+                    end = bisect.bisect_left(positions, stop, start)
+                    if start < end:
+                        common.update(positions[start:end])
+            items = common.items()
+
+        candidates = [
+            (bound, position)
+            for position, bound in (
+                (position, _ratio(matches, lengths[position] + length))
+                for position, matches in items
+            )
+            if bound >= cutoff
+        ]
+        candidates.sort(reverse=True)
+        return candidates
+
+
+def _ratio(matches, length):
+    # This is how difflib calculates similarity
+    if length:
+        return 2.0 * matches / length
+    else:
+        return 1.0
@@ -0,0 +1,121 @@
+class Group:
+    """
+    Set of countries, e.g. members of an organization
+
+    Instances are returned by :meth:`.CountryData.members`. Iterating over a
+    group yields country data like lookups return it, in the same order as
+    :attr:`.CountryData.countries`.
+
+    Groups support set operations (``&``, ``|``, ``-``, ``^``) and comparisons
+    (``==``, ``<=``, ``<``, ...) with other groups from the same
+    :class:`.CountryData` instance. Groups from different instances are never
+    equal and can't be combined or ordered. ``in`` accepts country names and codes
+    (e.g. ``"DE" in group``) as well as country data returned by lookups.
+
+    Members are stored as the bits of an integer, so all of this is very fast.
+    """
+
+    __slots__ = ('_countrydata', '_mask')
+
+    def __init__(self, countrydata, mask):
+        self._countrydata = countrydata
+        self._mask = mask
+
+    def __contains__(self, country):
+        index = self._countrydata._get_position(country)
+        return index is not None and bool(self._mask >> index & 1)
+
+    def __iter__(self):
+        get_country = self._countrydata._get_country
+        mask = self._mask
+        while mask:
+            lowest_bit = mask & -mask
+            yield get_country(lowest_bit.bit_length() - 1)
+            mask ^= lowest_bit
+
+    def __len__(self):
+        return bin(self._mask).count('1')
+
+    def __bool__(self):
+        return bool(self._mask)
+
+    def _get_other_mask(self, other):
+        # Return bitmask of `other` or `None` if it is not a Group
+        if not isinstance(other, Group):
+            return None
+        elif other._countrydata is not self._countrydata:
+            raise ValueError("Groups from different CountryData instances can't be combined")
+        else:
+            return other._mask
+
+    def _get_comparable_mask(self, other):
+        # Return bitmask of `other` or `None` if it is not a Group from the
+        # same CountryData instance
+        if isinstance(other, Group) and other._countrydata is self._countrydata:
+            return other._mask
+        else:
+            return None
+
+    def __and__(self, other):
+        mask = self._get_other_mask(other)
+        return NotImplemented if mask is None else Group(self._countrydata, self._mask & mask)
+
+    def __or__(self, other):
+        mask = self._get_other_mask(other)
+        return NotImplemented if mask is None else Group(self._countrydata, self._mask | mask)
+
+    def __sub__(self, other):
+        mask = self._get_other_mask(other)
+        return NotImplemented if mask is None else Group(self._countrydata, self._mask & ~mask)
+
+    def __xor__(self, other):
+        mask = self._get_other_mask(other)
+        return NotImplemented if mask is None else Group(self._countrydata, self._mask ^ mask)
+
+    def __eq__(self, other):
+        if isinstance(other, Group):
+            return other._countrydata is self._countrydata and self._mask == other._mask
+        else:
+            return NotImplemented
+
+    def __le__(self, other):
+        mask = self._get_comparable_mask(other)
+        return NotImplemented if mask is None else not self._mask & ~mask
+
+    def __lt__(self, other):
+        mask = self._get_comparable_mask(other)
+        return NotImplemented if mask is None else self._mask != mask and not self._mask & ~mask
+
+    def __ge__(self, other):
+        mask = self._get_comparable_mask(other)
+        return NotImplemented if mask is None else not mask & ~self._mask
+
+    def __gt__(self, other):
+        mask = self._get_comparable_mask(other)
+        return NotImplemented if mask is None else self._mask != mask and not mask & ~self._mask
+
+    def __hash__(self):
+        return hash((id(self._countrydata), self._mask))
+
+    def isdisjoint(self, other):
+        """Whether this group has no countries in common with `other`"""
+        return not self & other
+
+    def __repr__(self):
+        return f'<{type(self).__name__} of {len(self)} countries>'
+
+
+def get_mask(countries, attribute, value=None):
+    """
+    Return bitmask of countries with `attribute` `value`
+
+    :param countries: Sequence of country data
+    :param str attribute: Key in the country data
+    :param value: Value of `attribute` or `None` for any non-empty value
+    """
+    mask = 0
+    for index, country in enumerate(countries):
+        country_value = country.get(attribute)
+        if (country_value if value is None else country_value == value):
+            mask |= 1 << index
+    return mask
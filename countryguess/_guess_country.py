@@ -1,6 +1,12 @@
+import threading
+
 from ._countrydata import CountryData
 
 _countrydata = None
+_countrydata_lock = threading.Lock()
+
+# Maximum number of lookup results the built-in country data remembers
+_cache_size = 1024
 
 
 def guess_country(country, attribute=None, default=None, regex_map=None):
@@ -9,11 +15,7 @@ def guess_country(country, attribute=None, default=None, regex_map=None):
 
     See :meth:`.CountryData.get` for more information.
     """
-    global _countrydata
-    if _countrydata is None:
-        _countrydata = CountryData()
-
-    info = _countrydata.get(country, regex_map=regex_map)
+    info = _get_countrydata().get(country, regex_map=regex_map)
     if info:
         if attribute:
             try:
@@ -24,3 +26,77 @@ def guess_country(country, attribute=None, default=None, regex_map=None):
             return info
     else:
         return default
+
+
+def guess_countries(countries, attribute=None, default=None, regex_map=None):
+    """
+    Use built-in country data to identify each item in `countries`
+
+    Return :class:`list` with one result for each item in `countries`. Every
+    distinct item is only looked up once.
+
+    See :meth:`.CountryData.get_many` for more information.
+    """
+    try:
+        return _get_countrydata().get_many(
+            countries,
+            attribute=attribute.lower() if attribute else None,
+            default=default,
+            regex_map=regex_map,
+        )
+    except AttributeError:
+        raise AttributeError(attribute)
+
+
+def _cache_info():
+    """
+    Return lookup result cache statistics of :func:`guess_country` and
+    :func:`guess_countries`
+
+    See :meth:`.CountryData.cache_info`.
+    """
+    return _get_countrydata().cache_info()
+
+
+def _cache_clear():
+    """Forget all lookup results of :func:`guess_country` and :func:`guess_countries`"""
+    _get_countrydata().cache_clear()
+
+
+def _preload():
+    """
+    Load built-in country data and build all lookup indexes now
+
+    See :meth:`.CountryData.preload`.
+    """
+    _get_countrydata().preload()
+
+
+def _set_cache_size(cache_size):
+    """
+    Set maximum number of lookup results :func:`guess_country` and
+    :func:`guess_countries` remember
+
+    `0` or `None` disables the cache.
+    """
+    global _cache_size
+    _cache_size = cache_size
+    if _countrydata is not None:
+        _countrydata.cache_size = cache_size
+
+
+# Provide the same interface as functools.lru_cache()
+guess_country.cache_info = _cache_info
+guess_country.cache_clear = _cache_clear
+guess_country.set_cache_size = _set_cache_size
+guess_country.preload = _preload
+
+
+def _get_countrydata():
+    global _countrydata
+    if _countrydata is None:
+        with _countrydata_lock:
+            # Another thread may have created it while we were waiting
+            if _countrydata is None:
+                _countrydata = CountryData(cache_size=_cache_size)
+    return _countrydata
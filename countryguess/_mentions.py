@@ -0,0 +1,264 @@
+import bisect
+import collections
+import re
+
+from . import _cache
+
+Mention = collections.namedtuple('Mention', ('country', 'start', 'end', 'stage'))
+Mention.__doc__ = 'Country that is mentioned in a text (see :meth:`.CountryData.find_all`)'
+
+# Words that may be part of a name. Combining characters (e.g. accents in
+# decomposed text) don't split words because names are compared without them.
+_WORD = re.compile('(?:[^\\W_]|[\u0300-\u036f])+')
+
+# Words and gaps between words that are longer than this are never part of a
+# mention because names and literals are much shorter. Text on either side of
+# them is scanned independently, so nothing has to be kept in memory for them.
+_MAX_RUN_LENGTH = 100
+
+# Maximum number of distinct words whose normalized form and anchored rows are
+# remembered during one scan
+_WORD_CACHE_SIZE = 4096
+
+# Number of words before and after a word that regular expressions can see
+_CONTEXT = 3
+
+# Literals and words shorter than this are not used to find regular expressions
+_MIN_ANCHOR_LENGTH = 3
+
+
+class MentionScanner:
+    """
+    Find names and regular expression matches in text in a single pass
+
+    :param names: Mapping of normalized names to row numbers
+    :param patterns: Sequence of :class:`re.Pattern` objects, one per row
+    :param literals: Sequence of :func:`~.any_literals` return values for
+        each pattern
+    :param normalize: Callable that normalizes a word like the keys of `names`
+
+    Text is split into words, and each word is processed once:
+
+    - Names are matched by joining the normalized word and the following words
+      as long as they are the beginning of any name. The longest name wins.
+    - Regular expressions are only searched near words that contain one of
+      their literals, and they only see :data:`_CONTEXT` words on each side.
+      (They were written to match a whole string, not to find countries in
+      text.) The match must include the word. Words that contain literals are
+      looked up in an index of literal trigrams.
+    - Words and gaps between words that are longer than
+      :data:`_MAX_RUN_LENGTH` (e.g. encoded data) are skipped and separate
+      the text before them from the text after them.
+
+    Each step takes a bounded amount of time and memory, so scanning takes
+    linear time and constant memory.
+    """
+
+    def __init__(self, names, patterns, literals, normalize):
+        self._names = names
+        self._patterns = patterns
+        self._normalize = normalize
+
+        # Every name and every sequence of words a name starts with
+        self._prefixes = set()
+        self._max_words = 1
+        for name in names:
+            words = name.split(' ')
+            self._max_words = max(self._max_words, len(words))
+            for i in range(1, len(words) + 1):
+                self._prefixes.add(' '.join(words[:i]))
+
+        # Map one trigram of every anchor to anchors and anchors to rows. An
+        # anchor is the longest word of a literal, so it can't span words.
+        self._anchors = collections.defaultdict(set)
+        self._anchor_rows = collections.defaultdict(list)
+        for row, row_literals in enumerate(literals):
+            for literal in row_literals or ():
+                anchor = max(re.findall(r'[^\W_]+', literal), key=len, default='')
+                if len(anchor) >= _MIN_ANCHOR_LENGTH and row not in self._anchor_rows[anchor]:
+                    self._anchors[anchor[:3]].add(anchor)
+                    self._anchor_rows[anchor].append(row)
+
+        # Words that must be seen after a word before it can be processed
+        self._lookahead = max(self._max_words, _CONTEXT) + 1
+
+    def scan(self, chunks):
+        """
+        Yield :class:`Mention` objects with row numbers as ``country``
+
+        :param chunks: Iterable of strings that are scanned as if they were
+            concatenated; ``start`` and ``end`` are positions in the
+            concatenated text
+        """
+        state = _ScanState()
+        buffer = ''
+        for chunk in chunks:
+            buffer += chunk
+            yield from self._scan_buffer(buffer, state, final=False)
+            # Only keep what is needed to process the remaining words
+            buffer = buffer[state.keep:]
+            state.offset += state.keep
+            state.resume -= state.keep
+
+        yield from self._scan_buffer(buffer, state, final=True)
+        if state.pending:
+            yield state.pending
+
+    def _scan_buffer(self, buffer, state, final):
+        # Return list of mentions of words that start at or after
+        # `state.resume` and update `state`
+        mentions = []
+        offset = state.offset
+
+        # Spans of words that are not too long and ranges of indexes of
+        # `spans` that are separated by long runs
+        spans = []
+        parts = []
+        first = previous_end = 0
+        is_long = False
+        for match in _WORD.finditer(buffer):
+            start, end = match.span()
+            is_long = end - start >= _MAX_RUN_LENGTH
+            if is_long or start - previous_end >= _MAX_RUN_LENGTH:
+                parts.append((first, len(spans)))
+                first = len(spans)
+            if not is_long:
+                spans.append((start, end))
+            previous_end = end
+        parts.append((first, len(spans)))
+        # Long runs at the end can only get longer, so no word before them has
+        # to wait for the next chunk
+        long_word_at_end = is_long and previous_end == len(buffer)
+        closed = final or long_word_at_end or len(buffer) - previous_end >= _MAX_RUN_LENGTH
+
+        normalized = [None] * len(spans)
+
+        def get_word(i):
+            word = normalized[i]
+            if word is None:
+                start, end = spans[i]
+                raw = buffer[start:end]
+                word = state.words.get(raw)
+                if word is None:
+                    word = self._normalize(raw)
+                    state.words.set(raw, word)
+                normalized[i] = word
+            return word
+
+        def add(mention):
+            # Adjacent words that match the same regular expression are one
+            # mention
+            pending = state.pending
+            if pending:
+                if (
+                    mention.stage == pending.stage == 'regex'
+                    and mention.country == pending.country
+                    and pending.end >= offset
+                    and mention.start - pending.end < _MAX_RUN_LENGTH
+                    and not buffer[pending.end - offset:mention.start - offset].strip()
+                ):
+                    state.pending = pending._replace(end=mention.end)
+                    return
+                mentions.append(pending)
+            state.pending = mention
+
+        resume = bisect.bisect_left(spans, (state.resume, 0))
+        for first, stop in parts:
+            is_last = stop == len(spans)
+            limit = stop if closed or not is_last else stop - self._lookahead
+            i = max(first, resume)
+            while i < limit:
+                i = self._scan_word(i, first, stop, buffer, spans, get_word, add, state)
+
+        if i < len(spans):
+            state.resume = spans[i][0]
+            state.keep = spans[max(i - _CONTEXT, first)][0]
+        elif long_word_at_end and not final:
+            # Keep enough of a long word that might continue in the next chunk
+            # to recognize it again
+            state.resume = state.keep = len(buffer) - _MAX_RUN_LENGTH
+        else:
+            state.resume = state.keep = len(buffer)
+        return mentions
+
+    def _scan_word(self, i, first, stop, buffer, spans, get_word, add, state):
+        # Add mention that starts with word `i` if there is one and return the
+        # index of the next word. Words from `first` to `stop` (exclusive) are
+        # not separated by long runs.
+        offset = state.offset
+        word = get_word(i)
+        if not word:
+            return i + 1
+
+        # Longest name that starts with this word
+        row = last = None
+        phrase = word
+        j = i
+        while phrase in self._prefixes:
+            found = self._names.get(phrase)
+            if found is not None:
+                row, last = found, j
+            j += 1
+            if j >= stop:
+                break
+            phrase += ' ' + get_word(j)
+        if row is not None:
+            add(Mention(row, offset + spans[i][0], offset + spans[last][1], 'name'))
+            return last + 1
+
+        # First regular expression that matches near this word
+        rows = state.anchor_rows.get(word)
+        if rows is None:
+            rows = self._get_anchor_rows(word)
+            state.anchor_rows.set(word, rows)
+        if rows:
+            window_start = spans[max(i - _CONTEXT, first)][0]
+            window = buffer[window_start:spans[min(i + _CONTEXT, stop - 1)][1]]
+            start, end = spans[i]
+            for row in rows:
+                if _overlaps(self._patterns[row], window, start - window_start, end - window_start):
+                    add(Mention(row, offset + start, offset + end, 'regex'))
+                    break
+        return i + 1
+
+    def _get_anchor_rows(self, word):
+        if len(word) < _MIN_ANCHOR_LENGTH:
+            return ()
+        # Every anchor is searched in the word only once, so long words with
+        # many repeated trigrams don't take quadratic time
+        anchors = self._anchors
+        candidates = set()
+        for trigram in {word[i:i + 3] for i in range(len(word) - 2)}:
+            candidates.update(anchors.get(trigram, ()))
+        rows = set()
+        for anchor in candidates:
+            if anchor in word:
+                rows.update(self._anchor_rows[anchor])
+        return sorted(rows)
+
+
+def _overlaps(pattern, string, start, end):
+    # Whether `pattern` matches any part of `string[start:end]`
+    for match in pattern.finditer(string):
+        if match.start() >= end:
+            return False
+        elif match.end() > start:
+            return True
+    return False
+
+
+class _ScanState:
+    # Progress of MentionScanner.scan()
+
+    def __init__(self):
+        # Position of the buffer in the whole text
+        self.offset = 0
+        # Position of the first unprocessed word in the buffer
+        self.resume = 0
+        # Position in the buffer of the first word that is still needed
+        self.keep = 0
+        # Mention that might be merged with the next one
+        self.pending = None
+        # Normalized words and their anchored rows by word
+        self.words = _cache.LRUCache(_WORD_CACHE_SIZE)
+        self.anchor_rows = _cache.LRUCache(_WORD_CACHE_SIZE)
@@ -0,0 +1,54 @@
+import marshal
+import os
+import zlib
+
+# Increase this when the prebuilt data changes
+_FORMAT_VERSION = 2
+
+# marshal format that every supported Python version can read
+_MARSHAL_VERSION = 4
+
+
+def get_path(source_path):
+    """Return path of the prebuilt lookup data for the country data file `source_path`"""
+    return os.path.splitext(source_path)[0] + '.index'
+
+
+def read(source_path):
+    """
+    Return lookup data that was prebuilt for `source_path` or `None`
+
+    `None` is also returned if `source_path` was modified after the lookup data
+    was built or if the prebuilt file is unreadable.
+    """
+    try:
+        with open(get_path(source_path), 'rb') as f:
+            header, data = marshal.loads(f.read())
+        checksum = _get_checksum(source_path)
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+
+    if header == (_FORMAT_VERSION, checksum):
+        return data
+    else:
+        return None
+
+
+def write(source_path, data):
+    """
+    Store lookup `data` for `source_path`
+
+    `data` may only contain built-in types that are supported by
+    :mod:`marshal`.
+    """
+    header = (_FORMAT_VERSION, _get_checksum(source_path))
+    with open(get_path(source_path), 'wb') as f:
+        f.write(marshal.dumps((header, data), _MARSHAL_VERSION))
+
+
+def _get_checksum(source_path):
+    # Modification times are not preserved when the package is installed, so
+    # the content must be compared
+    with open(source_path, 'rb') as f:
+        content = f.read()
+    return (len(content), zlib.crc32(content))
@@ -0,0 +1,141 @@
+import collections
+import collections.abc
+import re
+import sys
+
+# Column value for countries that don't have a key
+_MISSING = object()
+
+
+class CountryTable:
+    """
+    Column-oriented storage of country data
+
+    :param country_list: Sequence of country :class:`dict` objects as they are
+        read from a country data file (``regex`` values are strings)
+
+    Every value is stored once per column and equal strings (e.g. ``""``,
+    ``"RoW"`` or ``"Europe"``) are interned so they share memory. Regular
+    expressions are only compiled when they are accessed.
+
+    :attr:`records` provides one :class:`Country` view per country.
+    """
+
+    def __init__(self, country_list):
+        fields = {}
+        for info in country_list:
+            for key in info:
+                fields.setdefault(key, len(fields))
+
+        self._fields = fields
+        self._keys = tuple(fields)
+        self._columns = tuple(
+            tuple(_intern(info.get(key, _MISSING)) for info in country_list)
+            for key in self._keys
+        )
+        self._patterns = [None] * len(country_list)
+        self.records = tuple(Country(self, row) for row in range(len(country_list)))
+
+    def __reduce__(self):
+        # _MISSING doesn't survive pickling
+        country_list = [
+            {
+                key: value
+                for key, value in zip(self._keys, row)
+                if value is not _MISSING
+            }
+            for row in zip(*self._columns)
+        ]
+        return (type(self), (country_list,))
+
+    def get_value(self, row, key):
+        """Return `key` value of country in `row` or raise :class:`KeyError`"""
+        value = self._columns[self._fields[key]][row]
+        if value is _MISSING:
+            raise KeyError(key)
+        elif key == 'regex':
+            return self._get_pattern(row, value)
+        else:
+            return value
+
+    def get_dicts(self):
+        """
+        Return :class:`list` of one :class:`dict` per country like ``dict(record)``
+
+        This is much faster than copying each record, and regular expressions
+        that weren't accessed yet are compiled without keeping them.
+        """
+        columns = list(self._columns)
+        regex = self._fields.get('regex')
+        if regex is not None:
+            columns[regex] = [
+                source if source is _MISSING else self._patterns[row] or re.compile(source, flags=re.IGNORECASE)
+                for row, source in enumerate(columns[regex])
+            ]
+        keys = self._keys
+        return [
+            {key: value for key, value in zip(keys, values) if value is not _MISSING}
+            for values in zip(*columns)
+        ]
+
+    def get_keys(self, row):
+        """Return sequence of keys of country in `row`"""
+        return [
+            key
+            for key, column in zip(self._keys, self._columns)
+            if column[row] is not _MISSING
+        ]
+
+    def _get_pattern(self, row, source):
+        pattern = self._patterns[row]
+        if pattern is None:
+            pattern = self._patterns[row] = re.compile(source, flags=re.IGNORECASE)
+        return pattern
+
+
+class Country(collections.abc.Mapping):
+    """
+    Read-only country data
+
+    This is a :class:`~collections.abc.Mapping` like the :class:`dict` objects
+    that are returned by default (e.g. ``country["iso3"]``), but values are also
+    available as attributes (e.g. ``country.iso3``).
+
+    Use ``dict(country)`` to get a mutable copy.
+    """
+
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table, row):
+        self._table = table
+        self._row = row
+
+    def __getitem__(self, key):
+        try:
+            return self._table.get_value(self._row, key)
+        except KeyError:
+            raise KeyError(key) from None
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        try:
+            return self._table.get_value(self._row, name)
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __iter__(self):
+        return iter(self._table.get_keys(self._row))
+
+    def __len__(self):
+        return len(self._table.get_keys(self._row))
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)!r})'
+
+
+def _intern(value):
+    if type(value) is str:
+        return sys.intern(value)
+    else:
+        return value
@@ -0,0 +1,417 @@
+import collections
+import collections.abc
+import re
+import weakref
+
+try:
+    from re import _parser as _sre_parse
+except ImportError:
+    # TODO: Remove this when Python 3.10 is no longer supported
+    import sre_parse as _sre_parse
+
+# Literals shorter than this are not indexed
+_MIN_LITERAL_LENGTH = 3
+
+
+class RegexIndex:
+    """
+    Find the first of many regular expressions that matches a string
+
+    :param patterns: Sequence of :class:`re.Pattern` objects
+    :param literals: Sequence of :func:`required_literals` return values for
+        each pattern or `None` to find them
+
+    Searching every pattern one by one is expensive, especially if none of them
+    matches. Combining all patterns into one alternation doesn't help because
+    the backtracking :mod:`re` engine still tries every branch at every
+    position.
+
+    Instead, each pattern is parsed to find literal strings that any matching
+    string must contain (e.g. ``zimbabwe|rhodesia`` can only match strings that
+    contain "zimbabwe" or "rhodesia"). Patterns are indexed by a trigram of
+    those literals, and only patterns that share a trigram with the string are
+    searched. If a pattern requires several literals (e.g. ``^ctry-deu$``
+    requires "ctry" and "deu"), the ones with the rarest trigrams among all
+    patterns are used. Patterns without required literals are always searched.
+    """
+
+    def __init__(self, patterns, literals=None):
+        patterns = list(patterns)
+        if literals is None:
+            requirements = [
+                required_literals(pattern.pattern, pattern.flags)
+                for pattern in patterns
+            ]
+        else:
+            requirements = list(literals)
+            if len(requirements) != len(patterns):
+                raise ValueError(f'Expected {len(patterns)} literals, got {len(requirements)}')
+        self._build(patterns, requirements)
+
+    def _build(self, patterns, requirements):
+        self._patterns = patterns
+        self._always = set()
+        self._trigrams = collections.defaultdict(list)
+        self._trigram_counts = collections.Counter()
+        # Required literals of each pattern and the trigrams it is indexed by
+        # or `None` for patterns that are always searched
+        self._keys = [None] * len(self._patterns)
+
+        # Count all trigrams first so every pattern is indexed by its rarest
+        # trigrams
+        for literals in requirements:
+            self._count_trigrams(literals, 1)
+        for index, literals in enumerate(requirements):
+            self._index(index, literals)
+
+    def __len__(self):
+        return len(self._patterns) - self._patterns.count(None)
+
+    def append(self, pattern, literals=None):
+        """
+        Add `pattern` after all other patterns and return its index
+
+        :param pattern: :class:`re.Pattern` object
+        :param literals: :func:`required_literals` return value for `pattern`
+            or `None` to find them
+        """
+        index = len(self._patterns)
+        self._patterns.append(None)
+        self._keys.append(None)
+        self.replace(index, pattern, literals=literals)
+        return index
+
+    def replace(self, index, pattern, literals=None):
+        """
+        Replace pattern at `index` with `pattern` without changing the order
+
+        :param int index: Index of an existing pattern
+        :param pattern: :class:`re.Pattern` object
+        :param literals: :func:`required_literals` return value for `pattern`
+            or `None` to find them
+        """
+        if literals is None:
+            literals = required_literals(pattern.pattern, pattern.flags)
+        self._unindex(index)
+        self._patterns[index] = pattern
+        self._count_trigrams(literals, 1)
+        self._index(index, literals)
+
+    def remove(self, index):
+        """
+        Remove pattern at `index`
+
+        Indexes of other patterns don't change until :meth:`compact` is
+        called.
+        """
+        self._unindex(index)
+        self._patterns[index] = None
+
+    def compact(self):
+        """
+        Drop removed patterns and close the gaps they left
+
+        Return :class:`list` of the previous indexes of the remaining patterns
+        in their new order.
+        """
+        kept = [index for index, pattern in enumerate(self._patterns) if pattern is not None]
+        self._build(
+            [self._patterns[index] for index in kept],
+            [self._keys[index] and self._keys[index][0] for index in kept],
+        )
+        return kept
+
+    def _count_trigrams(self, requirements, increment):
+        if requirements:
+            counts = self._trigram_counts
+            for literals in requirements:
+                for literal in literals:
+                    for trigram in _trigrams(literal):
+                        counts[trigram] += increment
+
+    def _index(self, index, requirements):
+        # Index every literal of one requirement by its rarest trigram. The
+        # requirement whose trigrams are rarest in total keeps candidate sets
+        # small.
+        if requirements:
+            counts = self._trigram_counts
+            best_trigrams = best_count = None
+            for literals in requirements:
+                trigrams = [
+                    min(_trigrams(literal), key=counts.__getitem__)
+                    for literal in literals
+                ]
+                count = sum(counts[trigram] for trigram in trigrams)
+                if best_count is None or count < best_count:
+                    best_trigrams, best_count = trigrams, count
+            for trigram in best_trigrams:
+                self._trigrams[trigram].append(index)
+            self._keys[index] = (requirements, best_trigrams)
+        else:
+            self._always.add(index)
+
+    def _unindex(self, index):
+        if self._patterns[index] is None:
+            return
+        keys = self._keys[index]
+        if keys is None:
+            self._always.discard(index)
+        else:
+            requirements, trigrams = keys
+            for trigram in trigrams:
+                self._trigrams[trigram].remove(index)
+            self._count_trigrams(requirements, -1)
+            self._keys[index] = None
+
+    def search(self, string):
+        """
+        Return index of the first pattern that matches `string` or `None`
+
+        Patterns are tried in the order they were provided, just like
+        ``re.search()`` in a loop would.
+        """
+        patterns = self._patterns
+
+        # Literals are ASCII and lower case, so we can only rule out patterns if
+        # lowercasing `string` doesn't change which characters are matched
+        if not string.isascii():
+            for index, pattern in enumerate(patterns):
+                if pattern is not None and pattern.search(string):
+                    return index
+            return None
+
+        trigrams = self._trigrams
+        lowered = string.lower()
+        candidates = set(self._always)
+        for i in range(len(lowered) - 2):
+            indexes = trigrams.get(lowered[i:i + 3])
+            if indexes:
+                candidates.update(indexes)
+
+        for index in sorted(candidates):
+            if patterns[index].search(string):
+                return index
+        return None
+
+
+class RegexMap(collections.abc.MutableMapping):
+    """
+    Reusable `regex_map` for :meth:`.CountryData.get` and friends
+
+    :param regex_map: Optional :class:`dict` that maps ISO 3166-1 alpha-2
+        country codes (:class:`str`) to regular expressions
+        (:class:`re.Pattern`, see :func:`re.compile`)
+
+    This behaves like a :class:`dict`, but patterns are validated when they are
+    added and indexed like the built-in regular expressions, so only patterns
+    that can match a string are searched. Adding or removing a pattern doesn't
+    rebuild the index.
+
+    Country codes are validated once by each :class:`.CountryData` instance
+    that uses the map. Lookup results are cached until the map is modified.
+    """
+
+    def __init__(self, regex_map=None):
+        self._positions = {}
+        self._codes = []
+        self._index = RegexIndex(())
+        self._token = object()
+        self._validated_by = weakref.WeakSet()
+        if regex_map is not None:
+            self.update(regex_map)
+
+    def add(self, iso2, regex):
+        """
+        Map `iso2` to `regex`
+
+        If `iso2` is already mapped, its previous regular expression is
+        replaced and the order of the map doesn't change.
+
+        :raise RuntimeError: if `iso2` is not a :class:`str` or `regex` is not a
+            :class:`re.Pattern`
+        """
+        if not isinstance(iso2, str):
+            raise RuntimeError(f'Not a ISO 3166-1 alpha-2 country code: {iso2!r}')
+        elif not isinstance(regex, re.Pattern):
+            raise RuntimeError(f'Not a regular expression (see re.compile()): {regex!r}')
+
+        position = self._positions.get(iso2)
+        if position is None:
+            self._positions[iso2] = self._index.append(regex)
+            self._codes.append(iso2)
+        else:
+            self._index.replace(position, regex)
+        self._modified()
+
+    def remove(self, iso2):
+        """
+        Remove regular expression for `iso2`
+
+        :raise KeyError: if `iso2` is not mapped
+        """
+        position = self._positions.pop(iso2)
+        self._index.remove(position)
+        self._codes[position] = None
+        # Positions of removed patterns can't be reused because the order of
+        # the map must not change, so close the gaps once they outnumber the
+        # remaining patterns
+        if len(self._codes) > 2 * len(self._positions):
+            self._codes = [self._codes[position] for position in self._index.compact()]
+            self._positions = {iso2: position for position, iso2 in enumerate(self._codes)}
+        self._modified()
+
+    def search(self, string):
+        """Return country code of the first regular expression that matches `string` or `None`"""
+        position = self._index.search(string)
+        if position is not None:
+            return self._codes[position]
+        return None
+
+    def _modified(self):
+        # New token invalidates cached lookup results and validation
+        self._token = object()
+        self._validated_by = weakref.WeakSet()
+
+    def __getitem__(self, iso2):
+        return self._index._patterns[self._positions[iso2]]
+
+    def __setitem__(self, iso2, regex):
+        self.add(iso2, regex)
+
+    def __delitem__(self, iso2):
+        self.remove(iso2)
+
+    def __iter__(self):
+        return iter(self._positions)
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __repr__(self):
+        return f'{type(self).__name__}({dict(self)!r})'
+
+
+def _trigrams(literal):
+    return [literal[i:i + 3] for i in range(len(literal) - 2)]
+
+
+def required_literals(pattern, flags=0):
+    """
+    Return literals that any string matched by `pattern` must contain
+
+    :param str pattern: Regular expression
+    :param int flags: Flags that `pattern` is compiled with
+
+    Return :class:`tuple` of requirements or `None`. Each requirement is a
+    :class:`tuple` of lower case ASCII strings, and any string that is matched
+    by `pattern` contains at least one string of every requirement.
+    """
+    if flags & re.VERBOSE:
+        return None
+    try:
+        parsed = _sre_parse.parse(pattern, flags)
+    except Exception:
+        # Private API might change; searching `pattern` is always correct
+        return None
+    else:
+        return _sequence_literals(parsed)
+
+
+def any_literals(pattern, flags=0):
+    """
+    Return literals that strings matched by `pattern` usually contain
+
+    :param str pattern: Regular expression
+    :param int flags: Flags that `pattern` is compiled with
+
+    Return :class:`tuple` of lower case ASCII strings or `None`. This is the
+    longest requirement of :func:`required_literals` if that finds any.
+    Otherwise, literals
+    are collected from all alternatives that have required literals, and
+    alternatives without any (e.g. ``^u\\.?s\\.?$`` in
+    ``united.?states|^u\\.?s\\.?$``) are ignored, so some matching strings
+    don't contain any of the returned literals.
+    """
+    requirements = required_literals(pattern, flags)
+    if requirements is not None:
+        return _longest(requirements)
+    elif flags & re.VERBOSE:
+        return None
+    try:
+        parsed = _sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    else:
+        return tuple(dict.fromkeys(_branch_literals(parsed))) or None
+
+
+def _branch_literals(items):
+    # Yield required literals of every alternative of every branch in `items`
+    # that has any
+    for opcode, argument in items:
+        name = opcode.name
+        if name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            yield from _branch_literals(argument[2])
+
+        elif name == 'SUBPATTERN':
+            _, add_flags, del_flags, subpattern = argument
+            if not add_flags and not del_flags:
+                yield from _branch_literals(subpattern)
+
+        elif name == 'BRANCH':
+            for branch in argument[1]:
+                requirements = _sequence_literals(branch)
+                if requirements:
+                    yield from _longest(requirements)
+                else:
+                    yield from _branch_literals(branch)
+
+
+def _sequence_literals(items):
+    requirements = []
+    run = []
+
+    def end_run():
+        if run:
+            requirements.append((''.join(run),))
+            run.clear()
+
+    for opcode, argument in items:
+        name = opcode.name
+        if name == 'LITERAL' and argument < 128:
+            run.append(chr(argument).lower())
+            continue
+
+        end_run()
+        if name in ('MAX_REPEAT', 'MIN_REPEAT', 'POSSESSIVE_REPEAT'):
+            min_repeat, _, subpattern = argument
+            if min_repeat >= 1:
+                requirements.extend(_sequence_literals(subpattern) or ())
+
+        elif name == 'SUBPATTERN':
+            _, add_flags, del_flags, subpattern = argument
+            # Scoped flags like "(?-i:...)" change how literals are matched
+            if not add_flags and not del_flags:
+                requirements.extend(_sequence_literals(subpattern) or ())
+
+        elif name == 'BRANCH':
+            alternatives = [_sequence_literals(branch) for branch in argument[1]]
+            if all(alternatives):
+                requirements.append(tuple(
+                    literal
+                    for branch_requirements in alternatives
+                    for literal in _longest(branch_requirements)
+                ))
+    end_run()
+
+    requirements = [
+        literals
+        for literals in dict.fromkeys(requirements)
+        if min(len(literal) for literal in literals) >= _MIN_LITERAL_LENGTH
+    ]
+    return tuple(requirements) or None
+
+
+def _longest(requirements):
+    # Long literals are less likely to occur by chance
+    return max(requirements, key=lambda literals: min(len(literal) for literal in literals))
@@ -0,0 +1,136 @@
+import collections
+import os
+import threading
+import time
+import zlib
+
+ReloadInfo = collections.namedtuple('ReloadInfo', ('reloads', 'failures', 'seconds', 'error'))
+ReloadInfo.__doc__ = 'Reload statistics (see :meth:`.CountryData.reload_info`)'
+
+
+class Reloader:
+    """
+    Replace country data when its file changes
+
+    :param create: Callable that returns a new :class:`~.CountryData` instance
+        that doesn't reload itself
+    :param str path: Path of the file that is watched
+    :param float interval: Minimum number of seconds between checks
+
+    :meth:`get_current` returns the current instance and starts a background
+    thread that checks for changes if `interval` has passed since the last
+    check. The modification time and size of `path` are compared first, and
+    only if they changed, its content is compared by checksum. A changed file
+    is loaded by a new instance, which is fully preloaded before it replaces
+    the current instance. Callers that got the previous instance keep using it
+    until they are done, so no lookup ever sees partially loaded data or
+    waits for a reload.
+
+    If loading fails (e.g. because the file is invalid), the current instance
+    is kept and the file is only loaded again after it changes.
+    """
+
+    def __init__(self, create, path, interval):
+        self._create = create
+        self._path = path
+        self._interval = interval
+        # (modification time, size) and checksum of the loaded file. The file
+        # is read before the first instance loads it, so changes between both
+        # reads are detected by the first check, and lookups never read it.
+        self._stat, self._checksum = _get_signature(path)
+        self._current = create()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._next_check = time.monotonic() + interval
+
+        self._reloads = 0
+        self._failures = 0
+        self._seconds = 0.0
+        self._error = None
+
+    def get_current(self):
+        """Return the current :class:`~.CountryData` instance"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            # Never wait for another thread that is doing the same
+            if self._lock.acquire(blocking=False):
+                try:
+                    self._schedule_check(now)
+                finally:
+                    self._lock.release()
+        return self._current
+
+    def _schedule_check(self, now):
+        if now >= self._next_check and self._thread is None:
+            self._next_check = now + self._interval
+            self._thread = threading.Thread(target=self._check_in_background, daemon=True)
+            self._thread.start()
+
+    def _check_in_background(self):
+        try:
+            self.check()
+        finally:
+            self._thread = None
+
+    def check(self):
+        """
+        Load the file again if it changed
+
+        Return whether the current instance was replaced.
+        """
+        try:
+            stat = _get_stat(self._path)
+            if stat == self._stat:
+                return False
+            stat, checksum = _get_signature(self._path)
+            if checksum == self._checksum:
+                self._stat = stat
+                return False
+        except OSError as e:
+            # The file might be replaced right now; try again later
+            self._failures += 1
+            self._error = e
+            return False
+
+        # Don't try again until the file changes again
+        self._stat, self._checksum = stat, checksum
+        start = time.perf_counter()
+        try:
+            countrydata = self._create()
+            countrydata.preload()
+        except Exception as e:
+            self._failures += 1
+            self._error = e
+            return False
+        else:
+            self._current = countrydata
+            self._reloads += 1
+            self._seconds = time.perf_counter() - start
+            self._error = None
+            return True
+
+    def info(self):
+        """Return :class:`ReloadInfo`"""
+        return ReloadInfo(
+            reloads=self._reloads,
+            failures=self._failures,
+            seconds=self._seconds,
+            error=self._error,
+        )
+
+
+def _get_stat(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def _get_signature(path):
+    # Return (modification time, size) and checksum of `path`, or `None` for
+    # both if it can't be read
+    try:
+        stat = _get_stat(path)
+        with open(path, 'rb') as f:
+            checksum = zlib.crc32(f.read())
+    except OSError:
+        return None, None
+    return stat, checksum
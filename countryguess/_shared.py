@@ -0,0 +1,328 @@
+import array
+import collections.abc
+import marshal
+import mmap
+import os
+import re
+import sys
+import zlib
+
+from . import __version__, _records
+
+# First bytes of every shared file
+_MAGIC = b'CGSHARED'
+
+# Increase this when the file layout changes
+_FORMAT_VERSION = 2
+
+# Cell lengths with special meaning
+_MISSING = 0xFFFFFFFF
+_OBJECT = 0xFFFFFFFE
+
+# Decoded value of cells for countries that don't have a key
+_NO_VALUE = object()
+
+# Sizes of the header length and of one cell or index slot in bytes
+_UINT32_SIZE = 4
+_CELL_SIZE = 2
+_SLOT_SIZE = 3
+
+
+class SharedTable:
+    """
+    Read-only country data in a memory-mapped file
+
+    :param path: Path of a file that was created by :func:`write`
+
+    Strings and indexes stay in the file and are decoded on access. The
+    operating system maps the file into every process that opens it, so all
+    processes share one physical copy, and there are no Python objects whose
+    reference counts would make forked processes copy memory pages.
+
+    :attr:`records` provides one :class:`~.Country` view per country like
+    :class:`~.CountryTable` does.
+
+    :raise RuntimeError: if `path` is not a valid shared file
+    """
+
+    def __init__(self, path):
+        self._path = os.fspath(path)
+        with open(self._path, 'rb') as f:
+            try:
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise RuntimeError(f'Not a shared country data file: {self._path}') from None
+
+        header = self._read_header()
+        self._keys = tuple(header['keys'])
+        self._fields = {key: i for i, key in enumerate(self._keys)}
+        self._rows = header['rows']
+        self._objects = header['objects']
+        self.regex_literals = header['regex_literals']
+
+        uints = memoryview(self._mmap)[header['data_offset']:].cast('I')
+        self._strings_offset = header['data_offset'] + header['strings_offset'] * _UINT32_SIZE
+        self._cells = uints[header['cells_offset']:header['cells_offset'] + header['cells_length']]
+        self.indexes = {
+            attribute: SharedIndex(self, uints[offset:offset + length])
+            for attribute, (offset, length) in header['indexes'].items()
+        }
+        self.name_index = SharedIndex(self, uints[header['name_index'][0]:sum(header['name_index'])])
+
+        self._patterns = [None] * self._rows
+        self.records = tuple(_records.Country(self, row) for row in range(self._rows))
+
+    def _read_header(self):
+        mm = self._mmap
+        try:
+            if mm[:len(_MAGIC)] != _MAGIC:
+                raise ValueError('Wrong magic bytes')
+            start = len(_MAGIC) + _UINT32_SIZE
+            length = int.from_bytes(mm[len(_MAGIC):start], 'little')
+            header = marshal.loads(mm[start:start + length])
+        except (ValueError, EOFError, TypeError):
+            raise RuntimeError(f'Not a shared country data file: {self._path}') from None
+
+        if header.get('format') != _FORMAT_VERSION or header.get('version') != __version__:
+            raise RuntimeError(f'Shared country data file was created by another version: {self._path}')
+        elif header.get('byteorder') != sys.byteorder:
+            raise RuntimeError(f'Shared country data file was created on another platform: {self._path}')
+        return header
+
+    def __reduce__(self):
+        # Other processes map the same file instead of copying its content
+        return (type(self), (self._path,))
+
+    def __len__(self):
+        return self._rows
+
+    def get_value(self, row, key):
+        """Return `key` value of country in `row` or raise :class:`KeyError`"""
+        cell = (row * len(self._keys) + self._fields[key]) * _CELL_SIZE
+        value = self._decode(self._cells[cell], self._cells[cell + 1])
+        if value is _NO_VALUE:
+            raise KeyError(key)
+        elif key == 'regex':
+            return self._get_pattern(row, value)
+        else:
+            return value
+
+    def get_keys(self, row):
+        """Return sequence of keys of country in `row`"""
+        cells = self._cells
+        first = row * len(self._keys) * _CELL_SIZE
+        return [
+            key
+            for i, key in enumerate(self._keys)
+            if cells[first + i * _CELL_SIZE + 1] != _MISSING
+        ]
+
+    def get_dicts(self):
+        """Return :class:`list` of one :class:`dict` per country like :meth:`.CountryTable.get_dicts`"""
+        cells = self._cells
+        decode = self._decode
+        keys = self._keys
+        dicts = []
+        for row in range(self._rows):
+            first = row * len(keys) * _CELL_SIZE
+            info = {}
+            for i, key in enumerate(keys):
+                cell = first + i * _CELL_SIZE
+                value = decode(cells[cell], cells[cell + 1])
+                if value is not _NO_VALUE:
+                    info[key] = value
+            regex = info.get('regex')
+            if regex is not None:
+                info['regex'] = self._patterns[row] or re.compile(regex, flags=re.IGNORECASE)
+            dicts.append(info)
+        return dicts
+
+    def get_string(self, offset, length):
+        """Return UTF-8 string at `offset` of the string section"""
+        start = self._strings_offset + offset
+        return self._mmap[start:start + length].decode('utf-8', errors='surrogatepass')
+
+    def _decode(self, offset, length):
+        if length == _MISSING:
+            return _NO_VALUE
+        elif length == _OBJECT:
+            return self._objects[offset]
+        else:
+            return self.get_string(offset, length)
+
+    def _get_pattern(self, row, source):
+        pattern = self._patterns[row]
+        if pattern is None:
+            pattern = self._patterns[row] = re.compile(source, flags=re.IGNORECASE)
+        return pattern
+
+
+class SharedIndex(collections.abc.Mapping):
+    """
+    Read-only hash table in a :class:`SharedTable` that maps strings to rows
+
+    Slots are ``(offset, length, row)`` triples, the slot of a key is found by
+    its CRC-32 checksum (which, unlike :func:`hash`, is the same in every
+    process) and collisions are resolved by linear probing.
+    """
+
+    def __init__(self, table, slots):
+        self._table = table
+        self._slots = slots
+        self._mask = len(slots) // _SLOT_SIZE - 1
+
+    def __getitem__(self, key):
+        if not isinstance(key, str):
+            raise KeyError(key)
+        encoded = key.encode('utf-8', errors='surrogatepass')
+        slots = self._slots
+        table = self._table
+        slot = zlib.crc32(encoded) & self._mask
+        while True:
+            i = slot * _SLOT_SIZE
+            length = slots[i + 1]
+            if length == _MISSING:
+                raise KeyError(key)
+            elif length == len(encoded):
+                start = table._strings_offset + slots[i]
+                if table._mmap[start:start + length] == encoded:
+                    return slots[i + 2]
+            slot = (slot + 1) & self._mask
+
+    def __iter__(self):
+        slots = self._slots
+        for i in range(0, len(slots), _SLOT_SIZE):
+            if slots[i + 1] != _MISSING:
+                yield self._table.get_string(slots[i], slots[i + 1])
+
+    def __len__(self):
+        slots = self._slots
+        return sum(1 for i in range(1, len(slots), _SLOT_SIZE) if slots[i] != _MISSING)
+
+
+def write(path, country_list, indexes, name_index, regex_literals):
+    """
+    Create shared file at `path`
+
+    :param country_list: Sequence of country :class:`dict` objects as they are
+        read from a country data file
+    :param dict indexes: Map attributes to :class:`dict` objects that map
+        normalized values (:class:`str`) to row numbers
+    :param dict name_index: Map normalized names to row numbers
+    :param regex_literals: Sequence of :func:`~.required_literals` return
+        values for each ``regex`` value
+    """
+    keys = {}
+    for info in country_list:
+        for key in info:
+            keys.setdefault(key, len(keys))
+
+    strings = _StringPool()
+    objects = []
+    cells = array.array('I')
+    for info in country_list:
+        for key in keys:
+            value = info.get(key, _NO_VALUE)
+            if value is _NO_VALUE:
+                cells.extend((0, _MISSING))
+            elif type(value) is str:
+                cells.extend(strings.add(value))
+            else:
+                cells.extend((len(objects), _OBJECT))
+                objects.append(value)
+
+    uints = cells
+    index_positions = {}
+    for attribute, index in indexes.items():
+        index_positions[attribute] = (len(uints), _append_index(uints, index, strings))
+    name_index_position = (len(uints), _append_index(uints, name_index, strings))
+
+    data = strings.getvalue()
+    # The string section is padded so it can be read as unsigned integers
+    data += b'\x00' * (-len(data) % _UINT32_SIZE)
+    strings_offset = len(uints)
+    uints.frombytes(data)
+
+    header = {
+        'format': _FORMAT_VERSION,
+        'version': __version__,
+        'byteorder': sys.byteorder,
+        'keys': list(keys),
+        'rows': len(country_list),
+        'objects': objects,
+        'regex_literals': list(regex_literals),
+        'cells_offset': 0,
+        'cells_length': len(country_list) * len(keys) * _CELL_SIZE,
+        'indexes': index_positions,
+        'name_index': name_index_position,
+        'strings_offset': strings_offset,
+    }
+    # The data section starts at a multiple of 8 bytes, which is updated once
+    # the header length is known
+    header['data_offset'] = 0
+    encoded_header = marshal.dumps(header)
+    data_offset = len(_MAGIC) + _UINT32_SIZE + len(encoded_header) + 16
+    data_offset += -data_offset % 8
+    header['data_offset'] = data_offset
+    encoded_header = marshal.dumps(header)
+
+    prefix = _MAGIC + len(encoded_header).to_bytes(_UINT32_SIZE, 'little') + encoded_header
+    if len(prefix) > data_offset:
+        raise RuntimeError('Header is too long')
+    prefix += b'\x00' * (data_offset - len(prefix))
+
+    # Only import this when needed because it takes a while
+    import tempfile
+
+    # Write to temporary file first so other processes never map incomplete
+    # data
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp.')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(prefix)
+            uints.tofile(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def _append_index(uints, index, strings):
+    # Append hash table of `index` to `uints` and return its length in
+    # unsigned integers
+    size = 1
+    while size < len(index) * 2:
+        size *= 2
+    slots = [(0, _MISSING, 0)] * size
+    for key, row in index.items():
+        offset, length = strings.add(key)
+        slot = zlib.crc32(key.encode('utf-8', errors='surrogatepass')) & (size - 1)
+        while slots[slot][1] != _MISSING:
+            slot = (slot + 1) & (size - 1)
+        slots[slot] = (offset, length, row)
+    for slot in slots:
+        uints.extend(slot)
+    return size * _SLOT_SIZE
+
+
+class _StringPool:
+    # Concatenated UTF-8 strings that are each stored once
+
+    def __init__(self):
+        self._chunks = []
+        self._length = 0
+        self._positions = {}
+
+    def add(self, string):
+        """Return (offset, length) of `string` in :meth:`getvalue`"""
+        position = self._positions.get(string)
+        if position is None:
+            encoded = string.encode('utf-8', errors='surrogatepass')
+            position = self._positions[string] = (self._length, len(encoded))
+            self._chunks.append(encoded)
+            self._length += len(encoded)
+        return position
+
+    def getvalue(self):
+        return b''.join(self._chunks)
@@ -0,0 +1,48 @@
+import collections
+import threading
+
+StageInfo = collections.namedtuple('StageInfo', ('count', 'seconds'))
+StageInfo.__doc__ = 'Lookup statistics of one stage (see :meth:`.CountryData.stage_info`)'
+
+# Stages of a lookup in the order they are tried
+STAGES = (
+    'cache',
+    'iso2',
+    'iso3',
+    'regex_map',
+    'name',
+    'regex',
+    'fuzzy_official',
+    'fuzzy_short',
+    'miss',
+)
+
+
+class StageStats:
+    """Thread-safe counters and cumulative timings of lookups per stage"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = dict.fromkeys(STAGES, 0)
+        self._seconds = dict.fromkeys(STAGES, 0.0)
+
+    def add(self, stage, seconds):
+        """Count one lookup that was resolved by `stage` and took `seconds`"""
+        with self._lock:
+            self._counts[stage] += 1
+            self._seconds[stage] += seconds
+
+    def clear(self):
+        """Reset all counters and timings"""
+        with self._lock:
+            for stage in STAGES:
+                self._counts[stage] = 0
+                self._seconds[stage] = 0.0
+
+    def info(self):
+        """Return :class:`dict` that maps stage names to :class:`StageInfo`"""
+        with self._lock:
+            return {
+                stage: StageInfo(count=self._counts[stage], seconds=self._seconds[stage])
+                for stage in STAGES
+            }
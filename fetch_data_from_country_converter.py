@@ -1,11 +1,13 @@
 #!/usr/bin/env python3
 
+import argparse
 import csv
 import io
 import json
 import os
 import re
 import subprocess
+import sys
 import urllib.request
 
 upstream_url = 'https://github.com/konstantinstadler/country_converter/'
@@ -22,7 +24,16 @@ def show_diff(path):
     subprocess.run(['git', '-C', cwd, '--no-pager', 'diff', '--word-diff', path])
 
 
-def fetch_country_data():
+def read_url_or_path(url_or_path):
+    if re.match(r'^[a-z]+://', url_or_path):
+        with urllib.request.urlopen(url_or_path) as request:
+            return request.read().decode('utf-8')
+    else:
+        with open(url_or_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+
+def fetch_country_data(url_or_path):
     patches = {
         # https://github.com/konstantinstadler/country_converter/issues/92
         # https://github.com/konstantinstadler/country_converter/commit/6a06051e915e76a9ffc29fe0c08808cf403df99f
@@ -32,30 +43,37 @@ def fetch_country_data():
         },
     }
 
-    with urllib.request.urlopen(country_data_url) as request:
-        # Read TSV data
-        response_string = request.read().decode('utf-8')
-        data = csv.DictReader(io.StringIO(response_string), dialect=csv.excel_tab)
-        country_list = [
-            {
-                k.lower(): v
-                for k, v in country.items()
-            }
-            for country in data
-        ]
+    # Read TSV data
+    response_string = read_url_or_path(url_or_path)
+    data = csv.DictReader(io.StringIO(response_string), dialect=csv.excel_tab)
+    country_list = [
+        {
+            k.lower(): v
+            for k, v in country.items()
+        }
+        for country in data
+    ]
+
+    # Apply patches
+    for country in country_list:
+        if country['name_official'] in patches:
+            for k, v in patches[country['name_official']].items():
+                country[k] = v
+
+    # Overwrite packaged file
+    json_data = json.dumps(country_list, indent=2)
+    with open(country_data_file, 'w') as f:
+        f.write(json_data + '\n')
 
-        # Apply patches
-        for country in country_list:
-            if country['name_official'] in patches:
-                for k, v in patches[country['name_official']].items():
-                    country[k] = v
+    show_diff(country_data_file)
 
-        # Overwrite packaged file
-        json_data = json.dumps(country_list, indent=2)
-        with open(country_data_file, 'w') as f:
-            f.write(json_data + '\n')
 
-        show_diff(country_data_file)
+def build_lookup_data(filepath):
+    # Validate country data file and precompute indexes, normalized names,
+    # fuzzy matcher indexes and regular expression literals
+    sys.path.insert(0, cwd)
+    import countryguess
+    countryguess.write_prebuilt(filepath)
 
 
 def fetch_classifications_from_README():
@@ -103,5 +121,33 @@ def fetch_classifications_from_README():
     show_diff(readme_file)
 
 
-fetch_country_data()
-fetch_classifications_from_README()
+def main():
+    argparser = argparse.ArgumentParser(
+        description='Update packaged country data from country_converter',
+    )
+    argparser.add_argument(
+        '--tsv', default=country_data_url, metavar='URL_OR_PATH',
+        help='URL or path of country_data.tsv (default: %(default)s)',
+    )
+    argparser.add_argument(
+        '--skip-readme', action='store_true',
+        help="Don't update classification schemes in README.md (requires network access)",
+    )
+    argparser.add_argument(
+        '--only-build', nargs='?', const=country_data_file, metavar='JSON_FILE',
+        help=(
+            'Only build lookup data from existing JSON_FILE '
+            f'(default: {os.path.basename(country_data_file)})'
+        ),
+    )
+    args = argparser.parse_args()
+
+    if not args.only_build:
+        fetch_country_data(args.tsv)
+    build_lookup_data(args.only_build or country_data_file)
+    if not args.only_build and not args.skip_readme:
+        fetch_classifications_from_README()
+
+
+if __name__ == '__main__':
+    main()
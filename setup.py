@@ -36,6 +36,7 @@ setuptools.setup(
     package_data={
         get_var('__project_name__'): [
             '_countrydata.json',
+            '_countrydata.index',
         ]
     },
     entry_points={'console_scripts': ['countryguess = countryguess._cli:run']},
@@ -0,0 +1,78 @@
+import re
+
+import pytest
+
+from countryguess import _cache
+
+
+def test_LRUCache_get_and_set():
+    cache = _cache.LRUCache(maxsize=3)
+    assert cache.get('a') is None
+    assert cache.get('a', 'default') == 'default'
+    cache.set('a', 1)
+    cache.set('b', None)
+    cache.set('c', 3)
+    assert cache.get('a') == 1
+    assert cache.get('b', 'default') is None
+    assert cache.info() == _cache.CacheInfo(hits=2, misses=2, evictions=0, maxsize=3, currsize=3)
+
+
+def test_LRUCache_discards_least_recently_used_item():
+    cache = _cache.LRUCache(maxsize=3)
+    for key in ('a', 'b', 'c'):
+        cache.set(key, key.upper())
+    cache.get('a')
+    cache.set('d', 'D')
+    assert cache.get('b') is None
+    assert [cache.get(key) for key in ('a', 'c', 'd')] == ['A', 'C', 'D']
+    cache.set('a', 'AA')
+    cache.set('e', 'E')
+    assert cache.get('c') is None
+    assert cache.get('a') == 'AA'
+    assert cache.info() == _cache.CacheInfo(hits=5, misses=2, evictions=2, maxsize=3, currsize=3)
+
+
+@pytest.mark.parametrize('maxsize', (0, None), ids=lambda v: repr(v))
+def test_LRUCache_disabled(maxsize):
+    cache = _cache.LRUCache(maxsize=maxsize)
+    cache.set('a', 1)
+    assert cache.get('a') is None
+    assert cache.info() == _cache.CacheInfo(hits=0, misses=1, evictions=0, maxsize=0, currsize=0)
+
+
+def test_LRUCache_maxsize():
+    cache = _cache.LRUCache(maxsize=5)
+    for key in 'abcde':
+        cache.set(key, key.upper())
+    cache.maxsize = 2
+    assert [cache.get(key) for key in 'abcde'] == [None, None, None, 'D', 'E']
+    assert cache.info() == _cache.CacheInfo(hits=2, misses=3, evictions=3, maxsize=2, currsize=2)
+    cache.maxsize = 0
+    assert len(cache) == 0
+
+    with pytest.raises(ValueError, match=rf'^{re.escape("Cache size must not be negative: -1")}$'):
+        cache.maxsize = -1
+
+
+def test_LRUCache_clear():
+    cache = _cache.LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+    cache.get('a')
+    cache.get('b')
+    cache.clear()
+    assert cache.get('b') is None
+    assert cache.info() == _cache.CacheInfo(hits=0, misses=1, evictions=0, maxsize=2, currsize=0)
+
+
+def test_LRUCache_contains():
+    cache = _cache.LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    assert 'a' in cache
+    assert 'c' not in cache
+    # Checking doesn't change statistics or order
+    assert cache.info() == _cache.CacheInfo(hits=0, misses=0, evictions=0, maxsize=2, currsize=2)
+    cache.set('c', 3)
+    assert 'a' not in cache
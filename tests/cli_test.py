@@ -0,0 +1,218 @@
+import errno
+import io
+import json
+import re
+import sys
+
+import pytest
+
+from countryguess import _cache, _cli
+
+
+def run(mocker, *argv, stdin='', isatty=False):
+    mocker.patch.object(sys, 'argv', ['countryguess', *argv])
+    stdin = mocker.patch.object(sys, 'stdin', io.StringIO(stdin))
+    mocker.patch.object(stdin, 'isatty', return_value=isatty)
+    _cli.run()
+
+
+@pytest.mark.parametrize(
+    argnames='argv, exp_stdout, exp_stderr',
+    argvalues=(
+        (('de', 'iso3'), 'DEU\n', ''),
+        (('Germany', 'name_official'), 'Federal Republic of Germany\n', ''),
+        (('xyzzy', 'iso3'), '', 'No such country: xyzzy\n'),
+        (('de', 'foo'), '', 'No such attribute: foo\n'),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_single_country(argv, exp_stdout, exp_stderr, mocker, capsys):
+    run(mocker, *argv)
+    assert capsys.readouterr() == (exp_stdout, exp_stderr)
+
+
+def test_single_country_prints_all_attributes_as_json(mocker, capsys):
+    run(mocker, 'de')
+    stdout, stderr = capsys.readouterr()
+    info = json.loads(stdout)
+    assert info['iso3'] == 'DEU'
+    assert info['regex'].startswith('^(?!e|w)')
+    assert stderr == ''
+
+
+@pytest.mark.parametrize(
+    argnames='format, exp_stdout',
+    argvalues=(
+        (
+            'jsonl',
+            (
+                '{"query": "Germany", "iso3": "DEU", "isonumeric": "276"}\n'
+                '{"query": "xyzzy", "iso3": null, "isonumeric": null}\n'
+                '{"query": "", "iso3": null, "isonumeric": null}\n'
+                '{"query": "Côte d\'Ivoire", "iso3": "CIV", "isonumeric": "384"}\n'
+                '{"query": "Germany", "iso3": "DEU", "isonumeric": "276"}\n'
+            ),
+        ),
+        (
+            'csv',
+            (
+                'query,iso3,isonumeric\n'
+                'Germany,DEU,276\n'
+                'xyzzy,,\n'
+                ',,\n'
+                "Côte d'Ivoire,CIV,384\n"
+                'Germany,DEU,276\n'
+            ),
+        ),
+        (
+            'tsv',
+            (
+                'query\tiso3\tisonumeric\n'
+                'Germany\tDEU\t276\n'
+                'xyzzy\t\t\n'
+                '\t\t\n'
+                "Côte d'Ivoire\tCIV\t384\n"
+                'Germany\tDEU\t276\n'
+            ),
+        ),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_batch_from_stdin(format, exp_stdout, mocker, capsys):
+    stdin = "Germany\n  xyzzy \n\nCôte d'Ivoire\r\nGermany"
+    run(mocker, '--format', format, '--attributes', 'iso3, isonumeric', stdin=stdin)
+    assert capsys.readouterr() == (exp_stdout, '')
+
+
+def test_batch_prints_all_attributes_by_default(mocker, capsys):
+    run(mocker, stdin='Germany\n')
+    stdout, stderr = capsys.readouterr()
+    row = json.loads(stdout)
+    assert row['query'] == 'Germany'
+    assert row['iso3'] == 'DEU'
+    assert row['name_short'] == 'Germany'
+    assert row['regex'].startswith('^(?!e|w)')
+    assert stderr == ''
+
+
+def test_batch_from_files(tmp_path, mocker, capsys):
+    (tmp_path / 'a.txt').write_text('Germany\nFrance\n', encoding='utf-8')
+    (tmp_path / 'b.txt').write_text('Japan\n', encoding='utf-8')
+    run(
+        mocker,
+        '-i', str(tmp_path / 'a.txt'), '-i', '-', '-i', str(tmp_path / 'b.txt'),
+        '-f', 'csv', '-a', 'iso2',
+        stdin='Zimbabwe\n',
+    )
+    assert capsys.readouterr() == ('query,iso2\nGermany,DE\nFrance,FR\nZimbabwe,ZW\nJapan,JP\n', '')
+
+
+def test_batch_from_nonexisting_file(tmp_path, mocker, capsys):
+    (tmp_path / 'a.txt').write_text('Germany\n', encoding='utf-8')
+    with pytest.raises(SystemExit, match=r'^1$'):
+        run(mocker, '-i', str(tmp_path / 'a.txt'), '-i', str(tmp_path / 'b.txt'), '-a', 'iso2')
+    assert capsys.readouterr() == (
+        '{"query": "Germany", "iso2": "DE"}\n',
+        f'Failed to read {tmp_path / "b.txt"}: No such file or directory\n',
+    )
+
+
+def test_batch_with_unknown_attribute(mocker, capsys):
+    with pytest.raises(SystemExit, match=r'^1$'):
+        run(mocker, '-a', 'iso3,foo', stdin='Germany\n')
+    assert capsys.readouterr() == ('', 'No such attribute: foo\n')
+
+
+@pytest.mark.parametrize(
+    argnames='exception, exp_stderr',
+    argvalues=(
+        (OSError(errno.ENOSPC, 'No space left on device'), 'Failed to write output: No space left on device\n'),
+        (BrokenPipeError(errno.EPIPE, 'Broken pipe'), ''),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_batch_with_failing_output(exception, exp_stderr, mocker, capsys):
+    stdout = mocker.patch.object(sys, 'stdout', io.StringIO())
+    mocker.patch.object(stdout, 'write', side_effect=exception)
+    mocker.patch.object(stdout, 'fileno', return_value=1)
+    dup2 = mocker.patch('os.dup2')
+    with pytest.raises(SystemExit, match=r'^1$'):
+        run(mocker, '-a', 'iso2', stdin='Germany\n')
+    assert capsys.readouterr().err == exp_stderr
+    assert dup2.call_args_list == [mocker.call(mocker.ANY, 1)]
+
+
+def test_batch_looks_up_repeated_countries_once(mocker, capsys):
+    instances = []
+    CountryData_orig = _cli.CountryData
+
+    def CountryData(*args, **kwargs):
+        instances.append(CountryData_orig(*args, **kwargs))
+        return instances[-1]
+
+    mocker.patch('countryguess._cli.CountryData', side_effect=CountryData)
+    run(mocker, '--cache-size', '2', '-a', 'iso2', stdin='Germany\nFrance\nGermany\nGermany\n')
+    assert capsys.readouterr().out.count('"DE"') == 3
+    assert len(instances) == 1
+    assert instances[0].cache_info() == _cache.CacheInfo(
+        hits=2, misses=2, evictions=0, maxsize=2, currsize=2,
+    )
+
+
+def test_batch_flushes_output_regularly(mocker):
+    mocker.patch.object(_cli, '_FLUSH_INTERVAL', 0)
+    stdout = mocker.patch.object(sys, 'stdout', io.StringIO())
+    mocker.patch.object(stdout, 'flush')
+    run(mocker, '-a', 'iso2', stdin='Germany\nFrance\nJapan\n')
+    assert stdout.getvalue().count('\n') == 3
+    assert stdout.flush.call_args_list == [mocker.call()] * 4
+
+
+@pytest.mark.parametrize(
+    argnames='argv, exp_error',
+    argvalues=(
+        (('de', '-i', 'foo.txt'), 'COUNTRY and --input are mutually exclusive'),
+        (('de', '-f', 'csv'), 'COUNTRY and --format are mutually exclusive'),
+        (('de', '-a', 'iso2'), 'COUNTRY and --attributes are mutually exclusive'),
+        (('de', 'iso2', '--cache-size', '10'), 'COUNTRY and --cache-size are mutually exclusive'),
+        (('--cache-size', '-1'), 'Cache size must not be negative: -1'),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_invalid_arguments(argv, exp_error, mocker, capsys):
+    with pytest.raises(SystemExit):
+        run(mocker, *argv)
+    assert re.search(rf'error: {re.escape(exp_error)}$', capsys.readouterr().err)
+
+
+@pytest.mark.parametrize(
+    argnames='argv',
+    argvalues=((), ('-a', 'iso2'), ('--format', 'csv')),
+    ids=lambda v: repr(v),
+)
+def test_batch_from_terminal_without_input(argv, mocker, capsys):
+    with pytest.raises(SystemExit):
+        run(mocker, *argv, stdin='Germany\n', isatty=True)
+    assert re.search(
+        r'error: COUNTRY or --input is required if stdin is a terminal$',
+        capsys.readouterr().err,
+    )
+
+
+def test_batch_from_terminal_with_input(tmp_path, mocker, capsys):
+    (tmp_path / 'a.txt').write_text('Germany\n', encoding='utf-8')
+    run(mocker, '-i', str(tmp_path / 'a.txt'), '-a', 'iso2', isatty=True)
+    assert capsys.readouterr() == ('{"query": "Germany", "iso2": "DE"}\n', '')
+
+
+def test_build_shared_file(tmp_path, mocker, capsys):
+    run(mocker, '--build-shared-file', str(tmp_path / 'countries.shared'))
+    assert capsys.readouterr() == ('', '')
+    countrydata = _cli.CountryData(shared_file=tmp_path / 'countries.shared')
+    assert countrydata.get('Germany')['iso3'] == 'DEU'
+
+
+def test_build_shared_file_fails(tmp_path, mocker, capsys):
+    path = tmp_path / 'nonexisting' / 'countries.shared'
+    run(mocker, '--build-shared-file', str(path))
+    assert capsys.readouterr() == ('', f'Failed to write {path}: No such file or directory\n')
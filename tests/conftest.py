@@ -0,0 +1,18 @@
+import pytest
+
+from countryguess import _guess_country
+
+
+@pytest.fixture(autouse=True)
+def isolated_disk_cache(tmp_path, monkeypatch):
+    # Don't read or write cache files in the user's home directory
+    monkeypatch.setenv('COUNTRYGUESS_CACHE_DIR', str(tmp_path / 'countryguess-cache'))
+    monkeypatch.delenv('COUNTRYGUESS_NO_DISK_CACHE', raising=False)
+
+
+@pytest.fixture(autouse=True)
+def remove_CountryData_instances():
+    try:
+        yield
+    finally:
+        _guess_country._countrydata = None
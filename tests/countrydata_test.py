@@ -1,12 +1,21 @@
+import array
+import asyncio
+import concurrent.futures
 import copy
+import inspect
 import io
+import os
+import pickle
 import re
 import sys
-from unittest.mock import Mock, call
+import threading
+import time
+import types
+from unittest.mock import ANY, Mock, call
 
 import pytest
 
-from countryguess import __project_name__, _countrydata
+from countryguess import RegexMap, __project_name__, _countrydata, _fuzzy
 
 
 def test_lazy_load_countries(mocker):
@@ -76,17 +85,20 @@ def test_CountryData_lazy_loaded_method(method_name, args, kwargs):
         (
             'custom/countries.json',
             '[{"name_short": "Customland", "regex": "^custom$"}]',
-            [{'name_short': 'Customland', 'regex': re.compile('^custom$', flags=re.IGNORECASE)}],
+            [{'name_short': 'Customland', 'regex': '^custom$'}],
         ),
         (
             None,
             '[{"name_short": "Kingdom of Default", "regex": "^default$"}]',
-            [{'name_short': 'Kingdom of Default', 'regex': re.compile('^default$', flags=re.IGNORECASE)}],
+            [{'name_short': 'Kingdom of Default', 'regex': '^default$'}],
         ),
     ),
     ids=lambda v: repr(v),
 )
 def test_load_countries(filepath, filecontent, exp_countries, tmp_path, mocker):
+    # Don't use prebuilt lookup data for the packaged file
+    mocker.patch('countryguess._prebuilt.read', return_value=None)
+
     if sys.version_info <= (3, 9, 0):
         # TODO: Remove this when Python 3.9 is no longer supported
         open_text_mock = mocker.patch('importlib.resources.open_text', return_value=(
@@ -123,6 +135,13 @@ def test_load_countries(filepath, filecontent, exp_countries, tmp_path, mocker):
     return_value = countrydata._load_countries()
     assert return_value == exp_countries
 
+    # Regular expressions are compiled when countries are returned
+    countrydata._countries = return_value
+    assert countrydata.countries == [
+        {**country, 'regex': re.compile(country['regex'], flags=re.IGNORECASE)}
+        for country in exp_countries
+    ]
+
     if filepath is None:
         assert_expectations()
 
@@ -424,3 +443,1244 @@ def test_CountryData_getattr(attribute, country, exp_result, mocker):
     else:
         return_value = getattr(countrydata, attribute)(country)
         assert return_value == exp_result
+
+
+@pytest.mark.parametrize(
+    argnames='code, exp_result',
+    argvalues=(
+        ('de', 'DE'),
+        ('DEU', 'DEU'),
+        ('276', '276'),
+        ('040', '40'),
+        ('0', '0'),
+        (40, '40'),
+        ('²', '²'),
+        ('', ''),
+        (True, None),
+        (4.0, '4'),
+        (4.5, None),
+        (float('nan'), None),
+        (float('inf'), None),
+        (b'DE', None),
+        ('.de', '.DE'),
+        (None, None),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_normalize_code(code, exp_result):
+    assert _countrydata._normalize_code(code) == exp_result
+
+
+@pytest.mark.parametrize(
+    argnames='name, exp_result',
+    argvalues=(
+        ('Germany', 'germany'),
+        ("Côte d'Ivoire", 'cote d ivoire'),
+        ('ÅLAND ISLANDS', 'aland islands'),
+        ('  Korea,  Republic of ', 'korea republic of'),
+        ('Guinea-Bissau', 'guinea bissau'),
+        ('Straße', 'strasse'),
+        ('_-_', ''),
+        ('', ''),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_normalize_name(name, exp_result):
+    assert _countrydata._normalize_name(name) == exp_result
+
+
+name_index_test_data = '''[
+    {"name_short": "Foo", "name_official": "Republic of Föo", "iso2": "AB", "iso3": "ABC", "regex": "^foo$"},
+    {"name_short": "Bar", "name_official": "Kingdom of Bar", "iso2": "DE", "iso3": "DEF", "regex": "^bar$"},
+    {"name_short": "FOO!", "name_official": "Baz", "iso2": "GH", "iso3": "GHI", "regex": "^baz$"}
+]'''
+
+
+@pytest.mark.parametrize(
+    argnames='query, aliases, exp_result',
+    argvalues=(
+        ('foo', {}, 'ABC'),
+        ('republic of foo', {}, 'ABC'),
+        ('Kingdom-of-Bar', {}, 'DEF'),
+        ('baz', {}, 'GHI'),
+        ('Land of Bar', {}, None),
+        ('Land of Bar', {'Land of Bar': 'de'}, 'DEF'),
+        ('LAND OF BAR.', {'Land of Bar': 'DE'}, 'DEF'),
+        ('Foo', {'Foo': 'GH'}, 'GHI'),
+        ('Foo', {'Foo': 'XX'}, RuntimeError("Not a ISO 3166-1 alpha-2 country code: 'XX'")),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_find_country_by_name(query, aliases, exp_result, tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(name_index_test_data, encoding='utf-8')
+    countrydata = _countrydata.CountryData(filepath, aliases=aliases)
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata._find_country_stage(query, None)
+    else:
+        info, stage = countrydata._find_country_stage(query, None)
+        if exp_result is None:
+            assert info is None
+        else:
+            assert (info['iso3'], stage) == (exp_result, 'name')
+
+
+def test_CountryData_custom_regex_map_takes_precedence_over_names():
+    countrydata = _countrydata.CountryData()
+    regex_map = {'FR': re.compile(r'^germany$', flags=re.IGNORECASE)}
+    assert countrydata.get('Germany', regex_map=regex_map)['iso3'] == 'FRA'
+    assert countrydata.get('Germany')['iso3'] == 'DEU'
+
+
+find_by_test_data = '''[
+{"iso3": "ABC", "iso2": "AB", "isonumeric": "4", "cctld": "ab", "name_short": "Foo", "regex": "irrelevant"},
+{"iso3": "DEF", "iso2": "", "isonumeric": "40", "cctld": "", "name_short": "Bar", "regex": "irrelevant"},
+{"iso3": "GHI", "iso2": "GH", "isonumeric": "40", "cctld": "gh", "name_short": "Baz", "regex": "irrelevant"}
+]'''
+
+@pytest.mark.parametrize(
+    argnames='attribute, value, exp_result',
+    argvalues=(
+        ('iso2', 'ab', 'Foo'),
+        ('iso2', 'GH', 'Baz'),
+        ('iso2', '', 'default'),
+        ('iso3', 'dEf', 'Bar'),
+        ('iso3', 'AB', 'default'),
+        ('isonumeric', 4, 'Foo'),
+        ('isonumeric', '004', 'Foo'),
+        ('isonumeric', '40', 'Bar'),
+        ('isonumeric', 41, 'default'),
+        ('isonumeric', 40.0, 'Bar'),
+        ('isonumeric', float('nan'), 'default'),
+        ('cctld', 'GH', 'Baz'),
+        ('cctld', '.gh', 'Baz'),
+        ('cctld', '.AB', 'Foo'),
+        ('cctld', 'de', 'default'),
+        ('name_short', 'baz', 'Baz'),
+        ('iso4', 'ABCD', AttributeError('iso4')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_find_by(attribute, value, exp_result, tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(find_by_test_data)
+    countrydata = _countrydata.CountryData(filepath)
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata.find_by(attribute, value, default='default')
+    else:
+        info = countrydata.find_by(attribute, value, default='default')
+        if exp_result == 'default':
+            assert info == 'default'
+        else:
+            assert info['name_short'] == exp_result
+
+    # Index is cached
+    if attribute != 'iso4':
+        assert countrydata._get_index(attribute) is countrydata._get_index(attribute)
+
+
+@pytest.mark.parametrize(
+    argnames='countries, attribute, default, exp_result, exp_lookups',
+    argvalues=(
+        ([], None, None, [], []),
+        (['ab', 'xx', 'ab'], None, None, [{'iso2': 'AB', 'iso3': 'ABC'}, None, {'iso2': 'AB', 'iso3': 'ABC'}], ['ab', 'xx']),
+        (['ab', 'xx', 'ab'], None, 'default', [{'iso2': 'AB', 'iso3': 'ABC'}, 'default', {'iso2': 'AB', 'iso3': 'ABC'}], ['ab', 'xx']),
+        (['ab', 'xx', 'ab'], 'iso3', None, ['ABC', None, 'ABC'], ['ab', 'xx']),
+        (('xx', 'ab', 'de', 'xx'), 'iso3', 'default', ['default', 'ABC', 'DEF', 'default'], ['xx', 'ab', 'de']),
+        (['ab'], 'iso4', None, AttributeError('iso4'), []),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_get_many(countries, attribute, default, exp_result, exp_lookups, mocker):
+    infos = {
+        'ab': {'iso2': 'AB', 'iso3': 'ABC'},
+        'de': {'iso2': 'DE', 'iso3': 'DEF'},
+    }
+    countrydata = _countrydata.CountryData()
+    countrydata._countries = list(infos.values())
+    mocker.patch.object(countrydata, '_find_country', side_effect=lambda c, regex_map: infos.get(c))
+    regex_map = {'AB': re.compile('^a+$')}
+
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata.get_many(iter(countries), attribute=attribute, default=default, regex_map=regex_map)
+    else:
+        return_value = countrydata.get_many(iter(countries), attribute=attribute, default=default, regex_map=regex_map)
+        assert return_value == exp_result
+    assert countrydata._find_country.call_args_list == [
+        call(country, regex_map=regex_map)
+        for country in exp_lookups
+    ]
+
+
+def test_CountryData_get_many_returns_same_results_as_get():
+    countrydata = _countrydata.CountryData()
+    countries = ['de', 'DEU', 'Germany', 'germani', 'Zimbabwe', 'n/a', 'de', 'Germany', '']
+    assert countrydata.get_many(countries) == [countrydata.get(country) for country in countries]
+
+
+def test_CountryData_get_caches_results(mocker):
+    countrydata = _countrydata.CountryData(cache_size=2)
+    mocker.patch.object(countrydata, '_find_country', side_effect=lambda c, regex_map: {'ab': 'AB'}.get(c))
+    regex_map = {'AB': re.compile('^a$')}
+
+    assert countrydata.get('ab') == 'AB'
+    assert countrydata.get('ab') == 'AB'
+    assert countrydata.get('xx', default='default') == 'default'
+    assert countrydata.get('xx', default='default') == 'default'
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    assert countrydata._find_country.call_args_list == [
+        call('ab', regex_map=None),
+        call('xx', regex_map=None),
+        call('ab', regex_map=regex_map),
+    ]
+    assert countrydata.cache_info() == _countrydata._cache.CacheInfo(
+        hits=3, misses=3, evictions=1, maxsize=2, currsize=2,
+    )
+
+    # Changing regex_map changes the cache key
+    regex_map['DE'] = re.compile('^d$')
+    countrydata.get('ab', regex_map=regex_map)
+    assert countrydata._find_country.call_args_list[-1] == call('ab', regex_map=regex_map)
+    assert len(countrydata._find_country.call_args_list) == 4
+
+    # Results for unhashable regex_map are not cached
+    regex_map = {'AB': ['not', 'a', 'regex']}
+    countrydata.get('ab', regex_map=regex_map)
+    countrydata.get('ab', regex_map=regex_map)
+    assert len(countrydata._find_country.call_args_list) == 6
+
+    countrydata.cache_clear()
+    assert countrydata.cache_info() == _countrydata._cache.CacheInfo(
+        hits=0, misses=0, evictions=0, maxsize=2, currsize=0,
+    )
+
+
+def test_CountryData_get_caches_results_for_RegexMap(mocker):
+    countrydata = _countrydata.CountryData(cache_size=10)
+    mocker.patch.object(countrydata, '_find_country', side_effect=lambda c, regex_map: {'ab': 'AB'}.get(c))
+    regex_map = RegexMap({'AB': re.compile('^a$')})
+
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    assert countrydata._find_country.call_args_list == [call('ab', regex_map=regex_map)]
+
+    # Modifying regex_map invalidates cached results
+    regex_map.add('DE', re.compile('^d$'))
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    regex_map.remove('DE')
+    assert countrydata.get('ab', regex_map=regex_map) == 'AB'
+    assert len(countrydata._find_country.call_args_list) == 3
+
+
+@pytest.mark.parametrize(
+    argnames='string, exp_iso3',
+    argvalues=(
+        ('Mongol Uls', 'MNG'),
+        ('Nippon-koku', 'JPN'),
+        ('Germany', 'DEU'),
+        ('DEU', 'DEU'),
+        ('nothing like a country', None),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_get_with_RegexMap(string, exp_iso3):
+    countrydata = _countrydata.CountryData()
+    regex_map = {
+        'MN': re.compile(r'mongol', flags=re.IGNORECASE),
+        'JP': re.compile(r'nippon', flags=re.IGNORECASE),
+    }
+    info = countrydata.get(string, regex_map=RegexMap(regex_map))
+    assert info == countrydata.get(string, regex_map=regex_map)
+    assert (info or {}).get('iso3') == exp_iso3
+
+
+def test_CountryData_validates_RegexMap_once(mocker):
+    countrydata = _countrydata.CountryData()
+    regex_map = RegexMap({'MN': re.compile(r'mongol', flags=re.IGNORECASE)})
+    mocker.patch.object(countrydata, '_validate_regex_map', wraps=countrydata._validate_regex_map)
+
+    assert countrydata._find_country('Mongol Uls', regex_map=regex_map)['iso3'] == 'MNG'
+    assert countrydata._validate_regex_map.call_args_list == []
+    for _ in range(3):
+        assert countrydata._find_country('nothing like a country', regex_map=regex_map) is None
+    assert countrydata._validate_regex_map.call_args_list == [call(regex_map)]
+
+    # Other instances validate on their own
+    other = _countrydata.CountryData()
+    mocker.patch.object(other, '_validate_regex_map')
+    other._find_country('nothing like a country', regex_map=regex_map)
+    assert other._validate_regex_map.call_args_list == [call(regex_map)]
+
+    # Modified maps are validated again
+    regex_map['XX'] = re.compile(r'^xxx$')
+    exp_exception = RuntimeError("Not a ISO 3166-1 alpha-2 country code: 'XX'")
+    for _ in range(2):
+        with pytest.raises(type(exp_exception), match=rf'^{re.escape(str(exp_exception))}$'):
+            countrydata._find_country('nothing like a country', regex_map=regex_map)
+
+
+def test_CountryData_cache_size():
+    countrydata = _countrydata.CountryData()
+    assert countrydata.cache_size == 0
+    countrydata.get('de')
+    assert countrydata.cache_info().currsize == 0
+
+    countrydata.cache_size = 10
+    assert countrydata.cache_size == 10
+    info = countrydata.get('germany')
+    assert countrydata.get('germany') is info
+    assert countrydata.get_many(['germany', 'de']) == [info, info]
+    assert countrydata.cache_info() == _countrydata._cache.CacheInfo(
+        hits=2, misses=2, evictions=0, maxsize=10, currsize=2,
+    )
+
+
+convert_test_data = '''[
+{"iso3": "ABC", "iso2": "AB", "isonumeric": "4", "continent": "Foo", "name_short": "Fooland", "name_official": "Fooland", "regex": "^fo+$"},
+{"iso3": "DEF", "iso2": "DE", "isonumeric": "40", "continent": "Bar", "name_short": "Barland", "name_official": "Barland", "regex": "^ba+r$"},
+{"iso3": "GHI", "iso2": "GH", "isonumeric": "400", "continent": "Bar", "name_short": "Bazland", "name_official": "Bazland", "regex": "^ba+z$"}
+]'''
+
+class ArrayLike:
+    def __init__(self, values):
+        self.values = values
+
+    def tolist(self):
+        return list(self.values)
+
+    def __iter__(self):
+        raise AssertionError('tolist() should be used')
+
+
+@pytest.mark.parametrize(
+    argnames='values, src, to, exp_result',
+    argvalues=(
+        (['ABC', 'ghi', 'xyz', 'ABC'], 'iso3', 'iso2', ['AB', 'GH', 'default', 'AB']),
+        (('AB', 'DE'), 'iso2', 'continent', ['Foo', 'Bar']),
+        (['4', 40, '0400', 1], 'isonumeric', 'iso3', ['ABC', 'DEF', 'GHI', 'default']),
+        (ArrayLike([4, 400]), 'isonumeric', 'iso2', ['AB', 'GH']),
+        (array.array('H', [40, 4, 5]), 'isonumeric', 'iso2', ['DE', 'AB', 'default']),
+        (array.array('d', [40.0, float('nan'), 4.0, 4.5]), 'isonumeric', 'iso2', ['DE', 'default', 'AB', 'default']),
+        (ArrayLike([4.0, 400.0]), 'isonumeric', 'iso2', ['AB', 'GH']),
+        (['fooo', 'DEF', 'baaar', 'Bazlan'], 'iso3', 'iso2', ['AB', 'DE', 'DE', 'GH']),
+        (['fooo', 'DEF', 'baaar', 'Bazlan', 'nope'], None, 'continent', ['Foo', 'Bar', 'Bar', 'Bar', 'default']),
+        (['AB'], 'iso4', 'iso2', AttributeError('iso4')),
+        (['AB'], 'iso2', 'iso4', AttributeError('iso4')),
+        ('AB', 'iso2', 'iso3', TypeError("Expected iterable of values, not string: 'AB'")),
+        (b'AB', 'iso2', 'iso3', TypeError("Expected iterable of values, not string: b'AB'")),
+        (bytearray(b'AB'), 'iso2', 'iso3', TypeError("Expected iterable of values, not string: bytearray(b'AB')")),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_convert(values, src, to, exp_result, tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(convert_test_data)
+    countrydata = _countrydata.CountryData(filepath)
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata.convert(values, src=src, to=to, default='default')
+    else:
+        return_value = countrydata.convert(values, src=src, to=to, default='default')
+        assert return_value == exp_result
+
+
+def test_CountryData_convert_builds_translation_once(tmp_path, mocker):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(convert_test_data)
+    countrydata = _countrydata.CountryData(filepath)
+    mocker.patch.object(countrydata, '_find_country', wraps=countrydata._find_country)
+
+    assert countrydata.convert(['AB', 'xx', 'xx'], src='iso2', to='iso3') == ['ABC', None, None]
+    table = countrydata._get_translation('iso2', 'iso3')
+    assert table == {'AB': 'ABC', 'DE': 'DEF', 'GH': 'GHI'}
+    assert countrydata.convert(['DE'], src='iso2', to='iso3') == ['DEF']
+    assert countrydata._get_translation('iso2', 'iso3') is table
+
+    # Only values that are not codes are looked up, and only once
+    assert countrydata._find_country.call_args_list == [call('xx', regex_map=None)]
+
+
+def test_CountryData_uses_disk_cache(tmp_path, mocker):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(find_by_test_data)
+    cache_dir = tmp_path / 'cache'
+
+    countrydata = _countrydata.CountryData(filepath, disk_cache=cache_dir)
+    mocker.patch.object(countrydata, '_read_countries', wraps=countrydata._read_countries)
+    exp_countries = countrydata.countries
+    assert countrydata._read_countries.call_args_list == [call()]
+    assert len(list(cache_dir.iterdir())) == 1
+
+    countrydata = _countrydata.CountryData(filepath, disk_cache=cache_dir)
+    mocker.patch.object(countrydata, '_read_countries', wraps=countrydata._read_countries)
+    assert countrydata.countries == exp_countries
+    assert countrydata._read_countries.call_args_list == []
+    assert countrydata._indexes['iso2'] == {'AB': 0, 'GH': 2}
+    assert countrydata._regex_literals == [(('irrelevant',),)] * 3
+    assert countrydata['gh']['name_short'] == 'Baz'
+    assert countrydata['this is irrelevant']['name_short'] == 'Foo'
+
+    # Changed file is read again
+    filepath.write_text(property_test_data)
+    os.utime(filepath, ns=(1, 1))
+    countrydata = _countrydata.CountryData(filepath, disk_cache=cache_dir)
+    mocker.patch.object(countrydata, '_read_countries', wraps=countrydata._read_countries)
+    assert countrydata['gh']['name_short'] == 'Baz'
+    assert countrydata['de']['name_short'] == 'Bar'
+    assert countrydata._read_countries.call_args_list == [call()]
+
+
+@pytest.mark.parametrize(
+    argnames='disk_cache, env, exp_cache_dir',
+    argvalues=(
+        (True, {}, 'env'),
+        (True, {'COUNTRYGUESS_NO_DISK_CACHE': '1'}, None),
+        ('custom', {'COUNTRYGUESS_NO_DISK_CACHE': '1'}, 'custom'),
+        (False, {}, None),
+        (None, {}, None),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_disk_cache_argument(disk_cache, env, exp_cache_dir, tmp_path, monkeypatch):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(find_by_test_data)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    if disk_cache == 'custom':
+        disk_cache = tmp_path / 'custom'
+
+    countrydata = _countrydata.CountryData(filepath, disk_cache=disk_cache)
+    countrydata.countries
+
+    cache_dirs = {
+        'env': tmp_path / 'countryguess-cache',
+        'custom': tmp_path / 'custom',
+    }
+    for name, cache_dir in cache_dirs.items():
+        if name == exp_cache_dir:
+            assert len(list(cache_dir.iterdir())) == 1
+        else:
+            assert not cache_dir.exists()
+
+
+@pytest.mark.parametrize('readonly', (False, True), ids=lambda v: f'readonly={v!r}')
+def test_CountryData_compiles_regexes_on_demand(readonly, tmp_path, mocker):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(convert_test_data)
+    countrydata = _countrydata.CountryData(filepath, readonly=readonly)
+    exp_patterns = [re.compile(pattern, flags=re.IGNORECASE) for pattern in ('^fo+$', '^ba+r$', '^ba+z$')]
+    compile_mock = mocker.patch('re.compile', wraps=re.compile)
+
+    assert countrydata.get('GH')['regex'] == exp_patterns[2]
+    assert countrydata.find_by('isonumeric', 400)['regex'] == exp_patterns[2]
+    assert countrydata.convert(['AB'], src='iso2', to='name_short') == ['Fooland']
+    assert compile_mock.call_args_list == [call('^ba+z$', flags=re.IGNORECASE)]
+
+    assert countrydata.convert(['AB'], src='iso2', to='regex') == [exp_patterns[0]]
+    assert [country['regex'] for country in countrydata.countries] == exp_patterns
+    assert len(compile_mock.call_args_list) == 3
+
+
+def test_CountryData_compact(tmp_path, mocker):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(convert_test_data)
+    countrydata = _countrydata.CountryData(filepath, compact=True)
+    compile_mock = mocker.patch('re.compile', wraps=re.compile)
+
+    info = countrydata['ghi']
+    assert isinstance(info, _countrydata._records.Country)
+    assert info.name_short == 'Bazland'
+    assert countrydata.get('GH') is info
+    assert countrydata.find_by('isonumeric', 400) is info
+    assert countrydata.get_many(['GH', 'DEF']) == [info, countrydata['DE']]
+    assert compile_mock.call_args_list == []
+
+    assert countrydata.get('baaaaz') is info
+    assert countrydata.get('Bazlnd') is info
+    assert countrydata.convert(['Bazlnd'], src='iso2', to='iso3') == ['GHI']
+
+    countries = countrydata.countries
+    assert all(type(country) is dict for country in countries)
+    assert countries[2] == info
+    countries[2]['iso3'] = 'XYZ'
+    assert info['iso3'] == 'GHI'
+
+
+@pytest.mark.parametrize(
+    argnames='compact, exp_type',
+    argvalues=(
+        (False, types.MappingProxyType),
+        (True, _countrydata._records.Country),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_readonly(compact, exp_type, tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(convert_test_data)
+    countrydata = _countrydata.CountryData(filepath, compact=compact, readonly=True)
+
+    countries = countrydata.countries
+    assert isinstance(countries, tuple)
+    assert countries is countrydata.countries
+    assert [country['iso3'] for country in countries] == ['ABC', 'DEF', 'GHI']
+    assert all(type(country) is exp_type for country in countries)
+
+    assert countrydata.get('GH') is countries[2]
+    assert countrydata['Bazlnd'] is countries[2]
+    assert countrydata['baaaar'] is countries[1]
+    assert countrydata.find_by('isonumeric', 4) is countries[0]
+    assert countrydata.get_many(['AB', 'DEF']) == [countries[0], countries[1]]
+    assert countrydata.iso3('ghi') == 'GHI'
+
+    with pytest.raises(TypeError):
+        countrydata.get('GH')['iso3'] = 'XYZ'
+    assert countrydata.get('GH')['iso3'] == 'GHI'
+
+
+def test_CountryData_loads_only_once_with_multiple_threads(mocker):
+    mocker.patch('countryguess._prebuilt.read', return_value=None)
+    countrydata = _countrydata.CountryData()
+    load_countries = countrydata._load_countries
+    barrier = threading.Barrier(8)
+
+    def slow_load_countries():
+        time.sleep(0.1)
+        return load_countries()
+
+    mocker.patch.object(countrydata, '_load_countries', side_effect=slow_load_countries)
+    mocker.patch.object(_fuzzy, 'FuzzyMatcher', wraps=_fuzzy.FuzzyMatcher)
+
+    def lookup():
+        barrier.wait()
+        return countrydata.get('Germny')
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: lookup(), range(8)))
+
+    assert all(result is results[0] for result in results)
+    assert results[0]['iso3'] == 'DEU'
+    assert countrydata._load_countries.call_args_list == [call()]
+    assert len(_fuzzy.FuzzyMatcher.call_args_list) == 2
+
+
+def test_CountryData_loads_without_waiting_for_other_instances(mocker):
+    mocker.patch('countryguess._prebuilt.read', return_value=None)
+    slow = _countrydata.CountryData(disk_cache=False)
+    fast = _countrydata.CountryData(disk_cache=False)
+    load_countries = slow._load_countries
+    loading = threading.Event()
+    done = threading.Event()
+
+    def slow_load_countries():
+        loading.set()
+        assert done.wait(timeout=10)
+        return load_countries()
+
+    mocker.patch.object(slow, '_load_countries', side_effect=slow_load_countries)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+        future = executor.submit(slow.get, 'Germny')
+        assert loading.wait(timeout=10)
+        assert fast.get('Germny')['iso3'] == 'DEU'
+        assert fast.members('eu')
+        assert not future.done()
+        done.set()
+        assert future.result()['iso3'] == 'DEU'
+
+
+def test_cached_property_computes_value_only_once():
+    barrier = threading.Barrier(8)
+    calls = []
+
+    class Foo:
+        def __init__(self):
+            self._lock = threading.RLock()
+
+        @_countrydata._cached_property
+        def bar(self):
+            """Bar docs"""
+            calls.append(self)
+            time.sleep(0.1)
+            return object()
+
+    foo = Foo()
+
+    def get_bar():
+        barrier.wait()
+        return foo.bar
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: get_bar(), range(8)))
+
+    assert all(result is results[0] for result in results)
+    assert calls == [foo]
+    assert Foo.bar.__doc__ == 'Bar docs'
+    assert Foo().bar is not foo.bar
+
+
+def test_CountryData_preload(mocker):
+    mocker.patch('countryguess._prebuilt.read', return_value=None)
+    countrydata = _countrydata.CountryData(disk_cache=False)
+    assert countrydata._countries is None
+    countrydata.preload()
+    assert countrydata._countries is not None
+    assert set(countrydata._indexes) == set(_countrydata._CODE_ATTRIBUTES)
+    for name in ('_regex_index', '_fuzzy_matchers', 'names_official', 'names_short'):
+        assert name in countrydata.__dict__
+
+
+@pytest.mark.parametrize(
+    argnames='query, regex_map, exp_stage, exp_iso3',
+    argvalues=(
+        ('de', None, 'iso2', 'DEU'),
+        ('deu', None, 'iso3', 'DEU'),
+        ('Mongol Uls', {'MN': re.compile(r'mongol', flags=re.IGNORECASE)}, 'regex_map', 'MNG'),
+        ('Mongol Uls', RegexMap({'MN': re.compile(r'mongol', flags=re.IGNORECASE)}), 'regex_map', 'MNG'),
+        ('federal republic of germany!', None, 'name', 'DEU'),
+        ('Korea, Republic of', None, 'regex', 'KOR'),
+        ('The Federal Republic of Germany', None, 'regex', 'DEU'),
+        ('Kingdom of Belgiu', None, 'fuzzy_official', 'BEL'),
+        ('Germani', None, 'fuzzy_short', 'DEU'),
+        ('this is not a country', None, 'miss', None),
+        ('this is not a country', {'MN': re.compile(r'mongol')}, 'miss', None),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_find_country_stage(query, regex_map, exp_stage, exp_iso3):
+    countrydata = _countrydata.CountryData()
+    info, stage = countrydata._find_country_stage(query, regex_map)
+    assert stage == exp_stage
+    assert (info or {}).get('iso3') == exp_iso3
+
+
+def test_CountryData_instrument(mocker):
+    countrydata = _countrydata.CountryData(cache_size=10, instrument=True)
+    assert countrydata.instrument is True
+    germany = countrydata.find_by('iso2', 'DE')
+    mocker.patch('time.perf_counter', side_effect=[1.0, 1.5, 2.0, 3.0, 4.0, 4.25, 5.0, 5.125])
+
+    assert countrydata.get('de') is germany
+    assert countrydata.get_many(['Germani', 'de']) == [germany, germany]
+    assert countrydata.convert(['this is not a country'], src='iso3') == [None]
+    assert countrydata.stage_info() == {
+        'cache': _countrydata._stats.StageInfo(count=1, seconds=0.25),
+        'iso2': _countrydata._stats.StageInfo(count=1, seconds=0.5),
+        'iso3': _countrydata._stats.StageInfo(count=0, seconds=0.0),
+        'regex_map': _countrydata._stats.StageInfo(count=0, seconds=0.0),
+        'name': _countrydata._stats.StageInfo(count=0, seconds=0.0),
+        'regex': _countrydata._stats.StageInfo(count=0, seconds=0.0),
+        'fuzzy_official': _countrydata._stats.StageInfo(count=0, seconds=0.0),
+        'fuzzy_short': _countrydata._stats.StageInfo(count=1, seconds=1.0),
+        'miss': _countrydata._stats.StageInfo(count=1, seconds=0.125),
+    }
+
+    countrydata.stage_clear()
+    assert all(info.count == 0 for info in countrydata.stage_info().values())
+
+    countrydata.instrument = False
+    assert countrydata.instrument is False
+    countrydata.get('deu')
+    assert all(info.count == 0 for info in countrydata.stage_info().values())
+
+
+def test_CountryData_lookup_hook(mocker):
+    lookup_hook = Mock()
+    countrydata = _countrydata.CountryData(lookup_hook=lookup_hook)
+    assert countrydata.lookup_hook is lookup_hook
+    countrydata.preload()
+    mocker.patch('time.perf_counter', side_effect=[1.0, 1.5, 2.0, 4.0])
+
+    assert countrydata.get('deu')['iso3'] == 'DEU'
+    assert countrydata.get('The Federal Republic of Germany')['iso3'] == 'DEU'
+    assert lookup_hook.call_args_list == [
+        call('deu', 'iso3', 0.5),
+        call('The Federal Republic of Germany', 'regex', 2.0),
+    ]
+    # Statistics are only collected if `instrument` is enabled
+    assert all(info.count == 0 for info in countrydata.stage_info().values())
+
+    countrydata.lookup_hook = None
+    assert countrydata.lookup_hook is None
+    countrydata.get('deu')
+    assert len(lookup_hook.call_args_list) == 2
+
+
+def test_CountryData_is_not_instrumented_by_default(mocker):
+    countrydata = _countrydata.CountryData()
+    mocker.patch.object(countrydata, '_find_country_instrumented')
+    countrydata.get('deu')
+    assert countrydata._find_country_instrumented.call_args_list == []
+
+
+def test_CountryData_remembers_misses(mocker):
+    countrydata = _countrydata.CountryData()
+    countrydata.preload()
+    regex_map = RegexMap({'MN': re.compile(r'mongol', flags=re.IGNORECASE)})
+    mocker.patch.object(countrydata._regex_index, 'search', wraps=countrydata._regex_index.search)
+
+    # Misses are remembered per RegexMap even without result cache
+    for _ in range(3):
+        assert countrydata.get('N/A') is None
+        assert countrydata.get('N/A', regex_map=regex_map) is None
+    assert countrydata._regex_index.search.call_args_list == [call('N/A'), call('N/A')]
+    assert countrydata.cache_info().currsize == 0
+
+    # Modified RegexMap objects may match
+    regex_map['ZW'] = re.compile(r'^n/a$', flags=re.IGNORECASE)
+    assert countrydata.get('N/A', regex_map=regex_map)['iso3'] == 'ZWE'
+
+    # Misses with regex_map dicts are not remembered
+    regex_map_dict = {'MN': re.compile(r'mongol', flags=re.IGNORECASE)}
+    for _ in range(2):
+        assert countrydata.get('N/A', regex_map=regex_map_dict) is None
+    assert countrydata._regex_index.search.call_args_list[2:] == [call('N/A'), call('N/A')]
+
+    # Hits are not affected
+    assert countrydata.get('Mongol Uls', regex_map=regex_map)['iso3'] == 'MNG'
+    assert countrydata.get('Mongolia')['iso3'] == 'MNG'
+
+    countrydata.cache_clear()
+    assert countrydata.get('N/A') is None
+    assert countrydata._regex_index.search.call_args_list[-1] == call('N/A')
+
+
+def test_CountryData_miss_cache_is_bounded(mocker):
+    mocker.patch.object(_countrydata, '_MISS_CACHE_SIZE', 2)
+    countrydata = _countrydata.CountryData()
+    for string in ('N/A', 'unknown', '-'):
+        countrydata.get(string)
+    assert len(countrydata._miss_cache) == 2
+
+
+members_test_data = '''[
+    {"name_short": "Foo", "name_official": "Republic of Foo", "iso2": "AB", "iso3": "ABC", "eu": "EU", "euro": "1999", "continent": "Europe", "regex": "^foo$"},
+    {"name_short": "Bar", "name_official": "Republic of Bar", "iso2": "DE", "iso3": "DEF", "eu": "EU", "euro": "", "continent": "Europe", "regex": "^bar$"},
+    {"name_short": "Baz", "name_official": "Republic of Baz", "iso2": "GH", "iso3": "GHI", "eu": "", "euro": "2002", "continent": "Asia", "regex": "^baz$"}
+]'''
+
+
+@pytest.mark.parametrize('readonly', (False, True), ids=lambda v: f'readonly={v!r}')
+@pytest.mark.parametrize('compact', (False, True), ids=lambda v: f'compact={v!r}')
+@pytest.mark.parametrize(
+    argnames='group, value, exp_result',
+    argvalues=(
+        ('eu', None, ['Foo', 'Bar']),
+        ('euro', None, ['Foo', 'Baz']),
+        ('euro', '2002', ['Baz']),
+        ('continent', 'Europe', ['Foo', 'Bar']),
+        ('continent', 'Africa', []),
+        ('g20', None, AttributeError('g20')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_members(group, value, exp_result, compact, readonly, tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(members_test_data)
+    countrydata = _countrydata.CountryData(filepath, compact=compact, readonly=readonly)
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata.members(group, value)
+    else:
+        members = countrydata.members(group, value)
+        assert [info['name_short'] for info in members] == exp_result
+        assert len(members) == len(exp_result)
+        # Members are the same objects that lookups return
+        for info in members:
+            assert info is countrydata.get(info['iso2'])
+            assert isinstance(info['regex'], re.Pattern)
+
+        # Bitmask is only computed once
+        assert countrydata._group_masks[(group, value)] is countrydata.members(group, value)._mask
+
+
+@pytest.mark.parametrize('readonly', (False, True), ids=lambda v: f'readonly={v!r}')
+@pytest.mark.parametrize('compact', (False, True), ids=lambda v: f'compact={v!r}')
+@pytest.mark.parametrize(
+    argnames='country, group, value, exp_result',
+    argvalues=(
+        ('ab', 'eu', None, True),
+        ('Foo', 'eu', None, True),
+        ('baz', 'eu', None, False),
+        ('GHI', 'euro', '2002', True),
+        ('ABC', 'euro', '2002', False),
+        ('xyzzy', 'eu', None, False),
+        ('ab', 'g20', None, AttributeError('g20')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_is_member(country, group, value, exp_result, compact, readonly, tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(members_test_data)
+    countrydata = _countrydata.CountryData(filepath, compact=compact, readonly=readonly)
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata.is_member(country, group, value)
+    else:
+        assert countrydata.is_member(country, group, value) is exp_result
+        assert countrydata.is_member(country, countrydata.members(group, value)) is exp_result
+        info = countrydata.get(country)
+        if info is not None:
+            # Country data that was returned by a lookup
+            assert countrydata.is_member(info, group, value) is exp_result
+            # Copy of country data
+            assert countrydata.is_member(dict(info), group, value) is exp_result
+
+
+@pytest.mark.parametrize('readonly', (False, True), ids=lambda v: f'readonly={v!r}')
+@pytest.mark.parametrize('compact', (False, True), ids=lambda v: f'compact={v!r}')
+def test_CountryData_pickle(compact, readonly, mocker):
+    countrydata = _countrydata.CountryData(cache_size=10, compact=compact, readonly=readonly, instrument=True,
+                                           aliases={'Korea, Republic of': 'KR'})
+    assert countrydata.get('Germany')['iso3'] == 'DEU'
+    countrydata.members('eu')
+
+    mocker.patch.object(_countrydata.CountryData, '_read_countries')
+    mocker.patch.object(_countrydata._diskcache, 'read')
+    copy_ = pickle.loads(pickle.dumps(countrydata))
+
+    # Country data and indexes are not loaded again
+    assert _countrydata.CountryData._read_countries.call_args_list == []
+    assert _countrydata._diskcache.read.call_args_list == []
+    assert copy_._indexes.keys() >= {'iso2', 'iso3'}
+    assert copy_._regex_literals == countrydata._regex_literals
+
+    assert copy_.cache_size == 10
+    assert copy_.cache_info().currsize == 0
+    assert copy_.instrument is True
+    assert copy_.stage_info()['regex'].count == 0
+    assert copy_.countries == countrydata.countries
+    assert type(copy_.get('DE')) is type(countrydata.get('DE'))
+    for query in ('DE', 'FRA', 'Japan', 'Germani', 'xyzzy'):
+        assert copy_.get(query) == countrydata.get(query)
+    assert copy_.is_member('France', 'eu')
+    assert copy_.get('korea republic of')['iso3'] == 'KOR'
+
+
+def test_CountryData_aget(mocker):
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    countrydata = _countrydata.CountryData(cache_size=10, executor=executor)
+    mocker.patch.object(executor, 'submit', wraps=executor.submit)
+
+    async def main():
+        # Loading country data is done in the executor
+        assert (await countrydata.aget('DE'))['iso3'] == 'DEU'
+        assert executor.submit.call_count == 1
+        # Codes and cached results are looked up inline
+        assert (await countrydata.aget('FRA'))['iso3'] == 'FRA'
+        assert (await countrydata.aget('de'))['iso3'] == 'DEU'
+        assert executor.submit.call_count == 1
+        # Everything else is looked up in the executor
+        assert (await countrydata.aget('Germani'))['iso3'] == 'DEU'
+        assert await countrydata.aget('xyzzy', default='default') == 'default'
+        assert executor.submit.call_count == 3
+        assert (await countrydata.aget('Germani'))['iso3'] == 'DEU'
+        assert await countrydata.aget('xyzzy', default='default') == 'default'
+        assert executor.submit.call_count == 3
+
+    asyncio.run(main())
+    executor.shutdown()
+
+
+def test_CountryData_aget_coalesces_concurrent_lookups(mocker):
+    countrydata = _countrydata.CountryData()
+    countrydata.preload()
+    mocker.patch.object(countrydata, '_find_country', wraps=countrydata._find_country)
+
+    async def main():
+        return await asyncio.gather(*(countrydata.aget(query) for query in ('Germani', 'Frnace', 'Germani', 'Germani')))
+
+    assert [info['iso3'] for info in asyncio.run(main())] == ['DEU', 'FRA', 'DEU', 'DEU']
+    assert sorted(call.args for call in countrydata._find_country.call_args_list) == [('Frnace',), ('Germani',)]
+    assert countrydata._in_flight == {}
+
+
+def test_CountryData_aget_with_regex_map():
+    regex_map = {'DE': re.compile(r'^ctry-deu$', flags=re.IGNORECASE)}
+
+    async def main():
+        countrydata = _countrydata.CountryData()
+        return (
+            await countrydata.aget('CTRY-DEU', regex_map=regex_map),
+            await countrydata.aget('CTRY-DEU', regex_map=RegexMap(regex_map)),
+            await countrydata.aget('CTRY-DEU', default='default'),
+        )
+
+    info1, info2, default = asyncio.run(main())
+    assert info1['iso3'] == info2['iso3'] == 'DEU'
+    assert default == 'default'
+
+
+@pytest.mark.parametrize(
+    argnames='countries, attribute, exp_result',
+    argvalues=(
+        ([], None, []),
+        (['DE', 'Frnace', 'xyzzy', 'DE'], 'iso3', ['DEU', 'FRA', 'default', 'DEU']),
+        (('Japan',), 'name_short', ['Japan']),
+        (['DE'], 'iso4', AttributeError('iso4')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_aget_many(countries, attribute, exp_result):
+    countrydata = _countrydata.CountryData()
+    coro = countrydata.aget_many(countries, default='default', attribute=attribute)
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            asyncio.run(coro)
+    else:
+        assert asyncio.run(coro) == exp_result
+        assert asyncio.run(countrydata.aget_many(countries, default='default', attribute=attribute)) \
+            == countrydata.get_many(countries, default='default', attribute=attribute)
+
+
+@pytest.mark.parametrize(
+    argnames='query, kwargs, exp_result',
+    argvalues=(
+        ('DE', {}, [('DEU', 1.0, 'iso2')]),
+        ('Niger', {'k': 2}, [('NER', 1.0, 'name'), ('NGA', 0.833, 'fuzzy_short')]),
+        ('Niger', {'k': 2, 'cutoff': 0.9}, [('NER', 1.0, 'name')]),
+        ('Germani', {}, [('DEU', 0.857, 'fuzzy_short')]),
+        ('Kingdom of Belgiu', {'k': 1}, [('BEL', 0.971, 'fuzzy_official')]),
+        ('ctry-deu', {'regex_map': {'DE': re.compile(r'^ctry-deu$')}}, [('DEU', 1.0, 'regex_map')]),
+        ('xyzzy', {}, []),
+        ('Niger', {'k': 0}, ValueError('k must be > 0: 0')),
+        ('Niger', {'cutoff': 1.5}, ValueError('cutoff must be in [0.0, 1.0]: 1.5')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_candidates(query, kwargs, exp_result):
+    countrydata = _countrydata.CountryData()
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            countrydata.candidates(query, **kwargs)
+    else:
+        candidates = countrydata.candidates(query, **kwargs)
+        assert [
+            (candidate.country['iso3'], round(candidate.score, 3), candidate.stage)
+            for candidate in candidates
+        ] == exp_result
+        for candidate in candidates:
+            assert candidate.country is countrydata.get(candidate.country['iso3'])
+
+
+@pytest.mark.parametrize('k', (1, 3, 10), ids=lambda v: f'k={v!r}')
+@pytest.mark.parametrize('query', ('Germani', 'Repblic of Sloveni', 'Kingdom of Swedn', 'Ilands'), ids=lambda v: repr(v))
+def test_CountryData_candidates_are_same_as_difflib(query, k):
+    import difflib
+
+    countrydata = _countrydata.CountryData()
+    assert countrydata._find_country_stage(query, None, fuzzy=False) == (None, None)
+
+    # Best similarity of each country
+    scores = {}
+    for country in countrydata.countries:
+        for name in (country['name_official'], country['name_short']):
+            score = difflib.SequenceMatcher(None, query, name).ratio()
+            if score >= 0.6:
+                scores[country['iso3']] = max(score, scores.get(country['iso3'], 0))
+    exp_scores = sorted(scores.values(), reverse=True)[:k]
+
+    candidates = countrydata.candidates(query, k=k)
+    assert [candidate.score for candidate in candidates] == exp_scores
+    for candidate in candidates:
+        assert scores[candidate.country['iso3']] == candidate.score
+
+
+def test_CountryData_shared_file(tmp_path, mocker):
+    path = tmp_path / 'countries.shared'
+    _countrydata.build_shared_file(path)
+    default = _countrydata.CountryData()
+    default.preload()
+    mocker.patch.object(_countrydata.CountryData, '_read_countries')
+    countrydata = _countrydata.CountryData(shared_file=path, aliases={'Ivory Coast': 'CI'})
+
+    for query in ('DE', 'deu', 'cote d ivoire', 'The Federal Republic of Germany', 'Germani', 'xyzzy'):
+        info = countrydata.get(query)
+        exp_info = default.get(query)
+        if exp_info is None:
+            assert info is None
+        else:
+            assert isinstance(info, _countrydata._records.Country)
+            assert dict(info) == exp_info
+    assert countrydata.get('ivory coast')['iso3'] == 'CIV'
+    assert countrydata.find_by('isonumeric', 40)['iso3'] == 'AUT'
+    assert countrydata.find_by('name_short', 'germany')['iso3'] == 'DEU'
+    assert countrydata.convert(['276'], src='isonumeric', to='iso2') == ['DE']
+    assert countrydata.countries == default.countries
+    assert _countrydata.CountryData._read_countries.call_args_list == []
+
+    # Other processes map the same file
+    copy_ = pickle.loads(pickle.dumps(countrydata))
+    assert copy_._countries is None
+    assert copy_.get('Germani')['iso3'] == 'DEU'
+    assert copy_.get('ivory coast')['iso3'] == 'CIV'
+
+
+def test_build_shared_file_with_custom_country_data(tmp_path):
+    (tmp_path / 'countrydata.json').write_text(find_by_test_data)
+    _countrydata.build_shared_file(tmp_path / 'countries.shared', filepath=tmp_path / 'countrydata.json')
+    countrydata = _countrydata.CountryData(shared_file=tmp_path / 'countries.shared')
+    assert countrydata.find_by('isonumeric', '040')['name_short'] == 'Bar'
+    assert countrydata.get('baz')['name_short'] == 'Baz'
+
+
+prebuilt_test_data = '''[
+{"iso3": "ABC", "iso2": "AB", "name_short": "Foo", "name_official": "Republic of Foo", "regex": "^foo"},
+{"iso3": "DEF", "iso2": "DE", "name_short": "Bar", "name_official": "Kingdom of Bar", "regex": "^bar"}
+]'''
+
+def test_write_prebuilt(tmp_path, mocker):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(prebuilt_test_data)
+    _countrydata.write_prebuilt(filepath)
+    assert (tmp_path / 'countries.index').exists()
+
+    mocker.patch.object(_countrydata.CountryData, '_read_countries')
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False)
+    assert countrydata.get('ab')['name_short'] == 'Foo'
+    assert countrydata.get('def')['name_short'] == 'Bar'
+    assert countrydata.get('Foolish')['name_short'] == 'Foo'
+    assert countrydata._find_country_stage('Bar', None)[1] == 'name'
+    assert countrydata._find_country_stage('Kingdom of Bahr', None)[1] == 'fuzzy_official'
+    assert countrydata.candidates('Bax')[0].country['iso3'] == 'DEF'
+    assert _countrydata.CountryData._read_countries.call_args_list == []
+
+
+def test_write_prebuilt_with_compact(tmp_path, mocker):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(prebuilt_test_data)
+    _countrydata.write_prebuilt(filepath)
+
+    mocker.patch.object(_countrydata.CountryData, '_read_countries')
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False, compact=True)
+    assert countrydata.get('ab')['name_short'] == 'Foo'
+    # Only what is needed is kept in memory
+    assert countrydata._prebuilt is None
+    assert list(countrydata._indexes) == ['iso2']
+    assert countrydata._regex_literals is None
+
+    read = mocker.spy(_countrydata._prebuilt, 'read')
+    assert countrydata.get('Foolish')['name_short'] == 'Foo'
+    assert countrydata._find_country_stage('Bar', None)[1] == 'name'
+    assert countrydata._find_country_stage('Kingdom of Bahr', None)[1] == 'fuzzy_official'
+    assert read.call_args_list == [call(str(filepath))] * 3
+    assert _countrydata.CountryData._read_countries.call_args_list == []
+
+
+def test_write_prebuilt_is_ignored_after_country_data_changed(tmp_path, mocker):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(prebuilt_test_data)
+    _countrydata.write_prebuilt(filepath)
+    filepath.write_text(prebuilt_test_data.replace('"Foo"', '"Qux"'))
+
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False)
+    mocker.patch.object(countrydata, '_read_countries', wraps=countrydata._read_countries)
+    assert countrydata.get('ab')['name_short'] == 'Qux'
+    assert countrydata._read_countries.call_args_list == [call()]
+
+
+def test_write_prebuilt_with_invalid_regex(tmp_path):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(prebuilt_test_data.replace('"^bar"', '"^bar("'))
+    exp_message = "Invalid regular expression for 'Bar': missing ), unterminated subpattern at position 4"
+    with pytest.raises(RuntimeError, match=rf'^{re.escape(exp_message)}$'):
+        _countrydata.write_prebuilt(filepath)
+    assert not (tmp_path / 'countries.index').exists()
+
+
+def test_packaged_prebuilt_data_is_up_to_date():
+    countrydata = _countrydata.CountryData(disk_cache=False)
+    source_path = countrydata._get_source_path()
+    if source_path is None:
+        pytest.skip('Country data is not a regular file')
+    assert _countrydata._prebuilt.read(source_path) is not None, (
+        'Run fetch_data_from_country_converter.py --only-build'
+    )
+
+
+@pytest.mark.parametrize(
+    argnames='text, exp_mentions',
+    argvalues=(
+        ('', []),
+        ('No countries here.', []),
+        (
+            "Afghan refugees arrived in Côte d'Ivoire and the United Kingdom.",
+            [('AFG', 'Afghan', 'regex'), ('CIV', "Côte d'Ivoire", 'name'), ('GBR', 'United Kingdom', 'name')],
+        ),
+        (
+            'Papua New Guinea, Guinea-Bissau and Guinea',
+            [('PNG', 'Papua New Guinea', 'name'), ('GNB', 'Guinea-Bissau', 'name'), ('GIN', 'Guinea', 'name')],
+        ),
+        ('Niger borders Nigeria', [('NER', 'Niger', 'name'), ('NGA', 'Nigeria', 'name')]),
+        ('A woman from Oman', [('OMN', 'Oman', 'name')]),
+        ('Let us visit the USA', []),
+        ('ARGENTINE BEEF', [('ARG', 'ARGENTINE', 'regex')]),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_find_all(text, exp_mentions):
+    countrydata = _countrydata.CountryData()
+    mentions = countrydata.find_all(text)
+    assert [
+        (mention.country['iso3'], text[mention.start:mention.end], mention.stage)
+        for mention in mentions
+    ] == exp_mentions
+    for mention in mentions:
+        assert mention.country is countrydata.get(mention.country['iso2'])
+
+
+def test_CountryData_find_all_with_aliases():
+    countrydata = _countrydata.CountryData(aliases={'USA': 'US', 'The Land of the Rising Sun': 'JP'})
+    text = 'From the USA to the land of the rising sun.'
+    assert [
+        (mention.country['iso3'], text[mention.start:mention.end])
+        for mention in countrydata.find_all(text)
+    ] == [('USA', 'USA'), ('JPN', 'the land of the rising sun')]
+
+
+@pytest.mark.parametrize(
+    argnames='kwargs',
+    argvalues=({}, {'compact': True}, {'readonly': True}),
+    ids=lambda v: repr(v),
+)
+def test_CountryData_find_iter(kwargs):
+    countrydata = _countrydata.CountryData(**kwargs)
+    text = 'Exports from the Federal Republic of Germany to Argentina and Afghanistan grew. ' * 100
+    chunks = (text[i:i + 10] for i in range(0, len(text), 10))
+    mentions = list(countrydata.find_iter(chunks))
+    assert mentions == countrydata.find_all(text)
+    assert [text[mention.start:mention.end] for mention in mentions[:3]] == [
+        'Federal Republic of Germany', 'Argentina', 'Afghanistan',
+    ]
+    assert len(mentions) == 300
+
+
+reload_test_data = '''[
+{"iso3": "ABC", "iso2": "AB", "name_short": "Foo", "name_official": "Republic of Foo", "regex": "^foo"},
+{"iso3": "DEF", "iso2": "DE", "name_short": "Bar", "name_official": "Kingdom of Bar", "regex": "^bar"}
+]'''
+
+def test_CountryData_reload_interval(tmp_path):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(reload_test_data)
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False, cache_size=10, reload_interval=1000)
+    old_group = countrydata.members('iso3')
+    assert countrydata.get('foo')['iso3'] == 'ABC'
+    assert countrydata.cache_info().currsize == 1
+
+    filepath.write_text(reload_test_data.replace('"ABC"', '"XYZ"').replace('"Bar"', '"Baz"'))
+    assert countrydata._reloader.check() is True
+    # Cached results are forgotten
+    assert countrydata.cache_info().currsize == 0
+
+    assert countrydata.get('foo')['iso3'] == 'XYZ'
+    assert countrydata['ab']['iso3'] == 'XYZ'
+    assert countrydata.iso3('foo') == 'XYZ'
+    assert countrydata.find_by('iso3', 'xyz')['name_short'] == 'Foo'
+    assert countrydata.get_many(['Baz', 'Qux']) == [countrydata.get('DE'), None]
+    assert countrydata.names_short == ('Foo', 'Baz')
+    assert [country['iso3'] for country in countrydata.countries] == ['XYZ', 'DEF']
+    assert [mention.country['iso2'] for mention in countrydata.find_all('Foo and Baz')] == ['AB', 'DE']
+    assert countrydata.is_member('AB', 'iso3', 'XYZ')
+    assert asyncio.run(countrydata.aget('foo'))['iso3'] == 'XYZ'
+
+    # Values derived from country data are not cached by the reloading instance
+    for name in ('_countries', 'names_short', '_name_index'):
+        assert not countrydata.__dict__.get(name)
+    # Groups keep their country data
+    assert [country['iso3'] for country in old_group] == ['ABC', 'DEF']
+
+    info = countrydata.reload_info()
+    assert (info.reloads, info.failures, info.error) == (1, 0, None)
+
+
+def test_CountryData_reload_interval_keeps_settings(tmp_path):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(reload_test_data)
+    hook = Mock()
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False, instrument=True,
+                                           aliases={'Fooland': 'AB'}, reload_interval=1000)
+    countrydata.get('fooo')
+    countrydata.cache_size = 5
+    countrydata.lookup_hook = hook
+
+    filepath.write_text(reload_test_data.replace('"ABC"', '"XYZ"'))
+    assert countrydata._reloader.check() is True
+    assert countrydata.get('fooland')['iso3'] == 'XYZ'
+    assert countrydata.cache_size == 5
+    assert countrydata.cache_info().maxsize == 5
+    assert hook.call_args_list == [call('fooland', 'name', ANY)]
+    # Statistics include lookups before and after reloading
+    assert countrydata.stage_info()['regex'].count == 1
+    assert countrydata.stage_info()['name'].count == 1
+
+
+def test_CountryData_reload_interval_with_invalid_file(tmp_path):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(reload_test_data)
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False, reload_interval=1000)
+    assert countrydata.get('foo')['iso3'] == 'ABC'
+
+    filepath.write_text('[{"iso3": "XYZ"')
+    assert countrydata._reloader.check() is False
+    assert countrydata.get('foo')['iso3'] == 'ABC'
+    info = countrydata.reload_info()
+    assert (info.reloads, info.failures) == (0, 1)
+    assert isinstance(info.error, ValueError)
+
+
+def test_CountryData_reload_interval_redirects_only_reloading_instances(tmp_path):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(reload_test_data)
+    assert type(_countrydata.CountryData(filepath)) is _countrydata.CountryData
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False, reload_interval=1000)
+    assert isinstance(countrydata, _countrydata.CountryData)
+    assert type(countrydata._reloader.get_current()) is _countrydata.CountryData
+
+    for cls in (_countrydata.CountryData, type(countrydata)):
+        assert inspect.iscoroutinefunction(cls.aget)
+        assert inspect.iscoroutinefunction(cls.aget_many)
+        assert cls.get.__doc__ == _countrydata.CountryData.get.__doc__
+    assert asyncio.run(countrydata.aget_many(['foo', 'xyzzy'], attribute='iso3')) == ['ABC', None]
+
+    # Pickled copies don't reload country data
+    copy_ = pickle.loads(pickle.dumps(countrydata))
+    assert type(copy_) is _countrydata.CountryData
+    assert copy_.get('foo')['iso3'] == 'ABC'
+
+
+def test_CountryData_reload_info_without_reload_interval():
+    countrydata = _countrydata.CountryData()
+    with pytest.raises(RuntimeError, match=r'^Reloading is disabled$'):
+        countrydata.reload_info()
+
+
+def test_CountryData_reload_interval_never_blocks_lookups(tmp_path, mocker):
+    filepath = tmp_path / 'countries.json'
+    filepath.write_text(reload_test_data)
+    countrydata = _countrydata.CountryData(filepath, disk_cache=False, reload_interval=0)
+    assert countrydata.get('foo')['iso3'] == 'ABC'
+
+    # Reload is stuck while building indexes
+    loading = threading.Event()
+    proceed = threading.Event()
+    preload = _countrydata.CountryData.preload
+
+    def slow_preload(self):
+        loading.set()
+        assert proceed.wait(timeout=10)
+        preload(self)
+
+    mocker.patch.object(_countrydata.CountryData, 'preload', slow_preload)
+    filepath.write_text(reload_test_data.replace('"ABC"', '"XYZ"'))
+    countrydata.get('foo')
+    assert loading.wait(timeout=10)
+    for _ in range(10):
+        assert countrydata.get('foo')['iso3'] == 'ABC'
+
+    proceed.set()
+    countrydata._reloader._thread.join(timeout=10)
+    assert countrydata.get('foo')['iso3'] == 'XYZ'
@@ -0,0 +1,83 @@
+import os
+import sys
+
+import pytest
+
+from countryguess import __project_name__, _diskcache
+
+
+@pytest.mark.parametrize(
+    argnames='platform, env, exp_cache_dir',
+    argvalues=(
+        ('linux', {'COUNTRYGUESS_NO_DISK_CACHE': '1', 'COUNTRYGUESS_CACHE_DIR': '/custom'}, None),
+        ('linux', {'COUNTRYGUESS_CACHE_DIR': '/custom'}, '/custom'),
+        ('linux', {'XDG_CACHE_HOME': '/xdg'}, os.path.join('/xdg', __project_name__)),
+        ('linux', {}, os.path.join(os.path.expanduser('~/.cache'), __project_name__)),
+        ('darwin', {}, os.path.join(os.path.expanduser('~/Library/Caches'), __project_name__)),
+        ('win32', {'LOCALAPPDATA': 'C:\\Local'}, os.path.join('C:\\Local', __project_name__)),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_get_cache_dir(platform, env, exp_cache_dir, mocker):
+    mocker.patch.object(sys, 'platform', platform)
+    mocker.patch.dict(os.environ, env, clear=True)
+    assert _diskcache.get_cache_dir() == exp_cache_dir
+
+
+def test_write_and_read(tmp_path):
+    source_path = tmp_path / 'source.json'
+    source_path.write_text('[]')
+    cache_dir = tmp_path / 'cache'
+
+    assert _diskcache.read(cache_dir, source_path) is None
+    _diskcache.write(cache_dir, source_path, ([{'a': 'b'}], {'iso2': {'AB': 0}}))
+    assert _diskcache.read(cache_dir, source_path) == ([{'a': 'b'}], {'iso2': {'AB': 0}})
+    assert [path.name for path in cache_dir.iterdir()] == [
+        os.path.basename(_diskcache._get_cache_path(cache_dir, source_path)),
+    ]
+
+    # Cache is invalid if source changes
+    source_path.write_text('[{}]')
+    os.utime(source_path, ns=(1, 1))
+    assert _diskcache.read(cache_dir, source_path) is None
+
+    # Cache for other source is unaffected
+    other_path = tmp_path / 'other.json'
+    other_path.write_text('[]')
+    _diskcache.write(cache_dir, other_path, 'other data')
+    _diskcache.write(cache_dir, source_path, 'new data')
+    assert _diskcache.read(cache_dir, source_path) == 'new data'
+    assert _diskcache.read(cache_dir, other_path) == 'other data'
+
+
+def test_read_corrupt_cache(tmp_path):
+    source_path = tmp_path / 'source.json'
+    source_path.write_text('[]')
+    cache_dir = tmp_path / 'cache'
+    _diskcache.write(cache_dir, source_path, 'data')
+    cache_path = _diskcache._get_cache_path(cache_dir, source_path)
+
+    with open(cache_path, 'r+b') as f:
+        f.truncate(10)
+    assert _diskcache.read(cache_dir, source_path) is None
+
+    with open(cache_path, 'wb') as f:
+        f.write(b'garbage')
+    assert _diskcache.read(cache_dir, source_path) is None
+
+
+def test_read_from_missing_source(tmp_path):
+    assert _diskcache.read(tmp_path, tmp_path / 'nonexisting.json') is None
+
+
+def test_write_ignores_errors(tmp_path):
+    source_path = tmp_path / 'source.json'
+    source_path.write_text('[]')
+    cache_dir = tmp_path / 'cache'
+    cache_dir.write_text('not a directory')
+
+    _diskcache.write(cache_dir, source_path, 'data')
+    _diskcache.write(tmp_path / 'cache2', tmp_path / 'nonexisting.json', 'data')
+    _diskcache.write(tmp_path / 'cache3', source_path, object())
+    assert _diskcache.read(cache_dir, source_path) is None
+    assert [path.name for path in (tmp_path / 'cache3').iterdir()] == []
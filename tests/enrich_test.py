@@ -0,0 +1,119 @@
+import json
+import re
+
+import pytest
+
+from countryguess import CountryData, _enrich, enrich
+
+
+@pytest.mark.parametrize('workers', (1, 2), ids=lambda v: f'workers={v!r}')
+@pytest.mark.parametrize('chunk_size', (1, 2, 10000), ids=lambda v: f'chunk_size={v!r}')
+def test_enrich_csv(chunk_size, workers, tmp_path):
+    (tmp_path / 'in.csv').write_text(
+        'id,country,note\n'
+        '1,Germany,foo\n'
+        '2,xyzzy,bar\n'
+        '3,"Korea, Republic of",baz\n'
+        '4,DE,\n'
+        '5,,\n'
+        '6\n'
+        '7,Germani,foo\n',
+        encoding='utf-8',
+    )
+    enrich(tmp_path / 'in.csv', tmp_path / 'out.csv', 'country', attributes=['iso3', 'continent'],
+           workers=workers, chunk_size=chunk_size)
+    assert (tmp_path / 'out.csv').read_text(encoding='utf-8') == (
+        'id,country,note,iso3,continent\n'
+        '1,Germany,foo,DEU,Europe\n'
+        '2,xyzzy,bar,,\n'
+        '3,"Korea, Republic of",baz,KOR,Asia\n'
+        '4,DE,,DEU,Europe\n'
+        '5,,,,\n'
+        '6,,\n'
+        '7,Germani,foo,DEU,Europe\n'
+    )
+
+
+def test_enrich_tsv(tmp_path):
+    (tmp_path / 'in.tsv').write_text('country\tid\nFrance\t1\nJapan\t2\n', encoding='utf-8')
+    enrich(tmp_path / 'in.tsv', tmp_path / 'out.tsv', 'country', workers=1)
+    assert (tmp_path / 'out.tsv').read_text(encoding='utf-8') == (
+        'country\tid\tiso3\n'
+        'France\t1\tFRA\n'
+        'Japan\t2\tJPN\n'
+    )
+
+
+@pytest.mark.parametrize('workers', (1, 2), ids=lambda v: f'workers={v!r}')
+def test_enrich_jsonl(workers, tmp_path):
+    (tmp_path / 'in.jsonl').write_text(
+        '{"id": 1, "country": "Côte d\'Ivoire"}\n'
+        '\n'
+        '{"id": 2, "country": 276}\n'
+        '{"id": 3}\n'
+        '{"id": 4, "country": "xyzzy"}\n',
+        encoding='utf-8',
+    )
+    enrich(tmp_path / 'in.jsonl', tmp_path / 'out.json', 'country', attributes=('iso2', 'regex'),
+           workers=workers, format='jsonl', chunk_size=2)
+    rows = [json.loads(line) for line in (tmp_path / 'out.json').read_text(encoding='utf-8').splitlines()]
+    assert [(row['id'], row['iso2']) for row in rows] == [(1, 'CI'), (2, None), (3, None), (4, None)]
+    assert rows[0]['country'] == "Côte d'Ivoire"
+    assert isinstance(rows[0]['regex'], str)
+
+
+def test_enrich_with_custom_countrydata(tmp_path):
+    (tmp_path / 'countrydata.json').write_text(
+        '[{"name_short": "Foo", "name_official": "Republic of Foo", "iso2": "AB", "iso3": "ABC", "regex": "^foo$"}]'
+    )
+    (tmp_path / 'in.csv').write_text('country\nfoo\nGermany\n', encoding='utf-8')
+    countrydata = CountryData(tmp_path / 'countrydata.json', disk_cache=False)
+    enrich(tmp_path / 'in.csv', tmp_path / 'out.csv', 'country', attributes=['iso2'], workers=2,
+           countrydata=countrydata)
+    assert (tmp_path / 'out.csv').read_text(encoding='utf-8') == 'country,iso2\nfoo,AB\nGermany,\n'
+
+
+def test_enrich_empty_file(tmp_path):
+    (tmp_path / 'in.csv').write_text('', encoding='utf-8')
+    enrich(tmp_path / 'in.csv', tmp_path / 'out.csv', 'country', workers=1)
+    assert (tmp_path / 'out.csv').read_text(encoding='utf-8') == ''
+
+
+def test_enrich_looks_up_distinct_values_once(tmp_path, mocker):
+    (tmp_path / 'in.csv').write_text('country\nDE\nFR\nDE\nDE\nJP\nFR\nDE\n', encoding='utf-8')
+    countrydata = CountryData()
+    mocker.patch.object(countrydata, 'get', wraps=countrydata.get)
+    enrich(tmp_path / 'in.csv', tmp_path / 'out.csv', 'country', workers=1, chunk_size=3, countrydata=countrydata)
+    assert (tmp_path / 'out.csv').read_text(encoding='utf-8') == (
+        'country,iso3\nDE,DEU\nFR,FRA\nDE,DEU\nDE,DEU\nJP,JPN\nFR,FRA\nDE,DEU\n'
+    )
+    assert sorted(call.args[0] for call in countrydata.get.call_args_list) == ['DE', 'FR', 'JP']
+
+
+def test_enrich_remembers_limited_number_of_values(tmp_path, mocker):
+    mocker.patch.object(_enrich, '_MAX_RESOLVED', 1)
+    (tmp_path / 'in.csv').write_text('country\nDE\nDE\nFR\nDE\n', encoding='utf-8')
+    countrydata = CountryData()
+    mocker.patch.object(countrydata, 'get', wraps=countrydata.get)
+    enrich(tmp_path / 'in.csv', tmp_path / 'out.csv', 'country', workers=1, chunk_size=1, countrydata=countrydata)
+    assert (tmp_path / 'out.csv').read_text(encoding='utf-8') == 'country,iso3\nDE,DEU\nDE,DEU\nFR,FRA\nDE,DEU\n'
+    assert [call.args[0] for call in countrydata.get.call_args_list] == ['DE', 'FR', 'DE']
+
+
+@pytest.mark.parametrize(
+    argnames='filename, kwargs, exp_exception',
+    argvalues=(
+        ('in.txt', {}, ValueError('Unknown file format: {tmp_path}/in.txt')),
+        ('in.csv', {'format': 'xml'}, ValueError('Unknown file format: xml')),
+        ('in.csv', {'chunk_size': 0}, ValueError('Chunk size must be positive: 0')),
+        ('in.csv', {'column': 'land'}, ValueError('No such column: land')),
+        ('in.csv', {'attributes': ['iso3', 'iso4']}, AttributeError('iso4')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_enrich_with_invalid_arguments(filename, kwargs, exp_exception, tmp_path):
+    (tmp_path / filename).write_text('country\nDE\n', encoding='utf-8')
+    kwargs = {'column': 'country', 'workers': 1, **kwargs}
+    exp_msg = str(exp_exception).format(tmp_path=tmp_path)
+    with pytest.raises(type(exp_exception), match=rf'^{re.escape(exp_msg)}$'):
+        enrich(tmp_path / filename, tmp_path / 'out.csv', **kwargs)
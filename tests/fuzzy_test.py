@@ -0,0 +1,99 @@
+import difflib
+import json
+import os
+import random
+import re
+
+import pytest
+
+from countryguess import _fuzzy
+
+
+@pytest.mark.parametrize(
+    argnames='names, string, n, cutoff, exp_matches',
+    argvalues=(
+        (('Foo', 'Bar', 'Baz'), 'Bar', 1, 0.8, [(1.0, 1)]),
+        (('Foo', 'Bar', 'Baz'), 'bar', 1, 0.8, []),
+        (('Foo', 'Bar', 'Baz'), 'Ba', 1, 0.8, [(0.8, 2)]),
+        (('Foo', 'Bar', 'Baz'), 'Ba', 2, 0.8, [(0.8, 2), (0.8, 1)]),
+        (('Foo', 'Bar', 'Baz', 'Bar'), 'Bar', 3, 0.6, [(1.0, 1), (2 / 3, 2)]),
+        (('Foo', '', 'Baz'), '', 1, 0.8, [(1.0, 1)]),
+        (('Foo', 'Bar', 'Baz'), '', 3, 0.0, [(0.0, 0), (0.0, 2), (0.0, 1)]),
+        (('Foo', 'Bar', 'Baz'), 'xyq', 1, 0.1, []),
+        (('Foo', 'Bar', 'Baz'), 'xyq', 1, 0.0, [(0.0, 0)]),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_FuzzyMatcher_matches(names, string, n, cutoff, exp_matches):
+    matcher = _fuzzy.FuzzyMatcher(names)
+    assert matcher.matches(string, n=n, cutoff=cutoff) == exp_matches
+
+
+@pytest.mark.parametrize(
+    argnames='n, cutoff, exp_exception',
+    argvalues=(
+        (0, 0.8, ValueError('n must be > 0: 0')),
+        (1, -0.1, ValueError('cutoff must be in [0.0, 1.0]: -0.1')),
+        (1, 1.1, ValueError('cutoff must be in [0.0, 1.0]: 1.1')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_FuzzyMatcher_matches_with_invalid_argument(n, cutoff, exp_exception):
+    matcher = _fuzzy.FuzzyMatcher(('Foo', 'Bar'))
+    with pytest.raises(type(exp_exception), match=rf'^{re.escape(str(exp_exception))}$'):
+        matcher.matches('foo', n=n, cutoff=cutoff)
+
+
+@pytest.mark.parametrize('attribute', ('name_official', 'name_short'))
+@pytest.mark.parametrize('n, cutoff', ((1, 0.8), (3, 0.6)))
+def test_FuzzyMatcher_matches_finds_same_names_as_difflib(attribute, n, cutoff):
+    filepath = os.path.join(os.path.dirname(_fuzzy.__file__), '_countrydata.json')
+    with open(filepath, 'r') as f:
+        names = [country[attribute] for country in json.load(f)]
+    matcher = _fuzzy.FuzzyMatcher(names)
+
+    rnd = random.Random(attribute)
+    strings = ['', '-', 'N/A', 'n.a.', 'unknown', '12345', 'Rest of World', 'x' * 100]
+    for _ in range(100):
+        name = rnd.choice(names)
+        i = rnd.randrange(len(name))
+        strings.extend((
+            name[:i] + name[i + 1:],
+            name[:i] + rnd.choice('aeiou ') + name[i:],
+            name.lower(),
+            ''.join(rnd.choice('abcdefghijklmnop ') for _ in range(rnd.randrange(1, 20))),
+        ))
+
+    for string in strings:
+        exp_names = difflib.get_close_matches(string, names, n=n, cutoff=cutoff)
+        matches = matcher.matches(string, n=n, cutoff=cutoff)
+        assert [names[index] for _, index in matches] == exp_names, string
+
+
+@pytest.mark.parametrize(
+    argnames='string, cutoff, exp_candidates',
+    argvalues=(
+        # Too short
+        ('F', 0.8, []),
+        ('Fo', 0.8, [(0.8, 0)]),
+        # Too long
+        ('Foo Bar Baz Qux', 0.8, []),
+        ('Foo Bar Baz Qux', 0.5, [(14 / 22, 3)]),
+        # Not enough characters in common with any name
+        ('F//', 0.8, []),
+        ('Fxx', 0.5, []),
+        ('Fox', 0.5, [(2 / 3, 0)]),
+        ('Foo', 0.8, [(1.0, 0)]),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_FuzzyMatcher_candidates(string, cutoff, exp_candidates):
+    matcher = _fuzzy.FuzzyMatcher(('Foo', 'Bar', 'Baz', 'Foo Bar'))
+    assert matcher._candidates(string, cutoff) == exp_candidates
+
+
+def test_FuzzyMatcher_matches_does_not_compare_strings_without_candidates(mocker):
+    matcher = _fuzzy.FuzzyMatcher(('Foo', 'Bar', 'Baz'))
+    SequenceMatcher_mock = mocker.patch('difflib.SequenceMatcher')
+    assert matcher.matches('N/A') == []
+    assert SequenceMatcher_mock.call_args_list == []
@@ -0,0 +1,114 @@
+import operator
+import re
+
+import pytest
+
+from countryguess import CountryData, Group
+
+groups_test_data = '''[
+    {"name_short": "Foo", "name_official": "Republic of Foo", "iso2": "AB", "iso3": "ABC", "a": "x", "b": "", "regex": "^foo$"},
+    {"name_short": "Bar", "name_official": "Republic of Bar", "iso2": "DE", "iso3": "DEF", "a": "x", "b": "x", "regex": "^bar$"},
+    {"name_short": "Baz", "name_official": "Republic of Baz", "iso2": "GH", "iso3": "GHI", "a": "", "b": "x", "regex": "^baz$"},
+    {"name_short": "Qux", "name_official": "Republic of Qux", "iso2": "JK", "iso3": "JKL", "a": "", "b": "", "regex": "^qux$"}
+]'''
+
+
+@pytest.fixture
+def countrydata(tmp_path):
+    filepath = tmp_path / 'countrydata.json'
+    filepath.write_text(groups_test_data)
+    return CountryData(filepath)
+
+
+def names(group):
+    return [info['name_short'] for info in group]
+
+
+def test_Group_iter_len_bool(countrydata):
+    group = countrydata.members('a')
+    assert isinstance(group, Group)
+    assert names(group) == ['Foo', 'Bar']
+    assert len(group) == 2
+    assert bool(group) is True
+    empty = countrydata.members('name_short', 'Nope')
+    assert names(empty) == []
+    assert len(empty) == 0
+    assert bool(empty) is False
+
+
+@pytest.mark.parametrize(
+    argnames='country, exp_result',
+    argvalues=(
+        ('AB', True),
+        ('def', True),
+        ('Baz', False),
+        ('xyzzy', False),
+        ({'iso3': 'ABC'}, True),
+        ({'iso3': 'XYZ'}, False),
+        (None, False),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_Group_contains(country, exp_result, countrydata):
+    assert (country in countrydata.members('a')) is exp_result
+
+
+@pytest.mark.parametrize(
+    argnames='operation, exp_result',
+    argvalues=(
+        (lambda a, b: a & b, ['Bar']),
+        (lambda a, b: a | b, ['Foo', 'Bar', 'Baz']),
+        (lambda a, b: a - b, ['Foo']),
+        (lambda a, b: b - a, ['Baz']),
+        (lambda a, b: a ^ b, ['Foo', 'Baz']),
+    ),
+)
+def test_Group_set_operations(operation, exp_result, countrydata):
+    a, b = countrydata.members('a'), countrydata.members('b')
+    result = operation(a, b)
+    assert isinstance(result, Group)
+    assert names(result) == exp_result
+
+
+def test_Group_comparisons(countrydata):
+    a, b = countrydata.members('a'), countrydata.members('b')
+    intersection = a & b
+    assert a == countrydata.members('a')
+    assert a != b
+    assert hash(a) == hash(countrydata.members('a'))
+    assert intersection <= a and intersection < a
+    assert not a <= intersection and not a < a
+    assert a >= intersection and a > intersection
+    assert not intersection >= a and not a > a
+    assert not a.isdisjoint(b)
+    assert (a - b).isdisjoint(b)
+    assert a != 'foo'
+
+
+def test_Group_operations_with_other_types(countrydata):
+    with pytest.raises(TypeError):
+        countrydata.members('a') & {'AB'}
+
+
+def test_Group_operations_with_other_CountryData(countrydata, tmp_path):
+    other = CountryData(tmp_path / 'countrydata.json')
+    exp_msg = "Groups from different CountryData instances can't be combined"
+    for operation in (operator.and_, operator.or_, operator.sub, operator.xor):
+        with pytest.raises(ValueError, match=rf'^{re.escape(exp_msg)}$'):
+            operation(countrydata.members('a'), other.members('a'))
+
+
+def test_Group_comparisons_with_other_CountryData(countrydata, tmp_path):
+    other = CountryData(tmp_path / 'countrydata.json')
+    a, other_a = countrydata.members('a'), other.members('a')
+    assert a != other_a
+    assert not a == other_a
+    assert a not in [other_a]
+    assert len({a, other_a}) == 2
+    for operation in (operator.le, operator.lt, operator.ge, operator.gt):
+        with pytest.raises(TypeError):
+            operation(a, other_a)
+
+
+def test_Group_repr(countrydata):
+    assert repr(countrydata.members('b')) == '<Group of 2 countries>'
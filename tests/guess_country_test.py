@@ -1,17 +1,12 @@
+import concurrent.futures
 import re
-from unittest.mock import call
+import threading
+import time
+from unittest.mock import Mock, call
 
 import pytest
 
-from countryguess import _guess_country
-
-
-@pytest.fixture(autouse=True)
-def remove_CountryData_instances():
-    try:
-        yield
-    finally:
-        _guess_country._countrydata = None
+from countryguess import _cache, _guess_country
 
 
 def test_guess_country_loads_countrydata_on_demand(mocker):
@@ -50,3 +45,90 @@ def test_guess_country_return_value(info, attribute, default, exp_result, mocker
         assert return_value == exp_result
 
     assert CountryData_mock.return_value.get.call_args_list == [call('foo', regex_map=None)]
+
+
+@pytest.mark.parametrize(
+    argnames='results, attribute, default, exp_attribute, exp_result',
+    argvalues=(
+        (['foo', None], None, None, None, ['foo', None]),
+        (['foo', None], 'iso2', 'whatever', 'iso2', ['foo', None]),
+        (['foo', None], 'ISO2', 'whatever', 'iso2', ['foo', None]),
+        (AttributeError('iso4'), 'ISO4', None, 'iso4', AttributeError('ISO4')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_guess_countries(results, attribute, default, exp_attribute, exp_result, mocker):
+    CountryData_mock = mocker.patch('countryguess._guess_country.CountryData')
+    if isinstance(results, Exception):
+        CountryData_mock.return_value.get_many.side_effect = results
+    else:
+        CountryData_mock.return_value.get_many.return_value = results
+
+    regex_map = {'FO': re.compile('^foo$')}
+    if isinstance(exp_result, Exception):
+        with pytest.raises(type(exp_result), match=rf'^{re.escape(str(exp_result))}$'):
+            _guess_country.guess_countries(['a', 'b'], attribute=attribute, default=default, regex_map=regex_map)
+    else:
+        return_value = _guess_country.guess_countries(['a', 'b'], attribute=attribute, default=default, regex_map=regex_map)
+        assert return_value == exp_result
+
+    assert CountryData_mock.return_value.get_many.call_args_list == [
+        call(['a', 'b'], attribute=exp_attribute, default=default, regex_map=regex_map),
+    ]
+
+
+def test_guess_countries_uses_same_CountryData_as_guess_country():
+    _guess_country.guess_country('de')
+    countrydata = _guess_country._countrydata
+    _guess_country.guess_countries(['de'])
+    assert _guess_country._countrydata is countrydata
+
+
+def test_guess_country_cache():
+    _guess_country.guess_country.cache_clear()
+    _guess_country.guess_country('foo')
+    _guess_country.guess_country('foo')
+    _guess_country.guess_countries(['foo', 'bar', 'bar'])
+    assert _guess_country.guess_country.cache_info() == _cache.CacheInfo(
+        hits=2, misses=2, evictions=0, maxsize=_guess_country._cache_size, currsize=2,
+    )
+
+    try:
+        _guess_country.guess_country.set_cache_size(1)
+        assert _guess_country.guess_country.cache_info().maxsize == 1
+        assert _guess_country.guess_country.cache_info().currsize == 1
+        _guess_country._countrydata = None
+        _guess_country.guess_country('foo')
+        assert _guess_country.guess_country.cache_info().maxsize == 1
+    finally:
+        _guess_country.guess_country.set_cache_size(1024)
+
+    _guess_country.guess_country.cache_clear()
+    assert _guess_country.guess_country.cache_info().currsize == 0
+
+
+def test_guess_country_creates_only_one_CountryData_with_multiple_threads(mocker):
+    barrier = threading.Barrier(8)
+
+    def slow_CountryData(*args, **kwargs):
+        time.sleep(0.1)
+        return Mock()
+
+    CountryData_mock = mocker.patch('countryguess._guess_country.CountryData', side_effect=slow_CountryData)
+
+    def guess():
+        barrier.wait()
+        _guess_country.guess_country('foo')
+        return _guess_country._countrydata
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda _: guess(), range(8)))
+
+    assert all(result is results[0] for result in results)
+    assert CountryData_mock.call_args_list == [call(cache_size=_guess_country._cache_size)]
+
+
+def test_guess_country_preload(mocker):
+    CountryData_mock = mocker.patch('countryguess._guess_country.CountryData')
+    _guess_country.guess_country.preload()
+    assert CountryData_mock.return_value.preload.call_args_list == [call()]
@@ -0,0 +1,59 @@
+import subprocess
+import sys
+
+import pytest
+
+# Modules that take a while to import and must only be imported when they are
+# needed
+slow_modules = (
+    'argparse',
+    'asyncio',
+    'concurrent.futures',
+    'csv',
+    'difflib',
+    'hashlib',
+    'importlib.resources',
+    'json',
+    'pathlib',
+    'tempfile',
+    'typing',
+    'countryguess._fuzzy',
+)
+
+
+def get_imported_modules(code):
+    # Return names of all modules that are imported by a new interpreter
+    # running `code` (see `python -X importtime`)
+    process = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    modules = set()
+    for line in process.stderr.splitlines():
+        if line.startswith('import time:'):
+            _, _, name = line.split('|')
+            modules.add(name.strip())
+    return modules
+
+
+@pytest.mark.parametrize(
+    argnames='code, exp_slow_modules',
+    argvalues=(
+        ('import countryguess', ()),
+        ('import countryguess; countryguess.guess_country("DE")', ()),
+        ('import countryguess; countryguess.CountryData().find_by("isonumeric", 276)', ()),
+        ('import countryguess; countryguess.CountryData(compact=True)["DEU"]', ()),
+        ('import sys; sys.argv = ["countryguess", "DE", "iso3"]; import countryguess.__main__', ('argparse',)),
+        ('import countryguess; countryguess.guess_country("Germani")', ('countryguess._fuzzy', 'difflib')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_slow_modules_are_imported_on_demand(code, exp_slow_modules):
+    # Cache country data on disk, so we don't need to parse the JSON file
+    get_imported_modules('import countryguess; countryguess.CountryData().preload()')
+
+    modules = get_imported_modules(code)
+    assert 'countryguess' in modules
+    assert sorted(set(slow_modules) & modules) == sorted(exp_slow_modules)
@@ -0,0 +1,127 @@
+import re
+
+import pytest
+
+from countryguess import _mentions
+
+
+def normalize(word):
+    return word.lower()
+
+
+@pytest.fixture
+def scanner():
+    names = {
+        'foolala': 0,
+        'republic of foolala': 0,
+        'baristan': 1,
+        'north baristan': 2,
+    }
+    patterns = [
+        re.compile(r'foolal', flags=re.IGNORECASE),
+        re.compile(r'^(?!.*north).*\bbarist', flags=re.IGNORECASE),
+        re.compile(r'north.*barist|\bnobar\b', flags=re.IGNORECASE),
+    ]
+    literals = [('foolal',), ('barist',), ('barist', 'nobar')]
+    return _mentions.MentionScanner(names, patterns, literals, normalize)
+
+
+def get_mentions(scanner, text, chunks=None):
+    return [
+        (row, text[start:end], stage)
+        for row, start, end, stage in scanner.scan(chunks or (text,))
+    ]
+
+
+@pytest.mark.parametrize(
+    argnames='text, exp_mentions',
+    argvalues=(
+        ('', []),
+        ('Nothing to see here.', []),
+        ('Foolala', [(0, 'Foolala', 'name')]),
+        ('the Republic of Foolala!', [(0, 'Republic of Foolala', 'name')]),
+        ('the Republic of Baristan', [(1, 'Baristan', 'name')]),
+        ('Republic of  North-Baristan', [(2, 'North-Baristan', 'name')]),
+        ('Foolalian food and Baristani wine', [(0, 'Foolalian', 'regex'), (1, 'Baristani', 'regex')]),
+        ('the north of Baristani', [(2, 'Baristani', 'regex')]),
+        ('a nobar barist', [(2, 'nobar', 'regex'), (1, 'barist', 'regex')]),
+        ('a nobar  nobar', [(2, 'nobar  nobar', 'regex')]),
+        ('foolalian foolalian, foolalian', [(0, 'foolalian foolalian', 'regex'), (0, 'foolalian', 'regex')]),
+        ('a bar in nobar', [(2, 'nobar', 'regex')]),
+        ('the nobarist', []),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_MentionScanner_scan(text, exp_mentions, scanner):
+    assert get_mentions(scanner, text) == exp_mentions
+
+
+@pytest.mark.parametrize('chunk_size', (1, 2, 3, 7, 100))
+def test_MentionScanner_scan_chunks(chunk_size, scanner):
+    text = (
+        'The Republic of Foolala and North Baristan are neighbours. '
+        'Foolalian food, Baristani wine and nobar barist from the Republic of Baristan. '
+    ) * 5
+    chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+    exp_mentions = get_mentions(scanner, text)
+    assert len(exp_mentions) == 35
+    assert get_mentions(scanner, text, chunks=chunks) == exp_mentions
+
+
+def test_MentionScanner_scan_keeps_only_the_last_words(scanner, mocker):
+    _scan_buffer = mocker.spy(scanner, '_scan_buffer')
+    chunks = ['Foolala and some other words. '] * 100
+    assert len(list(scanner.scan(chunks))) == 100
+    assert max(len(call.args[0]) for call in _scan_buffer.call_args_list) < 100
+
+
+def test_MentionScanner_scan_long_word(scanner):
+    class Word(str):
+        contains_calls = 0
+
+        def __contains__(self, anchor):
+            Word.contains_calls += 1
+            return super().__contains__(anchor)
+
+    word = Word('foolal' * 100_000 + 'barist')
+    assert scanner._get_anchor_rows(word) == [0, 1, 2]
+    # Each anchor is searched once, not once per trigram position
+    assert Word.contains_calls == 2
+    # Words that long are not mentions
+    assert get_mentions(scanner, f'the {word} here') == []
+
+
+@pytest.mark.parametrize(
+    argnames='text, exp_mentions',
+    argvalues=(
+        ('Foolala ' + 'x' * 99 + ' Baristan', [(0, 'Foolala', 'name'), (1, 'Baristan', 'name')]),
+        ('Foolala ' + 'x' * 100 + ' Baristan', [(0, 'Foolala', 'name'), (1, 'Baristan', 'name')]),
+        ('x' * 1000 + 'foolalian', []),
+        ('north' + ' ' * 99 + 'Baristani', [(2, 'Baristani', 'regex')]),
+        ('north' + ' ' * 100 + 'Baristani', [(1, 'Baristani', 'regex')]),
+        ('Republic of' + '.' * 100 + 'Foolala', [(0, 'Foolala', 'name')]),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_MentionScanner_scan_long_runs(text, exp_mentions, scanner):
+    assert get_mentions(scanner, text) == exp_mentions
+    for chunk_size in (1, 7, 64, 100, 101):
+        chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        assert get_mentions(scanner, text, chunks=chunks) == exp_mentions
+
+
+def test_MentionScanner_scan_long_word_in_chunks(scanner, mocker):
+    _scan_buffer = mocker.spy(scanner, '_scan_buffer')
+    text = 'Foolala ' + 'x' * 1_000_000 + ' Baristan'
+    chunks = [text[i:i + 4096] for i in range(0, len(text), 4096)]
+    assert get_mentions(scanner, text, chunks=chunks) == [(0, 'Foolala', 'name'), (1, 'Baristan', 'name')]
+    assert max(len(call.args[0]) for call in _scan_buffer.call_args_list) <= 4096 + 100
+
+
+def test_MentionScanner_scan_many_distinct_words(scanner, mocker):
+    _scan_buffer = mocker.spy(scanner, '_scan_buffer')
+    chunks = [f'request {i:x} from Foolala\n' for i in range(20_000)]
+    assert len(list(scanner.scan(chunks))) == 20_000
+    state = _scan_buffer.call_args_list[-1].args[1]
+    assert len(state.words) == _mentions._WORD_CACHE_SIZE
+    assert len(state.anchor_rows) <= _mentions._WORD_CACHE_SIZE
@@ -0,0 +1,64 @@
+import marshal
+
+import pytest
+
+from countryguess import _prebuilt
+
+
+@pytest.mark.parametrize(
+    argnames='source_path, exp_path',
+    argvalues=(
+        ('path/to/countries.json', 'path/to/countries.index'),
+        ('path/to/countries', 'path/to/countries.index'),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_get_path(source_path, exp_path):
+    assert _prebuilt.get_path(source_path) == exp_path
+
+
+def test_write_and_read(tmp_path):
+    source_path = tmp_path / 'countries.json'
+    source_path.write_text('[]')
+    _prebuilt.write(source_path, {'foo': ['bar', 1]})
+    assert (tmp_path / 'countries.index').exists()
+    assert _prebuilt.read(source_path) == {'foo': ['bar', 1]}
+
+
+def test_read_returns_None_if_source_file_changed(tmp_path):
+    source_path = tmp_path / 'countries.json'
+    source_path.write_text('[]')
+    _prebuilt.write(source_path, {'foo': 'bar'})
+    source_path.write_text('[{}]')
+    assert _prebuilt.read(source_path) is None
+
+
+def test_read_returns_None_if_format_changed(tmp_path, mocker):
+    source_path = tmp_path / 'countries.json'
+    source_path.write_text('[]')
+    _prebuilt.write(source_path, {'foo': 'bar'})
+    mocker.patch.object(_prebuilt, '_FORMAT_VERSION', _prebuilt._FORMAT_VERSION + 1)
+    assert _prebuilt.read(source_path) is None
+
+
+@pytest.mark.parametrize(
+    argnames='content',
+    argvalues=(
+        b'',
+        b'garbage',
+        marshal.dumps('foo'),
+        marshal.dumps(('foo', 'bar', 'baz')),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_read_returns_None_if_prebuilt_file_is_invalid(content, tmp_path):
+    source_path = tmp_path / 'countries.json'
+    source_path.write_text('[]')
+    (tmp_path / 'countries.index').write_bytes(content)
+    assert _prebuilt.read(source_path) is None
+
+
+def test_read_returns_None_if_files_do_not_exist(tmp_path):
+    assert _prebuilt.read(tmp_path / 'countries.json') is None
+    (tmp_path / 'countries.json').write_text('[]')
+    assert _prebuilt.read(tmp_path / 'countries.json') is None
@@ -0,0 +1,99 @@
+import pickle
+import re
+
+import pytest
+
+from countryguess import _records
+
+
+@pytest.fixture
+def table():
+    return _records.CountryTable([
+        {'iso2': 'AB', 'name_short': 'Foo', 'continent': 'Europe', 'regex': '^fo+$'},
+        {'iso2': 'DE', 'name_short': 'Bar', 'continent': 'Europe', 'regex': '^ba+r$', 'extra': 1},
+    ])
+
+
+def test_CountryTable_interns_strings():
+    continents = ['Eur', 'Eur']
+    continents = [continent + 'ope' for continent in continents]
+    assert continents[0] is not continents[1]
+    table = _records.CountryTable([{'continent': continent} for continent in continents])
+    assert table.records[0]['continent'] is table.records[1]['continent']
+
+
+def test_CountryTable_compiles_regex_lazily(table, mocker):
+    exp_pattern = re.compile('^fo+$', flags=re.IGNORECASE)
+    compile_mock = mocker.patch('re.compile', wraps=re.compile)
+    foo, bar = table.records
+    assert foo['iso2'] == 'AB'
+    assert compile_mock.call_args_list == []
+    assert foo['regex'] == exp_pattern
+    assert foo['regex'] is foo.regex
+    assert compile_mock.call_args_list == [mocker.call('^fo+$', flags=re.IGNORECASE)]
+
+
+def test_CountryTable_get_dicts(table):
+    foo, bar = table.records
+    foo_regex = foo['regex']
+    dicts = table.get_dicts()
+    assert dicts[0]['regex'] is foo_regex
+    # Regular expressions of the dicts are not kept by the table
+    assert table._patterns == [foo_regex, None]
+    assert dicts == [dict(foo), dict(bar)]
+    assert list(dicts[1]) == ['iso2', 'name_short', 'continent', 'regex', 'extra']
+    dicts[0]['iso2'] = 'XY'
+    assert foo['iso2'] == 'AB'
+
+
+def test_Country_is_mapping(table):
+    foo, bar = table.records
+    assert foo['name_short'] == 'Foo'
+    assert bar['extra'] == 1
+    assert foo.get('extra', 'default') == 'default'
+    assert list(foo) == ['iso2', 'name_short', 'continent', 'regex']
+    assert list(bar) == ['iso2', 'name_short', 'continent', 'regex', 'extra']
+    assert len(foo) == 4
+    assert len(bar) == 5
+    assert 'extra' not in foo
+    assert 'extra' in bar
+    assert dict(foo) == {
+        'iso2': 'AB',
+        'name_short': 'Foo',
+        'continent': 'Europe',
+        'regex': re.compile('^fo+$', flags=re.IGNORECASE),
+    }
+    assert foo == dict(foo)
+    assert foo != bar
+    assert repr(foo) == f'Country({dict(foo)!r})'
+
+    for key in ('extra', 'nonexisting'):
+        with pytest.raises(KeyError, match=rf"^'{key}'$"):
+            foo[key]
+
+
+def test_Country_is_read_only(table):
+    foo, _ = table.records
+    with pytest.raises(TypeError):
+        foo['iso2'] = 'XY'
+    with pytest.raises(AttributeError):
+        foo.iso2 = 'XY'
+    assert foo.iso2 == 'AB'
+
+
+def test_Country_attributes(table):
+    foo, bar = table.records
+    assert foo.iso2 == 'AB'
+    assert bar.continent == 'Europe'
+    assert bar.extra == 1
+    for name in ('extra', 'nonexisting', '_private'):
+        with pytest.raises(AttributeError, match=rf'^{name}$'):
+            getattr(foo, name)
+
+
+def test_Country_pickle(table):
+    foo, bar = table.records
+    assert pickle.loads(pickle.dumps(foo)) == foo
+    foo2, bar2 = pickle.loads(pickle.dumps((foo, bar)))
+    assert (foo2, bar2) == (foo, bar)
+    assert foo2._table is bar2._table
@@ -0,0 +1,261 @@
+import json
+import os
+import re
+
+import pytest
+
+from countryguess import _regex
+
+
+@pytest.mark.parametrize(
+    argnames='pattern, exp_literals',
+    argvalues=(
+        (re.compile(r'afghan', flags=re.IGNORECASE), (('afghan',),)),
+        (re.compile(r'AfGhAn'), (('afghan',),)),
+        (re.compile(r'anguill?a'), (('anguil',),)),
+        (re.compile(r'^fo+lala$'), (('lala',),)),
+        (re.compile(r'zimbabwe|rhodesia'), (('zimbabwe', 'rhodesia'),)),
+        (re.compile(r'\b(a|å)land'), (('land',),)),
+        (re.compile(r'(?:north|south)\s+republic'), (('north', 'south'), ('republic',))),
+        (re.compile(r'(?:north|south)\s+k'), (('north', 'south'),)),
+        (re.compile(r'(?:foo)?bar'), (('bar',),)),
+        (re.compile(r'(?:foo)*'), None),
+        (re.compile(r'gb|britain'), None),
+        (re.compile(r'(?-i:foo)bar', flags=re.IGNORECASE), (('bar',),)),
+        (re.compile(r'foo  bar', flags=re.VERBOSE), None),
+        (re.compile(r'h\xe4llo'), (('llo',),)),
+        (re.compile(r'h\xe4ll'), None),
+        (re.compile(r'^ctry[-_ ]deu$'), (('ctry',), ('deu',))),
+        (re.compile(r'(?:ctry-deu)+ ctry'), (('ctry-deu',), (' ctry',))),
+        (
+            re.compile(r'(?:united states|america) of (?:north|south)'),
+            (('united states', 'america'), (' of ',), ('north', 'south')),
+        ),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_required_literals(pattern, exp_literals):
+    assert _regex.required_literals(pattern.pattern, pattern.flags) == exp_literals
+
+
+@pytest.mark.parametrize(
+    argnames='pattern, exp_literals',
+    argvalues=(
+        (re.compile(r'foolala|baristan'), ('foolala', 'baristan')),
+        (re.compile(r'^ctry[-_ ]deu$'), ('ctry',)),
+        (re.compile(r'united.?states|^u\.?s\.?$'), ('united',)),
+        (re.compile(r'.*(united.?kingdom|britain|^u\.?k\.?$)'), ('kingdom', 'britain')),
+        (re.compile(r'(?:bazvia|^b\.?z\.?$)|bazvia.?republic'), ('bazvia', 'republic')),
+        (re.compile(r'^u\.?s\.?$|^u\.?k\.?$'), None),
+        (re.compile(r'fo+|lala', flags=re.VERBOSE), None),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_any_literals(pattern, exp_literals):
+    assert _regex.any_literals(pattern.pattern, pattern.flags) == exp_literals
+
+
+@pytest.mark.parametrize(
+    argnames='string, exp_index',
+    argvalues=(
+        ('foolala', 0),
+        ('foooolala republic', 0),
+        ('the foooolala republic', None),
+        ('BARISTAN', 1),
+        ('bazvia', 2),
+        ('bazvia and baristan', 1),
+        ('fooolala and baristan', 0),
+        ('anything', 3),
+        ('nothing', None),
+        ('BÄZVIA', None),
+        ('bäristan', None),
+        ('BAÄRISTAN', 1),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_RegexIndex_search(string, exp_index):
+    index = _regex.RegexIndex((
+        re.compile(r'^fo+lala\b', flags=re.IGNORECASE),
+        re.compile(r'ba[hä]?ristan', flags=re.IGNORECASE),
+        re.compile(r'ba[zs]via', flags=re.IGNORECASE),
+        re.compile(r'^any'),
+    ))
+    assert index.search(string) == exp_index
+
+
+def test_RegexIndex_search_finds_same_country_as_loop():
+    filepath = os.path.join(os.path.dirname(_regex.__file__), '_countrydata.json')
+    with open(filepath, 'r') as f:
+        countries = json.load(f)
+    patterns = [re.compile(country['regex'], flags=re.IGNORECASE) for country in countries]
+    index = _regex.RegexIndex(patterns)
+
+    def loop(string):
+        for i, pattern in enumerate(patterns):
+            if pattern.search(string):
+                return i
+
+    strings = ['', 'x', 'N/A', 'unknown', 'Zimbabwe', 'Côte d’Ivoire', 'Korea, Republic of']
+    for country in countries:
+        for name in (country['name_short'], country['name_official']):
+            strings.extend((name, name.upper(), name[1:], name[:-1], f'{name} and Zimbabwe'))
+
+    assert len(index) == len(patterns)
+    for string in strings:
+        assert index.search(string) == loop(string), string
+
+
+def test_RegexIndex_with_precomputed_literals():
+    patterns = (
+        re.compile(r'^fo+lala\b', flags=re.IGNORECASE),
+        re.compile(r'ba[hä]?ristan', flags=re.IGNORECASE),
+    )
+    literals = [_regex.required_literals(pattern.pattern, pattern.flags) for pattern in patterns]
+    index = _regex.RegexIndex(patterns, literals=literals)
+    assert index.search('foolala') == 0
+    assert index.search('bahristan') == 1
+    assert index.search('nothing') is None
+
+    with pytest.raises(ValueError, match=r'^Expected 2 literals, got 1$'):
+        _regex.RegexIndex(patterns, literals=literals[:1])
+
+
+def test_RegexIndex_append_replace_and_remove():
+    index = _regex.RegexIndex((
+        re.compile(r'^fo+lala\b', flags=re.IGNORECASE),
+        re.compile(r'ba[hä]?ristan', flags=re.IGNORECASE),
+    ))
+    assert index.append(re.compile(r'lala', flags=re.IGNORECASE)) == 2
+    assert index.append(re.compile(r'^any')) == 3
+    assert len(index) == 4
+    assert index.search('foolala') == 0
+    assert index.search('the foolala') == 2
+    assert index.search('anything') == 3
+
+    index.remove(0)
+    assert len(index) == 3
+    assert index.search('foolala') == 2
+    assert index.search('FÖOLALA') == 2
+
+    index.replace(1, re.compile(r'lalaland', flags=re.IGNORECASE))
+    assert index.search('bahristan') is None
+    assert index.search('lalaland') == 1
+    assert index.search('lala') == 2
+
+    index.replace(3, re.compile(r'^nothing'))
+    assert index.search('anything') is None
+    assert index.search('nothing') == 3
+
+
+def test_RegexIndex_indexes_rarest_required_literals():
+    patterns = [re.compile(rf'^ctry[-_ ]{i:03d}$') for i in range(100)]
+    patterns.append(re.compile(r'^ctry[-_ ]deu$'))
+    index = _regex.RegexIndex(patterns)
+    assert index._trigrams['deu'] == [100]
+    assert 'ctr' not in index._trigrams
+    assert index.search('ctry-deu') == 100
+    assert index.search('ctry-042') == 42
+    assert index.search('ctry-xyz') is None
+
+
+def test_RegexIndex_compact():
+    index = _regex.RegexIndex((
+        re.compile(r'foolala', flags=re.IGNORECASE),
+        re.compile(r'baristan', flags=re.IGNORECASE),
+        re.compile(r'^any'),
+        re.compile(r'lala', flags=re.IGNORECASE),
+    ))
+    index.remove(0)
+    index.remove(2)
+    assert index.compact() == [1, 3]
+    assert index._patterns == [
+        re.compile(r'baristan', flags=re.IGNORECASE),
+        re.compile(r'lala', flags=re.IGNORECASE),
+    ]
+    assert len(index) == 2
+    assert index.search('foolala') == 1
+    assert index.search('baristan') == 0
+    assert index.search('anything') is None
+    assert index.append(re.compile(r'^any')) == 2
+    assert index.search('anything') == 2
+
+
+def test_RegexMap_behaves_like_dict():
+    regex_map = _regex.RegexMap({'AB': re.compile('^a+b$'), 'CD': re.compile('cd')})
+    assert list(regex_map) == ['AB', 'CD']
+    assert regex_map['CD'] == re.compile('cd')
+    assert len(regex_map) == 2
+    assert repr(regex_map) == f"RegexMap({{'AB': {re.compile('^a+b$')!r}, 'CD': {re.compile('cd')!r}}})"
+
+    regex_map.add('EF', re.compile('ef'))
+    regex_map['AB'] = re.compile('^aaab$')
+    assert list(regex_map.items()) == [
+        ('AB', re.compile('^aaab$')),
+        ('CD', re.compile('cd')),
+        ('EF', re.compile('ef')),
+    ]
+
+    regex_map.remove('CD')
+    del regex_map['AB']
+    assert dict(regex_map) == {'EF': re.compile('ef')}
+    with pytest.raises(KeyError, match=r"^'AB'$"):
+        regex_map.remove('AB')
+    with pytest.raises(KeyError, match=r"^'AB'$"):
+        regex_map['AB']
+
+
+@pytest.mark.parametrize(
+    argnames='regex_map, string, exp_iso2',
+    argvalues=(
+        ({'AB': re.compile('^foo'), 'CD': re.compile('foo')}, 'foobar', 'AB'),
+        ({'AB': re.compile('^foo'), 'CD': re.compile('foo')}, 'barfoo', 'CD'),
+        ({'AB': re.compile('^foo'), 'CD': re.compile('foo')}, 'bar', None),
+        ({'AB': re.compile('^föö'), 'CD': re.compile('f')}, 'föö', 'AB'),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_RegexMap_search(regex_map, string, exp_iso2):
+    assert _regex.RegexMap(regex_map).search(string) == exp_iso2
+
+
+def test_RegexMap_search_after_modification():
+    regex_map = _regex.RegexMap({'AB': re.compile('^foo'), 'CD': re.compile('foo')})
+    regex_map['AB'] = re.compile('^bar')
+    assert regex_map.search('foo') == 'CD'
+    assert regex_map.search('bar') == 'AB'
+    regex_map.remove('AB')
+    regex_map['AB'] = re.compile('foo')
+    assert regex_map.search('foo') == 'CD'
+    regex_map.remove('CD')
+    assert regex_map.search('foo') == 'AB'
+
+
+def test_RegexMap_remove_closes_gaps():
+    regex_map = _regex.RegexMap()
+    for i in range(1000):
+        regex_map[f'{i:03d}'] = re.compile(f'^ctry-{i:03d}$')
+        if i >= 2:
+            del regex_map[f'{i - 2:03d}']
+    assert list(regex_map) == ['998', '999']
+    assert len(regex_map._codes) <= 4
+    assert len(regex_map._index._patterns) == len(regex_map._codes)
+    assert regex_map.search('ctry-999') == '999'
+    assert regex_map.search('ctry-997') is None
+    regex_map['AB'] = re.compile('ctry')
+    assert regex_map.search('ctry-999') == '999'
+    assert regex_map.search('ctry-997') == 'AB'
+
+
+@pytest.mark.parametrize(
+    argnames='iso2, regex, exp_exception',
+    argvalues=(
+        (1, re.compile('foo'), RuntimeError('Not a ISO 3166-1 alpha-2 country code: 1')),
+        ('AB', 'foo', RuntimeError("Not a regular expression (see re.compile()): 'foo'")),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_RegexMap_add_validates_arguments(iso2, regex, exp_exception):
+    regex_map = _regex.RegexMap()
+    with pytest.raises(type(exp_exception), match=rf'^{re.escape(str(exp_exception))}$'):
+        regex_map.add(iso2, regex)
+    assert len(regex_map) == 0
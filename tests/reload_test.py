@@ -0,0 +1,123 @@
+import os
+import threading
+from unittest.mock import Mock, call
+
+import pytest
+
+from countryguess import _reload
+
+
+@pytest.fixture
+def path(tmp_path):
+    path = tmp_path / 'countries.json'
+    path.write_text('original')
+    return path
+
+
+def test_Reloader_get_current_returns_current_instance(path):
+    create = Mock(side_effect=['first', 'second'])
+    reloader = _reload.Reloader(create, path, interval=1000)
+    assert reloader.get_current() == 'first'
+    assert create.call_args_list == [call()]
+
+
+def test_Reloader_reads_file_before_creating_first_instance(path, mocker):
+    instances = [Mock(name='first'), Mock(name='second')]
+    remaining = iter(instances)
+
+    def create():
+        # File changes while the first instance is loading it
+        if path.read_text() != 'changed':
+            path.write_text('changed')
+        return next(remaining)
+
+    reloader = _reload.Reloader(create, path, interval=1000)
+    get_signature_mock = mocker.patch('countryguess._reload._get_signature')
+    assert reloader.get_current() is instances[0]
+    assert get_signature_mock.call_args_list == []
+    mocker.stopall()
+    assert reloader.check() is True
+    assert reloader.get_current() is instances[1]
+
+
+def test_Reloader_check_reloads_changed_file(path):
+    instances = [Mock(name='first'), Mock(name='second')]
+    reloader = _reload.Reloader(Mock(side_effect=instances), path, interval=1000)
+    assert reloader.get_current() is instances[0]
+    assert reloader.check() is False
+
+    path.write_text('changed')
+    assert reloader.check() is True
+    assert reloader.get_current() is instances[1]
+    assert instances[1].preload.call_args_list == [call()]
+    info = reloader.info()
+    assert (info.reloads, info.failures, info.error) == (1, 0, None)
+    assert info.seconds > 0
+    assert reloader.check() is False
+
+
+def test_Reloader_check_ignores_modification_time_if_content_is_the_same(path):
+    create = Mock()
+    reloader = _reload.Reloader(create, path, interval=1000)
+    reloader.get_current()
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1000000000))
+    assert reloader.check() is False
+    assert create.call_args_list == [call()]
+
+
+def test_Reloader_check_keeps_current_instance_if_loading_fails(path):
+    first = Mock(name='first')
+    broken = Mock(name='broken')
+    broken.preload.side_effect = ValueError('Invalid country data')
+    fixed = Mock(name='fixed')
+    reloader = _reload.Reloader(Mock(side_effect=[first, broken, fixed]), path, interval=1000)
+    reloader.get_current()
+
+    path.write_text('broken')
+    assert reloader.check() is False
+    assert reloader.get_current() is first
+    info = reloader.info()
+    assert (info.reloads, info.failures, str(info.error)) == (0, 1, 'Invalid country data')
+
+    # Broken file is not loaded again until it changes
+    assert reloader.check() is False
+    assert reloader.info().failures == 1
+
+    path.write_text('fixed')
+    assert reloader.check() is True
+    assert reloader.get_current() is fixed
+    info = reloader.info()
+    assert (info.reloads, info.failures, info.error) == (1, 1, None)
+
+
+def test_Reloader_check_with_missing_file(path):
+    reloader = _reload.Reloader(Mock(), path, interval=1000)
+    reloader.get_current()
+    path.unlink()
+    assert reloader.check() is False
+    info = reloader.info()
+    assert info.failures == 1
+    assert isinstance(info.error, FileNotFoundError)
+
+
+def test_Reloader_get_current_checks_in_background_after_interval(path, mocker):
+    instances = [Mock(name='first'), Mock(name='second')]
+    monotonic = mocker.patch('time.monotonic', return_value=100.0)
+    reloader = _reload.Reloader(Mock(side_effect=instances), path, interval=10)
+    assert reloader.get_current() is instances[0]
+    path.write_text('changed')
+
+    checked = threading.Event()
+    check = reloader.check
+    mocker.patch.object(reloader, 'check', side_effect=lambda: (check(), checked.set()))
+
+    monotonic.return_value = 109.0
+    assert reloader.get_current() is instances[0]
+    assert not checked.is_set()
+
+    monotonic.return_value = 110.0
+    reloader.get_current()
+    assert checked.wait(timeout=10)
+    assert reloader.get_current() is instances[1]
+    assert reloader.check.call_args_list == [call()]
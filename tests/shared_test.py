@@ -0,0 +1,103 @@
+import pickle
+import re
+
+import pytest
+
+from countryguess import _records, _shared
+
+
+@pytest.fixture
+def country_list():
+    return [
+        {'name_short': 'Foo', 'iso2': 'AB', 'code': 4, 'regex': '^foo$'},
+        {'name_short': 'Bär', 'iso2': 'DE', 'code': None, 'regex': '^bar$', 'extra': ''},
+        {'name_short': 'Baz', 'iso2': 'GH', 'code': [1, 2], 'regex': '^baz$'},
+    ]
+
+
+@pytest.fixture
+def table(country_list, tmp_path):
+    path = tmp_path / 'countries.shared'
+    _shared.write(
+        path,
+        country_list,
+        indexes={'iso2': {'AB': 0, 'DE': 1, 'GH': 2}},
+        name_index={'foo': 0, 'bar': 1, 'bär': 1},
+        regex_literals=[['foo'], ['bar'], None],
+    )
+    return _shared.SharedTable(path)
+
+
+def test_SharedTable_records(country_list, table):
+    assert len(table) == 3
+    assert all(isinstance(record, _records.Country) for record in table.records)
+    for record, info in zip(table.records, country_list):
+        exp_info = {**info, 'regex': re.compile(info['regex'], flags=re.IGNORECASE)}
+        assert dict(record) == exp_info
+    assert table.records[1]['regex'] is table.records[1].regex
+    assert 'extra' not in table.records[0]
+    with pytest.raises(KeyError, match=r"^'extra'$"):
+        table.records[0]['extra']
+    with pytest.raises(KeyError, match=r"^'foo'$"):
+        table.records[0]['foo']
+    assert table.regex_literals == [['foo'], ['bar'], None]
+
+
+def test_SharedTable_get_dicts(country_list, table):
+    dicts = table.get_dicts()
+    assert table._patterns == [None, None, None]
+    assert dicts == [dict(record) for record in table.records]
+
+
+def test_SharedTable_indexes(table):
+    index = table.indexes['iso2']
+    assert index.get('AB') == 0
+    assert index['GH'] == 2
+    assert index.get('XX') is None
+    assert index.get(None) is None
+    assert 'DE' in index
+    assert dict(index) == {'AB': 0, 'DE': 1, 'GH': 2}
+    assert len(index) == 3
+    assert dict(table.name_index) == {'foo': 0, 'bar': 1, 'bär': 1}
+
+
+def test_SharedTable_pickle(table):
+    copy = pickle.loads(pickle.dumps(table))
+    assert copy is not table
+    assert dict(copy.records[0]) == dict(table.records[0])
+
+
+def test_SharedTable_with_empty_index(tmp_path):
+    path = tmp_path / 'countries.shared'
+    _shared.write(path, [], indexes={'iso2': {}}, name_index={}, regex_literals=[])
+    table = _shared.SharedTable(path)
+    assert table.records == ()
+    assert table.indexes['iso2'].get('AB') is None
+    assert len(table.name_index) == 0
+
+
+@pytest.mark.parametrize(
+    argnames='content, exp_message',
+    argvalues=(
+        (b'', 'Not a shared country data file: {path}'),
+        (b'[{"name_short": "Foo"}]', 'Not a shared country data file: {path}'),
+        (b'CGSHARED\x05\x00\x00\x00abcde', 'Not a shared country data file: {path}'),
+    ),
+    ids=lambda v: repr(v),
+)
+def test_SharedTable_with_invalid_file(content, exp_message, tmp_path):
+    path = tmp_path / 'countries.shared'
+    path.write_bytes(content)
+    exp_message = exp_message.format(path=path)
+    with pytest.raises(RuntimeError, match=rf'^{re.escape(exp_message)}$'):
+        _shared.SharedTable(path)
+
+
+def test_SharedTable_with_file_from_other_version(country_list, tmp_path, mocker):
+    path = tmp_path / 'countries.shared'
+    mocker.patch.object(_shared, '__version__', '0.0.1')
+    _shared.write(path, country_list, indexes={}, name_index={}, regex_literals=[None] * 3)
+    mocker.stopall()
+    exp_message = f'Shared country data file was created by another version: {path}'
+    with pytest.raises(RuntimeError, match=rf'^{re.escape(exp_message)}$'):
+        _shared.SharedTable(path)
@@ -0,0 +1,42 @@
+import threading
+
+from countryguess import _stats
+
+
+def test_StageStats_starts_empty():
+    stats = _stats.StageStats()
+    assert stats.info() == {stage: _stats.StageInfo(count=0, seconds=0.0) for stage in _stats.STAGES}
+    assert list(stats.info()) == list(_stats.STAGES)
+
+
+def test_StageStats_add():
+    stats = _stats.StageStats()
+    stats.add('iso2', 0.5)
+    stats.add('iso2', 0.25)
+    stats.add('miss', 2.0)
+    info = stats.info()
+    assert info['iso2'] == _stats.StageInfo(count=2, seconds=0.75)
+    assert info['miss'] == _stats.StageInfo(count=1, seconds=2.0)
+    assert info['regex'] == _stats.StageInfo(count=0, seconds=0.0)
+
+
+def test_StageStats_clear():
+    stats = _stats.StageStats()
+    stats.add('regex', 1.0)
+    stats.clear()
+    assert stats.info()['regex'] == _stats.StageInfo(count=0, seconds=0.0)
+
+
+def test_StageStats_is_thread_safe():
+    stats = _stats.StageStats()
+
+    def add():
+        for _ in range(1000):
+            stats.add('iso3', 1)
+
+    threads = [threading.Thread(target=add) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert stats.info()['iso3'] == _stats.StageInfo(count=8000, seconds=8000)